@@ -0,0 +1,182 @@
+"""
+Benchmark suite for the ELVIS pipeline.
+
+The README requires ELVIS to simulate a million pixel elements in under
+10 s (goal 1 s).  These benchmarks time the hot paths at 1, 4 and 16
+megapixel scales and compare them with the stored baselines in
+``baselines.json``.
+
+Timings depend on the machine, so every baseline also records the
+duration of a fixed calibration workload (:func:`calibration_time`) on
+the machine that measured it.  A baseline is scaled by the ratio of the
+calibration times of this machine and that one before it is compared,
+so the thresholds are relative to the machine's speed.  Only the
+benchmarks that ran are updated when saving; re-save just the entries
+whose code changed (select them with ``-k``).
+
+The benchmarks are skipped unless ``ELVIS_BENCHMARK`` is set::
+
+    ELVIS_BENCHMARK=1 python -m pytest benchmarks
+
+Environment variables
+---------------------
+ELVIS_BENCHMARK
+    Run the benchmarks.
+ELVIS_BENCHMARK_SAVE
+    Write the measured timings to ``baselines.json`` instead of comparing.
+ELVIS_BENCHMARK_THRESHOLD
+    Allowed slowdown factor relative to the (calibrated) baseline
+    (default 1.5).
+ELVIS_BENCHMARK_NOISE_FLOOR
+    Slowdowns smaller than this many seconds never fail (default 0.005),
+    so that sub-millisecond benchmarks do not flake.
+ELVIS_BENCHMARK_REPEATS
+    Number of timed repeats per benchmark (default 3).
+
+No ScopeSim/IRDB installation is needed: the pipeline runs against the
+:class:`~elvis.opticaltrain.OfflineOpticalTrain` stand-in.  The source is
+still built with ``scopesim_targets``; without it the ``run_simulation``
+benchmarks are skipped, and their baselines must be saved on a machine
+where they run.
+"""
+
+import functools
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+
+# Benchmark scales: label → detector side length in pixels
+SCALES = {"1MP": 1024, "4MP": 2048, "16MP": 4096}
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("ELVIS_BENCHMARK"):
+        return
+    skip = pytest.mark.skip(reason="Set ELVIS_BENCHMARK=1 to run benchmarks")
+    for item in items:
+        if Path(str(item.fspath)).parent == Path(__file__).parent:
+            item.add_marker(skip)
+
+
+# =========================================================================
+# Offline OpticalTrain
+# =========================================================================
+
+@pytest.fixture
+def offline_pipeline(monkeypatch):
+    """
+    Factory routing ``run_simulation`` to an
+    :class:`~elvis.opticaltrain.OfflineOpticalTrain`.
+
+    ``offline_pipeline(npix=1024)`` uses a single square detector,
+    ``offline_pipeline()`` the instrument's real detector layout.
+    """
+    from elvis import pipeline
+    from elvis.opticaltrain import OfflineOpticalTrain, OpticalTrainPool
+
+    def _use(npix: int = None):
+        if npix is None:
+            builder = lambda name: OfflineOpticalTrain(name, seed=42)
+        else:
+            builder = lambda name: OfflineOpticalTrain.square(npix, seed=42)
+        pool = OpticalTrainPool(builder=builder)
+        monkeypatch.setattr(pipeline, "OPTICAL_TRAIN_POOL", pool)
+        return pool
+
+    return _use
+
+
+# =========================================================================
+# Timing harness
+# =========================================================================
+
+def _load_baselines() -> dict:
+    if BASELINE_FILE.exists():
+        return json.loads(BASELINE_FILE.read_text())
+    return {}
+
+
+_MEASURED = {}
+
+
+@functools.lru_cache(maxsize=None)
+def calibration_time() -> float:
+    """
+    Seconds this machine takes for a fixed NumPy workload (sorting and
+    summing 2**20 doubles), the fastest of 20 repeats.
+    """
+    values = np.random.default_rng(0).random(2**20)
+    durations = []
+    for _ in range(20):
+        start = time.perf_counter()
+        np.sort(values).sum()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+class Benchmark:
+    """Times a callable and checks it against its stored baseline."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.repeats = int(os.environ.get("ELVIS_BENCHMARK_REPEATS", 3))
+        self.threshold = float(os.environ.get("ELVIS_BENCHMARK_THRESHOLD", 1.5))
+        self.noise_floor = float(os.environ.get("ELVIS_BENCHMARK_NOISE_FLOOR",
+                                                0.005))
+        self.stats = None
+
+    def __call__(self, func, *args, **kwargs):
+        result = func(*args, **kwargs)        # warm-up, not timed
+        durations = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            func(*args, **kwargs)
+            durations.append(time.perf_counter() - start)
+
+        self.stats = {"min": min(durations),
+                      "median": statistics.median(durations)}
+        _MEASURED[self.name] = self.stats
+        self._check_regression()
+        return result
+
+    def _check_regression(self):
+        if os.environ.get("ELVIS_BENCHMARK_SAVE"):
+            return
+        baseline = _load_baselines().get(self.name)
+        if baseline is None:
+            return
+        # The fastest repeat is the least noisy estimate of the cost,
+        # scaled to the speed of this machine
+        expected = baseline["min"]
+        if "calibration" in baseline:
+            expected *= calibration_time() / baseline["calibration"]
+        limit = max(expected * self.threshold, expected + self.noise_floor)
+        assert self.stats["min"] <= limit, (
+            f"{self.name}: {self.stats['min']:.4f} s exceeds "
+            f"{self.threshold:g} x baseline ({expected:.4f} s on this "
+            f"machine)")
+
+
+@pytest.fixture
+def benchmark(request):
+    return Benchmark(request.node.name)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not (os.environ.get("ELVIS_BENCHMARK_SAVE") and _MEASURED):
+        return
+    baselines = _load_baselines()
+    calibration = calibration_time()
+    baselines.update({name: {k: round(v, 6)
+                             for k, v in dict(stats,
+                                              calibration=calibration).items()}
+                      for name, stats in _MEASURED.items()})
+    BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True)
+                             + "\n")
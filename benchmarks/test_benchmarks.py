@@ -0,0 +1,124 @@
+"""Timing benchmarks of the ELVIS hot paths (see ``conftest.py``)."""
+
+import copy
+
+import pytest
+from astropy.io import fits
+import numpy as np
+
+from elvis.pipeline import run_simulation, _create_source, _readout_to_hdulist
+from elvis.source.morphology import SersicExtendedMorphology
+from elvis.source.sed import get_spectrum
+from elvis.sky.converter import etc_sky_to_skycalc
+
+from .conftest import SCALES
+
+# The README requirement: a million pixel elements in under 10 s
+MEGAPIXEL_LIMIT = 10.0
+
+ETC_JSON = {
+    "target": {
+        "morphology": {"morphologytype": "extended", "extendedtype": "sersic",
+                       "index": 4, "radius": 1.0},
+        "sed": {"sedtype": "spectrum",
+                "spectrum": {"spectrumtype": "blackbody",
+                             "params": {"temperature": 5000}},
+                "extinctionav": 0},
+        "brightness": {"brightnesstype": "mag", "magband": "K", "mag": 15,
+                       "magsys": "vega"},
+    },
+    "sky": {"airmass": 1.2, "fli": 0.5, "waterVapour": 2.5, "moonDistance": 30},
+    "seeing": {"turbulence_category": 50},
+    "instrument": {"ins_configuration": "img_noao"},
+    "timesnr": {"DET.DIT": 10, "DET.NDIT": 6},
+    "output": {},
+    "instrumentName": "hawki",
+}
+
+SED_DICTS = {
+    "blackbody": ETC_JSON["target"]["sed"],
+    "powerlaw": {"sedtype": "spectrum",
+                 "spectrum": {"spectrumtype": "powerlaw",
+                              "params": {"exponent": -1}},
+                 "extinctionav": 0, "redshift": {"redshift": 0.5}},
+}
+
+
+# =========================================================================
+# Pipeline
+# =========================================================================
+
+@pytest.fixture
+def etc_json():
+    """
+    A copy of ``ETC_JSON``.  Skips the benchmark if its target cannot be
+    converted to a Source: the simulation would then observe nothing and
+    time only the empty fallback.
+    """
+    if _create_source(copy.deepcopy(ETC_JSON)) is None:
+        pytest.skip("ETC_JSON target cannot be converted to a Source "
+                    "(is scopesim_targets installed?)")
+    return copy.deepcopy(ETC_JSON)
+
+
+class TestPipelineBenchmarks:
+
+    @pytest.mark.parametrize("scale", SCALES)
+    def test_run_simulation(self, benchmark, offline_pipeline, etc_json,
+                            scale):
+        offline_pipeline(SCALES[scale])
+        hdul = benchmark(run_simulation, etc_json)
+        assert hdul[1].data.shape == (SCALES[scale],) * 2
+
+    def test_megapixel_requirement(self, benchmark, offline_pipeline,
+                                   etc_json):
+        offline_pipeline(SCALES["1MP"])
+        benchmark(run_simulation, etc_json)
+        assert benchmark.stats["median"] < MEGAPIXEL_LIMIT
+
+    @pytest.mark.parametrize("instrument, n_detectors", [("hawki", 4),
+                                                         ("eris", 1)])
+    def test_run_simulation_instrument(self, benchmark, offline_pipeline,
+                                       etc_json, instrument, n_detectors):
+        offline_pipeline()
+        etc_json["instrumentName"] = instrument
+        hdul = benchmark(run_simulation, etc_json)
+        assert len(hdul) == 2 * n_detectors
+
+    @pytest.mark.parametrize("scale", SCALES)
+    def test_readout_to_hdulist(self, benchmark, scale):
+        # A four-detector mosaic with the requested total pixel count
+        npix = SCALES[scale] // 2
+        readout = [[fits.PrimaryHDU(),
+                    fits.ImageHDU(np.zeros((npix, npix), dtype=np.float32))]
+                   for _ in range(4)]
+        hdul = benchmark(_readout_to_hdulist, readout)
+        assert sum(hdu.data.size for hdu in hdul if hdu.data is not None) \
+            == SCALES[scale] ** 2
+
+
+# =========================================================================
+# Source and sky
+# =========================================================================
+
+class TestSourceBenchmarks:
+
+    @pytest.mark.parametrize("scale", SCALES)
+    def test_sersic_make_field(self, benchmark, scale):
+        pixel_scale = 0.01
+        morph = SersicExtendedMorphology(index=4, radius=1.0)
+        hdu = benchmark(morph.make_field, pixel_scale=pixel_scale,
+                        fov_diameter=SCALES[scale] * pixel_scale,
+                        ellipticity=0.3, angle=30)
+        assert hdu.data.shape[0] >= SCALES[scale]
+
+    # The SED and sky conversions do not depend on the image size, so
+    # they are benchmarked once per input rather than per scale.
+    @pytest.mark.parametrize("sed_name", SED_DICTS)
+    def test_get_spectrum(self, benchmark, sed_name):
+        spec = benchmark(get_spectrum, copy.deepcopy(SED_DICTS[sed_name]))
+        assert spec is not None
+
+    def test_etc_sky_to_skycalc(self, benchmark):
+        params = benchmark(etc_sky_to_skycalc, ETC_JSON)
+        assert params["airmass"] == 1.2
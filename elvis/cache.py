@@ -0,0 +1,740 @@
+"""
+Content-addressed cache for simulation results.
+
+Simulation results are stored as FITS bytes, keyed by a canonical hash of
+the simulation-relevant sections of the ETC JSON.  Sections that do not
+affect the simulated image (e.g. ``output`` plot flags) are ignored, so
+re-submitting the same configuration is served from the cache.
+
+The cache has two tiers:
+
+- an in-memory LRU tier, bounded by number of entries and total bytes
+- an optional on-disk tier (one ``.fits`` file per key, see
+  :class:`DiskTier`), bounded by a total size budget and evicted
+  least-recently-used first; the directory may be shared by several
+  processes
+
+Keys include :func:`cache_salt`, so upgrading ELVIS, ScopeSim or the
+IRDB never serves results of an older build.
+
+:class:`SourceCache` keeps the scopesim ``Source`` objects built from
+``target`` sections in the same two tiers; its disk tier holds
+memory-mapped binary files (see :func:`dump_source`).  These files are
+pickles: the source cache directory must be trusted.
+
+:class:`TemplateCache` is a memory-only LRU of read-only values bounded
+by their total size, shared by the spectrum and pixel-grid caches of
+:mod:`elvis.source`.
+"""
+
+from __future__ import annotations
+
+import copy
+import functools
+import hashlib
+import importlib.metadata
+import importlib.util
+import io
+import json
+import logging
+import mmap
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from astropy.table import Column, MaskedColumn, Table
+
+log = logging.getLogger(__name__)
+
+# Top-level ETC JSON sections that determine the simulated image
+SIMULATION_SECTIONS = (
+    "target",
+    "sky",
+    "instrument",
+    "seeing",
+    "seeingiqao",
+    "timesnr",
+    "instrumentName",
+)
+
+
+# Bump when a change to ELVIS alters the simulated images or the cached
+# file formats, so that caches written by older builds are not reused
+CACHE_FORMAT_VERSION = 2
+
+# Packages whose versions are part of every cache key
+SALT_PACKAGES = ("scopesim", "scopesim_targets", "synphot", "astropy",
+                 "numpy")
+
+
+@functools.lru_cache(maxsize=None)
+def cache_salt() -> str:
+    """
+    Version string mixed into every cache key.
+
+    Combines ``CACHE_FORMAT_VERSION``, the versions of ``SALT_PACKAGES``
+    and, if ScopeSim is installed, the ``version.yaml`` of every IRDB
+    package in use, so that an upgrade of any of them invalidates the
+    caches (including shared on-disk tiers during rolling restarts).
+    """
+    parts = [f"elvis={CACHE_FORMAT_VERSION}"]
+    for package in SALT_PACKAGES:
+        try:
+            version = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            version = "none"
+        parts.append(f"{package}={version}")
+    parts.append(f"irdb={_irdb_fingerprint()}")
+    return ";".join(parts)
+
+
+def _irdb_fingerprint() -> str:
+    """Hash of the IRDB packages' ``version.yaml`` files ("" if unknown)."""
+    if importlib.util.find_spec("scopesim") is None:
+        return ""
+    try:
+        import scopesim
+        from elvis.opticaltrain.factory import INSTRUMENT_MAP
+        root = Path(scopesim.rc.__config__["!SIM.file.local_packages_path"])
+    except Exception:
+        return ""
+    digest = hashlib.sha256()
+    for package in sorted(INSTRUMENT_MAP.values()):
+        path = root / package / "version.yaml"
+        digest.update(package.encode())
+        if path.is_file():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def canonical_hash(etc_json: dict, sections=SIMULATION_SECTIONS) -> str:
+    """
+    Hash the simulation-relevant sections of an ETC JSON dict.
+
+    Key order and int/float spelling (``10`` vs ``10.0``) do not change
+    the hash.  The hash includes :func:`cache_salt`.
+
+    Parameters
+    ----------
+    etc_json : dict
+        Full ETC JSON payload.
+    sections : tuple of str
+        Top-level keys to include in the hash.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 digest.
+    """
+    subset = {key: etc_json[key] for key in sections if key in etc_json}
+    blob = json.dumps(_canonicalise(subset), sort_keys=True,
+                      separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{cache_salt()}\n{blob}".encode("utf-8")).hexdigest()
+
+
+def _canonicalise(value):
+    """Normalise a JSON value so equivalent payloads serialise equally."""
+    if isinstance(value, dict):
+        return {str(k): _canonicalise(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonicalise(v) for v in value]
+    # Integral floats become ints (not the other way round: large ints
+    # overflow or lose precision as floats)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class DiskTier:
+    """
+    Size-bounded directory of cache files, one per key, evicted
+    least-recently-used (by mtime) first.
+
+    Several processes may share the directory: files are written to a
+    unique temporary name and renamed into place, and the size of the
+    directory is re-measured whenever entries are evicted rather than
+    tracked per process.  No method needs the owning cache's lock, so
+    disk IO never blocks memory-tier lookups.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        Directory of the files; created if missing.
+    suffix : str
+        File suffix of the entries, e.g. ``".fits"``.
+    max_bytes : int
+        Size budget of the directory in bytes.
+    """
+
+    # Temporary files older than this (seconds) were left by a crashed
+    # writer and are removed
+    STALE_TMP_AGE = 3600
+
+    def __init__(self, cache_dir, suffix: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._lock = threading.Lock()   # serialises scans in this process
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.evict()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def __contains__(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def read(self, key: str, reader):
+        """``reader(path)`` for the entry of ``key``, or ``None``."""
+        path = self.path(key)
+        try:
+            value = reader(path)
+            os.utime(path)      # mark as recently used
+        except FileNotFoundError:
+            return None
+        return value
+
+    def write(self, key: str, writer) -> int:
+        """
+        Store an entry written by ``writer(path) -> size``.
+
+        Returns the number of entries evicted to stay within budget.
+        Exceptions of ``writer`` propagate; no partial file is left.
+        """
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir,
+                                        prefix=f".{key[:16]}-", suffix=".tmp")
+        os.close(fd)
+        try:
+            size = writer(tmp_name)
+            if size > self.max_bytes:
+                os.unlink(tmp_name)
+                return 0
+            os.replace(tmp_name, self.path(key))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return self.evict()
+
+    def evict(self) -> int:
+        """Re-measure the directory and evict the oldest entries."""
+        with self._lock:
+            entries = []
+            now = time.time()
+            for path in self.cache_dir.iterdir():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if path.name.endswith(".tmp"):
+                    if now - stat.st_mtime > self.STALE_TMP_AGE:
+                        path.unlink(missing_ok=True)
+                elif path.name.endswith(self.suffix):
+                    entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass            # removed by another process
+                except OSError:
+                    # Still mapped by a live object on platforms that
+                    # forbid removing mapped files
+                    continue
+                else:
+                    evicted += 1
+                    log.debug("Evicted cache file %s", path.name)
+                total -= size
+            self.nbytes = total
+            return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.cache_dir.glob(f"*{self.suffix}"):
+                path.unlink(missing_ok=True)
+            self.nbytes = 0
+
+
+class ResultCache:
+    """
+    Two-tier (memory + disk) LRU cache of FITS bytes.
+
+    Parameters
+    ----------
+    max_items : int
+        Maximum number of entries in the memory tier.
+    max_bytes : int
+        Maximum total size of the memory tier in bytes.
+    cache_dir : str or Path, optional
+        Directory for the disk tier.  ``None`` disables the disk tier.
+    max_disk_bytes : int
+        Size budget of the disk tier in bytes.
+    """
+
+    def __init__(self, max_items: int = 64, max_bytes: int = 256 * 2**20,
+                 cache_dir=None, max_disk_bytes: int = 2 * 2**30):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0,
+                      "disk_hits": 0, "evictions": 0}
+
+        self._disk = None
+        if self.cache_dir is not None:
+            self._disk = DiskTier(self.cache_dir, ".fits", max_disk_bytes)
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached bytes for ``key`` or ``None``."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return data
+
+        # Disk IO outside the lock
+        data = None
+        if self._disk is not None:
+            data = self._disk.read(key, lambda path: Path(path).read_bytes())
+
+        with self._lock:
+            if data is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            self._put_memory(key, data)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store ``data`` under ``key`` in both tiers."""
+        with self._lock:
+            self._put_memory(key, data)
+        if self._disk is not None and len(data) <= self.max_disk_bytes:
+            evicted = self._disk.write(key, lambda path: _write_bytes(path, data))
+            with self._lock:
+                self.stats["evictions"] += evicted
+
+    def clear(self) -> None:
+        """Empty both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self._disk is not None and key in self._disk
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    # --- Memory tier ---
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while (len(self._memory) > self.max_items
+               or self._memory_bytes > self.max_bytes):
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+            self.stats["evictions"] += 1
+
+
+def _write_bytes(path, data: bytes) -> int:
+    Path(path).write_bytes(data)
+    return len(data)
+
+
+class SourceCache:
+    """
+    Two-tier (memory + disk) LRU cache of scopesim ``Source`` objects.
+
+    Sources are stored and handed out as clones (see :func:`clone_source`),
+    so ``OpticalTrain.observe()`` can never modify a cached Source.
+
+    The disk tier holds one ``.src`` file per key (see :func:`dump_source`
+    and :class:`DiskTier`) so that restarted servers and new worker
+    processes can skip building the Source.  Files are memory-mapped when
+    read: the array data of fields and spectra is only paged in when it
+    is used.
+
+    The files are unpickled when read, and unpickling runs arbitrary code:
+    ``cache_dir`` must only be writable by trusted users (the ELVIS
+    processes that share it).
+
+    Parameters
+    ----------
+    max_items : int
+        Maximum number of Sources in the memory tier.
+    cache_dir : str or Path, optional
+        Directory for the disk tier (trusted, see above).  ``None``
+        disables the disk tier.
+    max_disk_bytes : int
+        Size budget of the disk tier in bytes.
+    """
+
+    def __init__(self, max_items: int = 128, cache_dir=None,
+                 max_disk_bytes: int = 2**30):
+        self.max_items = max_items
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+
+        self._sources = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0,
+                      "disk_hits": 0, "evictions": 0}
+
+        self._disk = None
+        if self.cache_dir is not None:
+            self._disk = DiskTier(self.cache_dir, ".src", max_disk_bytes)
+
+    def get(self, key: str):
+        """Return a clone of the cached Source for ``key`` or ``None``."""
+        with self._lock:
+            source = self._sources.get(key)
+            if source is not None:
+                self._sources.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return clone_source(source)
+
+        # Disk IO outside the lock
+        source = self._read_disk(key)
+
+        with self._lock:
+            if source is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            self._put_memory(key, source)
+        return clone_source(source)
+
+    def put(self, key: str, source) -> None:
+        """Store a clone of ``source`` under ``key`` in both tiers."""
+        source = clone_source(source)
+        with self._lock:
+            self._put_memory(key, source)
+        if self._disk is None:
+            return
+        try:
+            evicted = self._disk.write(key, lambda path: dump_source(source, path))
+        except Exception as exc:
+            log.warning("Could not serialise source %s: %s", key[:12], exc)
+            return
+        with self._lock:
+            self.stats["evictions"] += evicted
+
+    def clear(self) -> None:
+        """Empty both tiers."""
+        with self._lock:
+            self._sources.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._sources:
+                return True
+        return self._disk is not None and key in self._disk
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    # --- Memory tier ---
+
+    def _put_memory(self, key: str, source) -> None:
+        self._sources[key] = source
+        self._sources.move_to_end(key)
+        while len(self._sources) > self.max_items:
+            self._sources.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # --- Disk tier ---
+
+    def _read_disk(self, key: str):
+        if self._disk is None:
+            return None
+        try:
+            return self._disk.read(key, load_source)
+        except Exception as exc:
+            path = self._disk.path(key)
+            log.warning("Discarding unreadable cached source %s: %s",
+                        path.name, exc)
+            path.unlink(missing_ok=True)
+            return None
+
+
+# Layout of a ``.src`` file: magic, little-endian uint64 header length,
+# JSON header with the [offset, length] of the pickle stream and of every
+# out-of-band buffer, then the data section.  The data section and every
+# region in it start at multiples of _SOURCE_ALIGNMENT.
+_SOURCE_MAGIC = b"ELVISSRC"
+_SOURCE_ALIGNMENT = 64
+
+
+def _align(n: int) -> int:
+    return -(-n // _SOURCE_ALIGNMENT) * _SOURCE_ALIGNMENT
+
+
+class _SourcePickler(pickle.Pickler):
+    """
+    Pickler that writes the columns of astropy Tables out of band.
+
+    NumPy only hands out-of-band buffers to pickle for plain ``ndarray``
+    objects; subclasses such as ``Column`` are pickled in-band.  Tables
+    of plain ``Column``/``MaskedColumn`` objects are therefore reduced
+    to their columns' data as plain arrays plus the column attributes.
+    """
+
+    def reducer_override(self, obj):
+        if type(obj) is not Table or obj.indices:
+            return NotImplemented
+        columns = []
+        for column in obj.itercols():
+            if type(column) not in (Column, MaskedColumn):
+                return NotImplemented
+            info = column.info
+            attrs = {"name": info.name, "unit": info.unit,
+                     "format": info.format, "description": info.description,
+                     "meta": info.meta}
+            mask = None
+            if isinstance(column, MaskedColumn):
+                mask = np.ascontiguousarray(np.ma.getmaskarray(column))
+                attrs["fill_value"] = column.fill_value
+            data = np.ascontiguousarray(column.view(np.ndarray))
+            columns.append((data, mask, attrs))
+        return _rebuild_table, (columns, obj.meta)
+
+
+def _rebuild_table(columns, meta):
+    """Table of columns reduced by :class:`_SourcePickler`, without copies."""
+    built = [Column(data, copy=False, **attrs) if mask is None
+             else MaskedColumn(data, mask=mask, copy=False, **attrs)
+             for data, mask, attrs in columns]
+    return Table(built, meta=meta, copy=False)
+
+
+def dump_source(source, path) -> int:
+    """
+    Serialise a Source to ``path``.
+
+    Uses pickle protocol 5 with out-of-band buffers, so that NumPy arrays
+    (field tables and images, tabulated spectra) are written as raw,
+    aligned blocks that :func:`load_source` can map without copying.
+    Table columns are written as plain arrays (see :class:`_SourcePickler`).
+
+    Returns
+    -------
+    int
+        Size of the file in bytes.
+    """
+    buffers = []
+    stream = io.BytesIO()
+    _SourcePickler(stream, protocol=5,
+                   buffer_callback=buffers.append).dump(source)
+    stream = stream.getbuffer()
+    blocks = [memoryview(stream)] + [buf.raw() for buf in buffers]
+
+    # Offsets are relative to the start of the data section
+    regions, offset = [], 0
+    for block in blocks:
+        regions.append([offset, block.nbytes])
+        offset = _align(offset + block.nbytes)
+    header = json.dumps({"pickle": regions[0],
+                         "buffers": regions[1:]}).encode("ascii")
+    data_start = _align(16 + len(header))
+
+    with open(path, "wb") as f:
+        f.write(_SOURCE_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for (start, _), block in zip(regions, blocks):
+            f.seek(data_start + start)
+            f.write(block)
+        f.truncate(data_start + offset)
+    return data_start + offset
+
+
+def load_source(path):
+    """
+    Load a Source written by :func:`dump_source`.
+
+    The file is memory-mapped read-only; the arrays of the returned Source
+    are read-only views of the mapping.  Loading unpickles the file, so
+    ``path`` must come from a trusted cache directory.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    if view[:8] != _SOURCE_MAGIC:
+        raise ValueError(f"{path} is not a cached source")
+    header_len = int.from_bytes(view[8:16], "little")
+    header = json.loads(bytes(view[16:16 + header_len]))
+    data = view[_align(16 + header_len):]
+
+    start, length = header["pickle"]
+    buffers = [data[o:o + n] for o, n in header["buffers"]]
+    return pickle.loads(data[start:start + length], buffers=buffers)
+
+
+def clone_source(source):
+    """
+    Copy a scopesim ``Source`` for independent use.
+
+    Fields (tables, images, headers) are deep-copied; spectra are shared,
+    as they are treated as read-only throughout ELVIS (see
+    :class:`TemplateCache`) and are by far the largest
+    part of a Source.
+
+    Read-only arrays mapped from the disk tier (see :func:`load_source`)
+    are shared as well, so that a hit does not copy them into memory:
+    such tables get new ``Column`` objects over the mapped data, images
+    keep their mapped data, and only their ``meta`` and headers are
+    copied.  Writing to these arrays raises ``ValueError``; consumers
+    that modify them in place must copy them first.
+    """
+    def is_shared(array):
+        return is_memory_mapped(array) and not array.flags.writeable
+
+    shared = {}
+    containers = [source] + list(getattr(source, "fields", None) or ())
+    for container in containers:
+        spectra = getattr(container, "spectra", None)
+        if isinstance(spectra, dict):
+            for spec in spectra.values():
+                shared[id(spec)] = spec
+
+        for obj in (container, getattr(container, "field", None)):
+            if isinstance(obj, Table):
+                if any(is_shared(column) for column in obj.itercols()):
+                    table = obj.copy(copy_data=False)
+                    table.meta = copy.deepcopy(obj.meta)
+                    shared[id(obj)] = table
+            elif obj is not None:
+                data = getattr(obj, "data", None)
+                if isinstance(data, np.ndarray) and is_shared(data):
+                    shared[id(data)] = data
+    return copy.deepcopy(source, memo=shared)
+
+
+def is_memory_mapped(array) -> bool:
+    """True if ``array`` is a view into a memory-mapped file."""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        if isinstance(array, memoryview):
+            # e.g. arrays unpickled from buffers of an mmap.mmap
+            return isinstance(array.obj, mmap.mmap)
+        array = getattr(array, "base", None)
+    return False
+
+
+def _spectrum_nbytes(spec) -> int:
+    """
+    Heap size of the tabulated arrays behind a synphot spectrum.
+
+    Analytic models and memory-mapped arrays count as 0 bytes.
+    """
+    model = spec.model
+    arrays = [getattr(model, "lookup_table", None)]
+    arrays += list(getattr(model, "points", None) or ())
+    return sum(getattr(arr, "nbytes", 0) for arr in arrays
+               if not is_memory_mapped(arr))
+
+
+class TemplateCache:
+    """
+    Thread-safe LRU cache of read-only values, bounded by total bytes.
+
+    Used for template spectra (``elvis.source.sed_utils``), tabulated
+    blackbodies, degraded templates and the pixel grids of
+    ``elvis.source.rendering``.  Values are returned as stored; callers
+    must not modify them (spectra are handed out as shallow copies, see
+    ``elvis.source.sed_utils._copy_spectrum``).
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory budget for the cached values.
+    sizeof : callable, optional
+        Gives the bytes a value counts against ``max_bytes``.  Defaults
+        to the heap size of a synphot spectrum's arrays.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, sizeof=None):
+        self.max_bytes = max_bytes
+        self.sizeof = _spectrum_nbytes if sizeof is None else sizeof
+        self._spectra = OrderedDict()
+        self._sizes = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return the cached value for ``key`` or ``None``."""
+        with self._lock:
+            spec = self._spectra.get(key)
+            if spec is None:
+                self.stats["misses"] += 1
+                return None
+            self._spectra.move_to_end(key)
+            self.stats["hits"] += 1
+            return spec
+
+    def put(self, key, spec) -> None:
+        """Store ``spec`` under ``key``, evicting least-recently-used entries."""
+        size = self.sizeof(spec)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._spectra:
+                self._nbytes -= self._sizes[key]
+            self._spectra[key] = spec
+            self._spectra.move_to_end(key)
+            self._sizes[key] = size
+            self._nbytes += size
+            while self._nbytes > self.max_bytes:
+                old_key, _ = self._spectra.popitem(last=False)
+                self._nbytes -= self._sizes.pop(old_key)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spectra.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __contains__(self, key) -> bool:
+        return key in self._spectra
+
+    def __len__(self) -> int:
+        return len(self._spectra)
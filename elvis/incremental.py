@@ -0,0 +1,272 @@
+"""
+Incremental re-simulation from configuration diffs.
+
+The five steps of :func:`elvis.pipeline.run_simulation` are modelled as
+stages with declared ETC JSON inputs and upstream dependencies::
+
+    source ─────────────────┐
+                            ├──> observe ──> readout
+    optical_train ─> configure                 ▲
+                                               │
+                                            timesnr
+
+A :class:`IncrementalSimulation` keeps the ETC JSON and the intermediate
+results (Source, configured OpticalTrain, readout) of its last run.  A new
+ETC JSON is diffed section by section against the previous one, and only
+the stages whose inputs changed, plus everything downstream of them, are
+re-run.  Changing only ``timesnr`` (DIT/NDIT) re-runs just the readout;
+changing ``target`` re-runs the Source and everything from ``observe()``
+onward.
+
+Sessions are kept per ``(session_id, instrumentName)`` in a bounded
+:class:`SessionStore`.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+
+from astropy.io import fits
+
+from elvis.cache import canonical_hash
+from elvis.opticaltrain import create_optical_train, configure_optical_train
+from elvis.pipeline import (
+    _create_source,
+    _fallback_header_only,
+    _readout_to_hdulist,
+)
+from elvis.timing import StageTimer
+
+log = logging.getLogger(__name__)
+
+# Stage name → ETC JSON sections it reads and the stages it depends on.
+# Listed in execution order.  ``seeingiqao`` has no applier in
+# elvis.opticaltrain.configurator yet, so it is no stage input.
+STAGES = {
+    "source": {
+        "sections": ("target", "instrument"),
+        "depends": (),
+    },
+    "optical_train": {
+        "sections": ("instrumentName",),
+        "depends": (),
+    },
+    "configure": {
+        "sections": ("instrument", "sky", "seeing"),
+        "depends": ("optical_train",),
+    },
+    "observe": {
+        "sections": (),
+        "depends": ("source", "configure"),
+    },
+    "readout": {
+        "sections": ("timesnr",),
+        "depends": ("observe",),
+    },
+}
+
+
+def changed_sections(old_json: dict | None, new_json: dict) -> set:
+    """
+    Return the top-level sections that differ between two ETC JSON dicts.
+
+    If ``old_json`` is ``None``, every stage input counts as changed.
+    """
+    sections = {s for stage in STAGES.values() for s in stage["sections"]}
+    if old_json is None:
+        return sections
+    return {s for s in sections
+            if canonical_hash(old_json, (s,)) != canonical_hash(new_json, (s,))}
+
+
+def stages_to_run(changed: set) -> list:
+    """
+    Return the stages affected by a set of changed sections, in order.
+
+    A stage is dirty if one of its own input sections changed or if any
+    stage it depends on is dirty.
+    """
+    dirty = []
+    for name, stage in STAGES.items():
+        if (changed.intersection(stage["sections"])
+                or any(dep in dirty for dep in stage["depends"])):
+            dirty.append(name)
+    return dirty
+
+
+class IncrementalSimulation:
+    """
+    Stateful simulation that only re-runs stages whose inputs changed.
+
+    Parameters
+    ----------
+    instrument_name : str
+        The ``instrumentName`` this simulation is bound to.
+    """
+
+    def __init__(self, instrument_name: str):
+        self.instrument_name = instrument_name
+        self.etc_json = None
+        self.source = None
+        self.opt_train = None
+        self.hdul = None
+        self.last_stages = []
+        self.lock = threading.Lock()
+
+    def run(self, etc_json: dict, timer: StageTimer = None) -> fits.HDUList:
+        """
+        Simulate ``etc_json``, re-using results from the previous run.
+
+        Parameters
+        ----------
+        etc_json : dict
+            Complete ETC JSON payload.
+        timer : StageTimer, optional
+            Collects the durations of the stages of
+            :func:`elvis.pipeline.run_simulation`.  Stages that are not
+            re-run are recorded with a duration of zero.
+
+        Returns
+        -------
+        astropy.io.fits.HDUList
+            The returned HDUList is kept for the next run, so the timings
+            are not written into its header.
+        """
+        timer = StageTimer() if timer is None else timer
+        stages = stages_to_run(changed_sections(self.etc_json, etc_json))
+        if self.hdul is None:
+            stages = list(STAGES)
+        self.last_stages = stages
+        log.info("Incremental run for %s: %s", self.instrument_name,
+                 stages or "nothing changed")
+
+        if "source" in stages:
+            with timer.stage("source"):
+                self.source = _create_source(etc_json)
+        else:
+            timer.skip("source")
+
+        # Configuration is applied to a fresh clone, so that settings from
+        # the previous run cannot leak into the new one
+        if "optical_train" in stages or "configure" in stages:
+            try:
+                with timer.stage("optical_train"):
+                    self.opt_train = create_optical_train(self.instrument_name,
+                                                          from_template=True)
+            except ValueError:
+                self.opt_train = None
+        else:
+            timer.skip("optical_train")
+
+        if self.opt_train is None:
+            log.warning("No OpticalTrain available — returning header-only FITS.")
+            self.reset()
+            return _fallback_header_only(etc_json, timer)
+
+        try:
+            if "configure" in stages:
+                with timer.stage("configure"):
+                    configure_optical_train(self.opt_train, etc_json,
+                                            sections=("instrument", "sky",
+                                                      "seeing"))
+            else:
+                timer.skip("configure")
+
+            if "observe" in stages:
+                with timer.stage("observe"):
+                    self.opt_train.observe(self.source)
+            else:
+                timer.skip("observe")
+
+            if "readout" in stages:
+                with timer.stage("readout"):
+                    configure_optical_train(self.opt_train, etc_json,
+                                            sections=("timesnr",))
+                    readout = self.opt_train.readout()
+                with timer.stage("merge"):
+                    self.hdul = _readout_to_hdulist(readout)
+            else:
+                timer.skip("readout")
+                timer.skip("merge")
+        except Exception:
+            self.reset()
+            raise
+
+        self.etc_json = etc_json
+        return self.hdul
+
+    def reset(self) -> None:
+        """Forget all intermediate results."""
+        self.etc_json = None
+        self.source = None
+        self.opt_train = None
+        self.hdul = None
+
+
+class SessionStore:
+    """
+    Bounded LRU store of :class:`IncrementalSimulation` objects.
+
+    Parameters
+    ----------
+    max_sessions : int
+        Maximum number of sessions kept.  Each session holds an observed
+        OpticalTrain, so this bounds memory use.
+    """
+
+    def __init__(self, max_sessions: int = 16):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, instrument_name: str) -> IncrementalSimulation:
+        """Return the session's simulation, creating it if needed."""
+        key = (session_id, instrument_name)
+        with self._lock:
+            sim = self._sessions.get(key)
+            if sim is None:
+                sim = IncrementalSimulation(instrument_name)
+                self._sessions[key] = sim
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return sim
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+SESSIONS = SessionStore()
+
+
+def run_incremental_simulation(etc_json: dict, session_id: str,
+                               store: SessionStore = None,
+                               timer: StageTimer = None) -> fits.HDUList:
+    """
+    Run the pipeline for a session, re-running only changed stages.
+
+    Parameters
+    ----------
+    etc_json : dict
+        Complete ETC JSON payload.
+    session_id : str
+        Identifies the client session (e.g. one ETC form in a browser).
+    store : SessionStore, optional
+        Defaults to the module-level ``SESSIONS``.
+    timer : StageTimer, optional
+        Passed to :meth:`IncrementalSimulation.run`.
+
+    Returns
+    -------
+    astropy.io.fits.HDUList
+    """
+    store = SESSIONS if store is None else store
+    sim = store.get(session_id, etc_json.get("instrumentName", ""))
+    with sim.lock:
+        return sim.run(etc_json, timer=timer)
@@ -0,0 +1,226 @@
+"""
+Asynchronous simulation jobs.
+
+Long simulations should not block a web request for their full duration.
+A :class:`JobQueue` accepts an ETC JSON payload, returns a job ID at once
+and runs the simulation on a background worker pool.  Clients poll the
+job status and download the FITS result when it is done.
+
+Finished results are kept for ``ttl`` seconds.  Results are held in
+memory up to ``max_memory_bytes``; beyond that the oldest results are
+spilled to ``result_dir`` (if given, itself bounded by
+``max_disk_bytes``) or dropped.  At most ``max_jobs`` jobs, queued,
+running or finished, are held at a time; :meth:`JobQueue.submit` raises
+:class:`QueueFull` beyond that.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+EXPIRED = "expired"
+
+
+class QueueFull(RuntimeError):
+    """Raised when a job is submitted to a queue holding ``max_jobs``."""
+
+
+class Job:
+    """State of one submitted simulation."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.result = None          # FITS bytes while held in memory
+        self.result_path = None     # Path once spilled to disk
+        self.size = 0
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable summary for the status endpoint."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+            "size": self.size,
+        }
+
+
+class JobQueue:
+    """
+    Background worker pool for simulations, with a bounded result store.
+
+    Parameters
+    ----------
+    runner : callable
+        ``runner(etc_json)`` returning FITS bytes, e.g.
+        :func:`elvis.pipeline.run_cached_simulation`.
+    max_workers : int
+        Number of worker threads.
+    ttl : float
+        Seconds a finished job (and its result) is kept.
+    max_memory_bytes : int
+        Budget for results held in memory.
+    result_dir : str or Path, optional
+        Directory to spill results to when the memory budget is exceeded.
+    max_disk_bytes : int
+        Budget for spilled results.
+    max_jobs : int
+        Maximum number of jobs held (queued, running or finished but not
+        yet expired).
+    """
+
+    def __init__(self, runner, max_workers: int = 2, ttl: float = 3600.0,
+                 max_memory_bytes: int = 512 * 2**20, result_dir=None,
+                 max_disk_bytes: int = 2 * 2**30, max_jobs: int = 1000):
+        self.runner = runner
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.result_dir = Path(result_dir) if result_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.max_jobs = max_jobs
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="elvis-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+        if self.result_dir is not None:
+            self.result_dir.mkdir(parents=True, exist_ok=True)
+
+    def submit(self, etc_json: dict) -> Job:
+        """
+        Queue a simulation and return its :class:`Job`.
+
+        Raises
+        ------
+        QueueFull
+            If ``max_jobs`` jobs are already held.
+        """
+        job = Job(uuid.uuid4().hex)
+        with self._lock:
+            self._expire()
+            if len(self._jobs) >= self.max_jobs:
+                raise QueueFull(f"Job queue is full ({self.max_jobs} jobs).")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, etc_json)
+        log.info("Queued job %s", job.id)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Return the job, or ``None`` if unknown or expired."""
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def result(self, job_id: str) -> bytes | None:
+        """Return the FITS bytes of a finished job, or ``None``."""
+        job = self.get(job_id)
+        if job is None or job.status != DONE:
+            return None
+        if job.result is not None:
+            return job.result
+        try:
+            return job.result_path.read_bytes()
+        except (AttributeError, FileNotFoundError):
+            return None
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, etc_json: dict) -> None:
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            data = self.runner(etc_json)
+        except Exception as exc:
+            log.warning("Job %s failed: %s", job.id, exc)
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.status = FAILED
+        else:
+            job.result = data
+            job.size = len(data)
+            job.status = DONE
+        job.finished = time.time()
+
+        with self._lock:
+            self._expire()
+            self._enforce_budgets()
+
+    def _expire(self) -> None:
+        """Drop finished jobs older than the TTL.  Caller holds the lock."""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is not None and now - job.finished > self.ttl:
+                self._drop_result(job)
+                job.status = EXPIRED
+                del self._jobs[job_id]
+
+    def _enforce_budgets(self) -> None:
+        """Spill or drop the oldest results.  Caller holds the lock."""
+        finished = sorted((j for j in self._jobs.values() if j.status == DONE),
+                          key=lambda j: j.finished)
+
+        in_memory = [j for j in finished if j.result is not None]
+        memory_bytes = sum(j.size for j in in_memory)
+        for job in in_memory:
+            if memory_bytes <= self.max_memory_bytes:
+                break
+            memory_bytes -= job.size
+            if self.result_dir is not None and job.size <= self.max_disk_bytes:
+                path = self.result_dir / f"{job.id}.fits"
+                try:
+                    path.write_bytes(job.result)
+                except OSError as exc:
+                    # Runs on a worker thread: log, or the error is lost
+                    log.error("Could not spill result of job %s to %s: %s",
+                              job.id, path, exc)
+                    path.unlink(missing_ok=True)
+                    self._expire_job(job)
+                    continue
+                job.result_path = path
+                job.result = None
+            else:
+                self._expire_job(job)
+
+        on_disk = [j for j in finished if j.result_path is not None]
+        disk_bytes = sum(j.size for j in on_disk)
+        for job in on_disk:
+            if disk_bytes <= self.max_disk_bytes:
+                break
+            disk_bytes -= job.size
+            self._expire_job(job)
+
+    def _expire_job(self, job: Job) -> None:
+        self._drop_result(job)
+        job.status = EXPIRED
+        self._jobs.pop(job.id, None)
+        log.info("Dropped result of job %s (budget exceeded)", job.id)
+
+    @staticmethod
+    def _drop_result(job: Job) -> None:
+        job.result = None
+        if job.result_path is not None:
+            try:
+                os.remove(job.result_path)
+            except FileNotFoundError:
+                pass
+            job.result_path = None
@@ -0,0 +1,235 @@
+"""
+Minimal Prometheus-style metrics for the ELVIS server.
+
+Provides counters, gauges and histograms with labels, and renders them in
+the Prometheus text exposition format (version 0.0.4) for a ``/metrics``
+endpoint.  No client library is needed.
+
+Example
+-------
+::
+
+    REQUESTS = REGISTRY.counter("elvis_requests_total", "Requests",
+                                ["endpoint"])
+    REQUESTS.inc(endpoint="/process")
+    print(REGISTRY.render())
+
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Metric:
+    """Base class: a named family of samples keyed by label values."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, "
+                             f"got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_str(self, key: tuple, extra: dict = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"'
+                              for name, value in pairs) + "}"
+
+    def samples(self):
+        """Yield ``(suffix, label_str, value)`` tuples."""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", self._label_str(key), value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.type_name}"]
+        for suffix, label_str, value in self.samples():
+            lines.append(f"{self.name}{suffix}{label_str} {_format(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+        return counts[-1]
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total))
+                     for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                le = "+Inf" if math.isinf(bound) else _format(bound)
+                yield "_bucket", self._label_str(key, {"le": le}), count
+            yield "_sum", self._label_str(key), total
+            yield "_count", self._label_str(key), counts[-1]
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as "
+                                 f"{metric.type_name}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames,
+                              buckets=buckets)
+
+    def add_collector(self, collector) -> None:
+        """Register a callable run before each :meth:`render`.
+
+        Collectors update metrics whose values live elsewhere (e.g. cache
+        statistics) just in time for a scrape.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return (str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _format(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+# --- Metrics shared by the pipeline and the server ---
+
+STAGE_DURATION = REGISTRY.histogram(
+    "elvis_stage_duration_seconds",
+    "Duration of ELVIS pipeline stages.",
+    ["instrument", "stage"])
+
+FALLBACKS = REGISTRY.counter(
+    "elvis_fallback_total",
+    "Simulations that fell back to header-only FITS output.",
+    ["instrument"])
+
+
+def instrument_label(instrument) -> str:
+    """
+    Label value for a client-supplied instrument name.
+
+    Names outside ``INSTRUMENT_MAP`` become ``"unknown"``, so that clients
+    cannot create an unbounded number of series.
+    """
+    from elvis.opticaltrain.factory import INSTRUMENT_MAP
+
+    if not instrument:
+        return ""
+    if isinstance(instrument, str) and instrument in INSTRUMENT_MAP:
+        return instrument
+    return "unknown"
+
+
+def observe_stages(timer, instrument: str) -> None:
+    """Record the stage durations of a :class:`~elvis.timing.StageTimer`."""
+    instrument = instrument_label(instrument)
+    for stage, seconds in timer.timings.items():
+        STAGE_DURATION.observe(seconds, instrument=instrument, stage=stage)
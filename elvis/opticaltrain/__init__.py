@@ -1,2 +1,4 @@
-from .factory import create_optical_train
+from .factory import create_optical_train, OpticalTrainPool
+from .offline import OfflineOpticalTrain
+from .template import clone_optical_train
 from .configurator import configure_optical_train
@@ -12,7 +12,8 @@ import logging
 log = logging.getLogger(__name__)
 
 
-def configure_optical_train(opt_train, etc_json: dict) -> None:
+def configure_optical_train(opt_train, etc_json: dict,
+                            sections=None) -> None:
     """
     Apply ETC configuration to an OpticalTrain in-place.
 
@@ -22,11 +23,12 @@ def configure_optical_train(opt_train, etc_json: dict) -> None:
         The OpticalTrain to configure.
     etc_json : dict
         The full ETC JSON dict.
+    sections : iterable of str, optional
+        Only apply these sections (any of ``CONFIG_SECTIONS``).  Defaults
+        to all of them.
     """
-    _apply_instrument(opt_train, etc_json.get("instrument", {}))
-    _apply_sky(opt_train, etc_json.get("sky", {}))
-    _apply_seeing(opt_train, etc_json.get("seeing", {}))
-    _apply_timesnr(opt_train, etc_json.get("timesnr", {}))
+    for section in CONFIG_SECTIONS if sections is None else sections:
+        _APPLIERS[section](opt_train, etc_json.get(section, {}))
 
 
 def _apply_instrument(opt_train, inst: dict) -> None:
@@ -53,3 +55,14 @@ def _apply_timesnr(opt_train, timesnr: dict) -> None:
     """Apply DIT/NDIT to the detector readout effects."""
     # TODO: set DIT and NDIT on the detector effect.
     log.info("Timesnr config: %s (not yet applied)", timesnr)
+
+
+# ETC JSON section → function applying it, in application order
+_APPLIERS = {
+    "instrument": _apply_instrument,
+    "sky": _apply_sky,
+    "seeing": _apply_seeing,
+    "timesnr": _apply_timesnr,
+}
+
+CONFIG_SECTIONS = tuple(_APPLIERS)
@@ -3,11 +3,26 @@ Step 2: Create a default ScopeSim OpticalTrain for an instrument.
 
 Maps the ETC ``instrumentName`` to an IRDB instrument package and
 instantiates a ScopeSim OpticalTrain with default settings.
+
+:class:`OpticalTrainPool` keeps built OpticalTrains warm between requests
+so the IRDB construction cost is only paid once per pooled instance, and
+``create_optical_train(..., from_template=True)`` clones new instances
+from a per-instrument template instead of re-reading the IRDB.
+``create_optical_train(..., offline=True)`` returns an
+:class:`~elvis.opticaltrain.offline.OfflineOpticalTrain` stand-in that
+needs neither ScopeSim nor the IRDB.
 """
 
 from __future__ import annotations
 
+import copy
 import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from .offline import OfflineOpticalTrain
+from .template import OpticalTrainTemplates
 
 log = logging.getLogger(__name__)
 
@@ -18,7 +33,8 @@ INSTRUMENT_MAP = {
 }
 
 
-def create_optical_train(instrument_name: str):
+def create_optical_train(instrument_name: str, from_template: bool = False,
+                         offline: bool = False):
     """
     Create a default OpticalTrain for the given instrument.
 
@@ -26,6 +42,15 @@ def create_optical_train(instrument_name: str):
     ----------
     instrument_name : str
         The ``instrumentName`` field from the ETC JSON (e.g. ``"eris"``).
+    from_template : bool
+        If ``True``, clone the OpticalTrain from a per-instrument template
+        (see :mod:`elvis.opticaltrain.template`) instead of building it
+        from the IRDB.  Only the first call per instrument pays the full
+        construction cost.
+    offline : bool
+        If ``True``, return an :class:`OfflineOpticalTrain` with the
+        instrument's detector layout instead of a ScopeSim OpticalTrain,
+        e.g. for benchmarks and load tests without an IRDB.
 
     Returns
     -------
@@ -44,6 +69,18 @@ def create_optical_train(instrument_name: str):
             f"Available: {list(INSTRUMENT_MAP)}"
         )
 
+    if offline:
+        log.info("Created offline OpticalTrain for %s", instrument_name)
+        return OfflineOpticalTrain(instrument_name)
+
+    if from_template:
+        return OPTICAL_TRAIN_TEMPLATES.clone(instrument_name)
+
+    return _build_optical_train(instrument_name)
+
+
+def _build_optical_train(instrument_name: str):
+    """Build an OpticalTrain from the IRDB, or ``None`` on failure."""
     pkg = INSTRUMENT_MAP[instrument_name]
 
     try:
@@ -58,3 +95,241 @@ def create_optical_train(instrument_name: str):
             "Falling back to header-only mode.", instrument_name, exc
         )
         return None
+
+
+# One fully loaded OpticalTrain per instrument, cloned for each request
+OPTICAL_TRAIN_TEMPLATES = OpticalTrainTemplates(builder=_build_optical_train)
+
+
+# -------------------------------------------------------------------------
+#  Pool of pre-built OpticalTrains
+# -------------------------------------------------------------------------
+
+class OpticalTrainPool:
+    """
+    Pool of pre-built OpticalTrains, keyed by ``instrumentName``.
+
+    Building an OpticalTrain from the IRDB is by far the most expensive
+    part of a request.  The pool keeps finished OpticalTrains around so
+    that they can be checked out, configured, used and handed back.  On
+    return, every OpticalTrain is reset to the default settings it had
+    when it was built, so no configuration leaks between requests.
+
+    Parameters
+    ----------
+    max_size : int
+        Maximum number of idle OpticalTrains kept per instrument.
+    idle_timeout : float
+        Seconds after which an instrument that has not been used is
+        evicted from the pool.  ``None`` disables eviction.
+    builder : callable, optional
+        ``builder(instrument_name)`` returning a new OpticalTrain or
+        ``None``.  Defaults to :func:`create_optical_train`.
+
+    Examples
+    --------
+    ::
+
+        pool = OpticalTrainPool(max_size=2)
+        with pool.checkout("hawki") as opt_train:
+            opt_train.observe(source)
+            hdul = opt_train.readout()
+
+    """
+
+    def __init__(self, max_size: int = 2, idle_timeout: float | None = 600.0,
+                 builder=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._builder = builder or create_optical_train
+        self._idle = {}         # instrument_name -> [OpticalTrain, ...]
+        self._last_used = {}    # instrument_name -> time.monotonic()
+        self._defaults = {}     # id(opt_train) -> (opt_train, snapshot)
+        self._lock = threading.Lock()
+
+    def acquire(self, instrument_name: str):
+        """
+        Check out an OpticalTrain, building a new one if none is idle.
+
+        Returns
+        -------
+        scopesim.OpticalTrain or None
+            ``None`` if no OpticalTrain can be built (fallback mode).
+
+        Raises
+        ------
+        ValueError
+            If ``instrument_name`` is not in ``INSTRUMENT_MAP``.
+        """
+        with self._lock:
+            self._evict_idle()
+            idle = self._idle.get(instrument_name)
+            if idle:
+                self._last_used[instrument_name] = time.monotonic()
+                log.debug("Reusing pooled OpticalTrain for %s", instrument_name)
+                return idle.pop()
+
+        opt_train = self._builder(instrument_name)
+        if opt_train is not None:
+            snapshot = _snapshot_defaults(opt_train)
+            with self._lock:
+                self._defaults[id(opt_train)] = (opt_train, snapshot)
+        return opt_train
+
+    def release(self, instrument_name: str, opt_train,
+                discard: bool = False) -> None:
+        """
+        Return an OpticalTrain to the pool after resetting it.
+
+        Parameters
+        ----------
+        instrument_name : str
+            The instrument the OpticalTrain was checked out for.
+        opt_train : scopesim.OpticalTrain or None
+            The OpticalTrain returned by :meth:`acquire`.
+        discard : bool
+            Drop the OpticalTrain instead of returning it, e.g. when a
+            simulation failed and its state cannot be trusted.
+        """
+        if opt_train is None:
+            return
+
+        with self._lock:
+            _, snapshot = self._defaults.get(id(opt_train), (None, None))
+
+        if snapshot is None:
+            discard = True
+        elif not discard:
+            try:
+                _restore_defaults(opt_train, snapshot)
+                _drop_observed_state(opt_train)
+            except Exception as exc:
+                log.warning("Could not reset OpticalTrain for %s: %s. "
+                            "Discarding it.", instrument_name, exc)
+                discard = True
+
+        with self._lock:
+            idle = self._idle.setdefault(instrument_name, [])
+            if discard or len(idle) >= self.max_size:
+                self._defaults.pop(id(opt_train), None)
+                return
+            idle.append(opt_train)
+            self._last_used[instrument_name] = time.monotonic()
+
+    @contextmanager
+    def checkout(self, instrument_name: str):
+        """Context manager around :meth:`acquire` / :meth:`release`."""
+        opt_train = self.acquire(instrument_name)
+        try:
+            yield opt_train
+        except BaseException:
+            self.release(instrument_name, opt_train, discard=True)
+            raise
+        self.release(instrument_name, opt_train)
+
+    def warm(self, instrument_names=None) -> None:
+        """
+        Pre-build one OpticalTrain per instrument, e.g. at server start.
+
+        Parameters
+        ----------
+        instrument_names : list of str, optional
+            Defaults to every entry in ``INSTRUMENT_MAP``.
+        """
+        for name in instrument_names or list(INSTRUMENT_MAP):
+            with self._lock:
+                if self._idle.get(name):
+                    continue
+            self.release(name, self.acquire(name))
+
+    def evict_idle(self) -> None:
+        """Drop all instruments that have been idle for too long."""
+        with self._lock:
+            self._evict_idle()
+
+    def clear(self) -> None:
+        """Drop every pooled OpticalTrain."""
+        with self._lock:
+            self._idle.clear()
+            self._last_used.clear()
+            self._defaults.clear()
+
+    def size(self, instrument_name: str | None = None) -> int:
+        """Number of idle OpticalTrains (for one or all instruments)."""
+        with self._lock:
+            if instrument_name is not None:
+                return len(self._idle.get(instrument_name, []))
+            return sum(len(idle) for idle in self._idle.values())
+
+    def _evict_idle(self) -> None:
+        """Evict idle instruments.  Caller must hold ``self._lock``."""
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        for name, last_used in list(self._last_used.items()):
+            if now - last_used <= self.idle_timeout:
+                continue
+            for opt_train in self._idle.pop(name, []):
+                self._defaults.pop(id(opt_train), None)
+            del self._last_used[name]
+            log.info("Evicted idle OpticalTrains for %s", name)
+
+
+# Attributes holding the results of the last observation (ScopeSim:
+# image planes, FOVs, source; offline stand-in: frames) and the value
+# they are reset to.  ``observe()`` rebuilds them.
+OBSERVED_STATE = {
+    "image_planes": [],
+    "_last_fovs": None,
+    "_last_source": None,
+    "_frames": None,
+}
+
+
+def _command_layers(opt_train) -> list:
+    """
+    The layers of an OpticalTrain's UserCommands.
+
+    ScopeSim keeps them on ``UserCommands.cmds``, a ``NestedChainMap``
+    whose ``maps`` are ``RecursiveNestedMapping`` objects with a ``dic``.
+    """
+    chain = getattr(getattr(opt_train, "cmds", None), "cmds", None)
+    return list(getattr(chain, "maps", []))
+
+
+def _snapshot_defaults(opt_train) -> dict:
+    """
+    Record the mutable settings of a freshly built OpticalTrain.
+
+    Only the UserCommands layers and the effect ``meta`` dicts are
+    stored; the (large) effect data containers are never modified by
+    :func:`~elvis.opticaltrain.configure_optical_train`.
+    """
+    optics_manager = getattr(opt_train, "optics_manager", None)
+    effects = getattr(optics_manager, "all_effects", [])
+
+    return {
+        "cmds": [copy.deepcopy(m.dic) for m in _command_layers(opt_train)],
+        "effects": [(eff, copy.deepcopy(eff.meta)) for eff in effects],
+    }
+
+
+def _restore_defaults(opt_train, snapshot: dict) -> None:
+    """Reset an OpticalTrain in-place to a :func:`_snapshot_defaults`."""
+    layers = _command_layers(opt_train)
+    if len(layers) != len(snapshot["cmds"]):
+        raise ValueError("UserCommands layers changed since the snapshot")
+    for cmd_map, dic in zip(layers, snapshot["cmds"]):
+        cmd_map.dic.clear()
+        cmd_map.dic.update(copy.deepcopy(dic))
+
+    for eff, meta in snapshot["effects"]:
+        eff.meta.clear()
+        eff.meta.update(copy.deepcopy(meta))
+
+
+def _drop_observed_state(opt_train) -> None:
+    """Release the arrays of the last observation of an idle OpticalTrain."""
+    for attr, empty in OBSERVED_STATE.items():
+        if hasattr(opt_train, attr):
+            setattr(opt_train, attr, copy.copy(empty))
@@ -0,0 +1,167 @@
+"""
+Offline stand-in for a ScopeSim OpticalTrain.
+
+:class:`OfflineOpticalTrain` needs neither ScopeSim nor an IRDB package.
+It reproduces the detector layout of the real instruments (HAWK-I's
+2x2 mosaic of 2048x2048 detectors, ERIS NIX's single 2048x2048
+detector) and does comparable array work in ``observe()`` and
+``readout()``: a sky background, Gaussian PSFs for point sources, image
+fields pasted onto the focal plane, Poisson and read noise.  The pixel
+values are not photometrically meaningful.
+
+Use it via ``create_optical_train(name, offline=True)``, e.g. for
+benchmarks and load tests on machines without an IRDB.
+"""
+
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+from astropy.io import fits
+
+log = logging.getLogger(__name__)
+
+# instrumentName → pixel scale [arcsec] and detectors as
+# (x centre [arcsec], y centre [arcsec], nx, ny)
+DETECTOR_LAYOUTS = {
+    "hawki": {
+        "pixel_scale": 0.106,
+        # 2x2 mosaic of 2048² detectors with ~15 arcsec gaps
+        "detectors": [(-116.0, -116.0, 2048, 2048),
+                      (116.0, -116.0, 2048, 2048),
+                      (116.0, 116.0, 2048, 2048),
+                      (-116.0, 116.0, 2048, 2048)],
+    },
+    "eris": {
+        "pixel_scale": 0.013,
+        "detectors": [(0.0, 0.0, 2048, 2048)],
+    },
+}
+
+SKY_BACKGROUND = 100.0      # [e-/s/pixel]
+POINT_SOURCE_FLUX = 1e5     # [e-/s] for a point source of weight 1
+PSF_FWHM = 0.6              # [arcsec]
+READ_NOISE = 10.0           # [e-]
+
+
+class OfflineOpticalTrain:
+    """
+    OpticalTrain stand-in with instrument-accurate detector arrays.
+
+    Parameters
+    ----------
+    instrument_name : str
+        Key of ``DETECTOR_LAYOUTS``.
+    layout : dict, optional
+        Custom layout with ``pixel_scale`` and ``detectors`` (see
+        ``DETECTOR_LAYOUTS``), e.g. for a benchmark at a specific size.
+    seed : int, optional
+        Seed of the noise generator.
+    """
+
+    def __init__(self, instrument_name: str, layout: dict = None,
+                 seed: int = None):
+        if layout is None:
+            if instrument_name not in DETECTOR_LAYOUTS:
+                raise ValueError(
+                    f"No offline detector layout for '{instrument_name}'. "
+                    f"Available: {list(DETECTOR_LAYOUTS)}")
+            layout = DETECTOR_LAYOUTS[instrument_name]
+
+        self.instrument_name = instrument_name
+        self.pixel_scale = layout["pixel_scale"]
+        self.detectors = list(layout["detectors"])
+        self.dit = 1.0
+        self.ndit = 1
+        self._rng = np.random.default_rng(seed)
+        self._frames = None
+
+    @classmethod
+    def square(cls, npix: int, pixel_scale: float = 0.1, **kwargs):
+        """An OfflineOpticalTrain with one ``npix`` x ``npix`` detector."""
+        layout = {"pixel_scale": pixel_scale,
+                  "detectors": [(0.0, 0.0, npix, npix)]}
+        return cls("offline", layout=layout, **kwargs)
+
+    @property
+    def n_pixels(self) -> int:
+        return sum(nx * ny for _, _, nx, ny in self.detectors)
+
+    def observe(self, source=None, update: bool = True) -> None:
+        """Render the expected signal [e-] on every detector."""
+        self._frames = []
+        for x0, y0, nx, ny in self.detectors:
+            frame = np.full((ny, nx), SKY_BACKGROUND, dtype=np.float32)
+            for field in getattr(source, "fields", []):
+                self._add_field(frame, field, x0, y0)
+            self._frames.append(frame)
+
+    def readout(self) -> list:
+        """Detector readouts as ``[HDUList(PrimaryHDU, ImageHDU), ...]``."""
+        if self._frames is None:
+            raise RuntimeError("observe() must be called before readout()")
+
+        exptime = self.dit * self.ndit
+        readouts = []
+        for i, ((x0, y0, nx, ny), frame) in enumerate(
+                zip(self.detectors, self._frames), start=1):
+            data = self._rng.poisson(frame * exptime).astype(np.float32)
+            data += self._rng.normal(0.0, READ_NOISE * np.sqrt(self.ndit),
+                                     size=data.shape).astype(np.float32)
+
+            primary = fits.PrimaryHDU()
+            primary.header["INSTRUME"] = self.instrument_name.upper()
+            primary.header["EXPTIME"] = exptime
+            primary.header["HIERARCH ESO DET DIT"] = self.dit
+            primary.header["HIERARCH ESO DET NDIT"] = self.ndit
+            primary.header["ELVISOFF"] = (True, "Offline OpticalTrain stand-in")
+
+            image = fits.ImageHDU(data=data, name=f"DET{i}.DATA")
+            image.header["CRPIX1"] = (nx + 1) / 2 - x0 / self.pixel_scale
+            image.header["CRPIX2"] = (ny + 1) / 2 - y0 / self.pixel_scale
+            image.header["CDELT1"] = self.pixel_scale / 3600
+            image.header["CDELT2"] = self.pixel_scale / 3600
+            image.header["CUNIT1"] = "deg"
+            image.header["CUNIT2"] = "deg"
+            readouts.append(fits.HDUList([primary, image]))
+        return readouts
+
+    def _add_field(self, frame, field, x0: float, y0: float) -> None:
+        """Add a Source field (point source table or image) to a frame."""
+        if isinstance(field, fits.ImageHDU) and field.data is not None:
+            self._paste_image(frame, field.data, -x0 / self.pixel_scale,
+                              -y0 / self.pixel_scale)
+            return
+
+        try:
+            xs, ys = np.asarray(field["x"]), np.asarray(field["y"])
+        except (KeyError, TypeError, ValueError):
+            return
+        weights = (np.asarray(field["weight"])
+                   if "weight" in getattr(field, "colnames", ())
+                   else np.ones(len(xs)))
+
+        sigma = PSF_FWHM / 2.355 / self.pixel_scale
+        half = int(np.ceil(4 * sigma))
+        axis = np.arange(-half, half + 1)
+        psf = np.exp(-0.5 * (axis / sigma) ** 2)
+        psf = np.outer(psf, psf) / psf.sum() ** 2
+        for x, y, weight in zip(xs, ys, weights):
+            dx = (x - x0) / self.pixel_scale
+            dy = (y - y0) / self.pixel_scale
+            self._paste_image(frame, POINT_SOURCE_FLUX * weight * psf, dx, dy)
+
+    @staticmethod
+    def _paste_image(frame, image, dx: float, dy: float) -> None:
+        """Add ``image`` centred ``(dx, dy)`` pixels from the frame centre."""
+        ny, nx = frame.shape
+        ih, iw = image.shape
+        x_start = int(round(nx / 2 + dx - iw / 2))
+        y_start = int(round(ny / 2 + dy - ih / 2))
+        fx0, fy0 = max(x_start, 0), max(y_start, 0)
+        fx1, fy1 = min(x_start + iw, nx), min(y_start + ih, ny)
+        if fx0 >= fx1 or fy0 >= fy1:
+            return
+        frame[fy0:fy1, fx0:fx1] += image[fy0 - y_start:fy1 - y_start,
+                                         fx0 - x_start:fx1 - x_start]
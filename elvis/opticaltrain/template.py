@@ -0,0 +1,158 @@
+"""
+Copy-on-write cloning of template OpticalTrains.
+
+One fully loaded "template" OpticalTrain is kept per instrument and never
+observed with.  Per-request OpticalTrains are cloned from it: the clone
+shares the effect data (transmission curves, PSF cubes, detector maps,
+...) with the template and only copies the mutable settings that
+:func:`~elvis.opticaltrain.configure_optical_train` touches, i.e. the
+UserCommands and the effect ``meta`` dicts.
+
+Shared effect data is treated as read-only.  An effect that needs to
+change its data must assign a new object rather than modify it in-place.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table
+from synphot.spectrum import BaseSpectrum
+
+log = logging.getLogger(__name__)
+
+# OpticalTrain attributes that are rebuilt by ``OpticalTrain.observe()``
+# (via ``update()``) and therefore not worth copying into a clone.
+_REBUILT_ON_OBSERVE = ("fov_manager", "image_planes", "detector_managers",
+                       "_last_fovs", "_last_source")
+
+
+class OpticalTrainTemplates:
+    """
+    Registry of one template OpticalTrain per instrument.
+
+    Parameters
+    ----------
+    builder : callable
+        ``builder(instrument_name)`` returning a fully loaded OpticalTrain,
+        or ``None`` if none can be built.
+    """
+
+    def __init__(self, builder):
+        self._builder = builder
+        self._templates = {}
+        self._build_locks = {}  # instrument_name -> threading.Lock
+        self._lock = threading.Lock()
+
+    def get(self, instrument_name: str):
+        """
+        Return the template for an instrument, building it if needed.
+
+        Builds run under a lock per instrument, so a slow IRDB build only
+        blocks requests for the same instrument.
+        """
+        with self._lock:
+            template = self._templates.get(instrument_name)
+            if template is not None:
+                return template
+            build_lock = self._build_locks.setdefault(instrument_name,
+                                                      threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                template = self._templates.get(instrument_name)
+            if template is None:
+                template = self._builder(instrument_name)
+                if template is not None:
+                    with self._lock:
+                        self._templates[instrument_name] = template
+            return template
+
+    def clone(self, instrument_name: str):
+        """
+        Return a new OpticalTrain cloned from the instrument's template.
+
+        Returns
+        -------
+        scopesim.OpticalTrain or None
+            ``None`` if no template could be built (fallback mode).
+        """
+        template = self.get(instrument_name)
+        if template is None:
+            return None
+        return clone_optical_train(template)
+
+    def clear(self) -> None:
+        """Drop all templates."""
+        with self._lock:
+            self._templates.clear()
+
+    def __contains__(self, instrument_name: str) -> bool:
+        return instrument_name in self._templates
+
+
+def clone_optical_train(opt_train):
+    """
+    Clone an OpticalTrain, sharing its effect data with the original.
+
+    The clone is a deep copy in which every effect data container (and
+    any array, table or HDU attached directly to an effect) is shared by
+    reference.  The FOV manager, image planes and detector managers are
+    not copied, because ``observe()`` rebuilds them anyway.
+
+    Parameters
+    ----------
+    opt_train : scopesim.OpticalTrain
+        The template to clone.
+
+    Returns
+    -------
+    scopesim.OpticalTrain
+    """
+    memo = {}
+    optics_manager = getattr(opt_train, "optics_manager", None)
+    for effect in getattr(optics_manager, "all_effects", []):
+        for data in _shared_effect_data(effect):
+            memo[id(data)] = data
+
+    yaml_dicts = getattr(opt_train, "yaml_dicts", None)
+    if yaml_dicts is not None:
+        memo[id(yaml_dicts)] = yaml_dicts
+
+    # Never walk into the image plane buffers: observe() rebuilds these
+    for name in _REBUILT_ON_OBSERVE:
+        value = vars(opt_train).get(name)
+        if value is not None:
+            memo[id(value)] = [] if isinstance(value, list) else None
+
+    clone = copy.deepcopy(opt_train, memo)
+
+    log.debug("Cloned OpticalTrain (%d shared data objects)", len(memo))
+    return clone
+
+
+def _shared_effect_data(effect):
+    """Yield the (large, read-only) data objects held by an effect."""
+    data_container = getattr(effect, "data_container", None)
+    if data_container is not None:
+        yield data_container
+
+    for name, value in vars(effect).items():
+        if name == "meta":
+            continue
+        if _is_bulk_data(value):
+            yield value
+
+
+def _is_bulk_data(value) -> bool:
+    """
+    Arrays, tables, HDUs and synphot spectra (e.g. the transmission curve
+    of a TERCurve effect) are shared; everything else is copied.
+    """
+    return isinstance(value, (np.ndarray, Table, fits.HDUList,
+                              fits.hdu.base.ExtensionHDU, fits.PrimaryHDU,
+                              BaseSpectrum))
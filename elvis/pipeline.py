@@ -10,84 +10,383 @@ Orchestrates the 5-step workflow from the architecture diagram::
     Step 3: Update OpticalTrain with ETC instrument/sky/seeing config
     Step 4: OpticalTrain.observe(source)
     Step 5: OpticalTrain.readout()  →  FITS HDUList
+
+:func:`run_cached_simulation` wraps the pipeline in a content-addressed
+result cache (see :mod:`elvis.cache`) and returns serialised FITS bytes.
+:func:`run_simulations` runs many payloads in parallel on a long-lived
+process pool whose workers keep their OpticalTrains warm.
 """
 
 from __future__ import annotations
 
+import io
 import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 from astropy.io import fits
 
+from elvis.cache import ResultCache, SourceCache, canonical_hash
+from elvis.metrics import FALLBACKS, instrument_label, observe_stages
+from elvis.timing import StageTimer
 from elvis.source.converter import etc_target_to_scopesim_yaml, to_scopesim_target
-from elvis.opticaltrain import create_optical_train, configure_optical_train
+from elvis.opticaltrain import (
+    create_optical_train,
+    configure_optical_train,
+    OpticalTrainPool,
+)
 
 log = logging.getLogger(__name__)
 
-
-def run_simulation(etc_json: dict) -> fits.HDUList:
+# Pre-built OpticalTrains shared by all requests.  New instances are
+# cloned from per-instrument templates.  The builder looks up
+# ``create_optical_train`` at call time so it can be patched in tests.
+# Set ELVIS_OFFLINE_OPTICAL_TRAIN to use the offline stand-in instead
+# (e.g. for load tests without an IRDB).
+OPTICAL_TRAIN_POOL = OpticalTrainPool(
+    builder=lambda instrument_name: create_optical_train(
+        instrument_name, from_template=True,
+        offline=bool(os.environ.get("ELVIS_OFFLINE_OPTICAL_TRAIN"))),
+)
+
+# Simulation results as FITS bytes.  Set ELVIS_RESULT_CACHE_DIR to enable
+# the on-disk tier.
+RESULT_CACHE = ResultCache(cache_dir=os.environ.get("ELVIS_RESULT_CACHE_DIR"))
+
+# scopesim Sources built from identical ``target`` sections.  Set
+# ELVIS_SOURCE_CACHE_SIZE to change the number of Sources kept in memory
+# and ELVIS_SOURCE_CACHE_DIR to enable the on-disk tier, which is shared
+# by worker processes and survives restarts.  Its files are unpickled, so
+# the directory must only be writable by the ELVIS processes.
+SOURCE_CACHE = SourceCache(
+    max_items=int(os.environ.get("ELVIS_SOURCE_CACHE_SIZE", 128)),
+    cache_dir=os.environ.get("ELVIS_SOURCE_CACHE_DIR"))
+
+
+# Worker processes of the shared batch pool (/process/batch and
+# run_simulations).  Set ELVIS_BATCH_MAX_WORKERS to change it.
+BATCH_MAX_WORKERS = int(os.environ.get("ELVIS_BATCH_MAX_WORKERS",
+                                       min(4, os.cpu_count() or 1)))
+
+# Long-lived batch pools, by number of workers (see batch_executor)
+_BATCH_EXECUTORS = {}
+_BATCH_LOCK = threading.Lock()
+
+
+def run_simulation(etc_json: dict, timer: StageTimer = None) -> fits.HDUList:
     """
     Full ELVIS pipeline: ETC JSON in, FITS HDUList out.
 
+    Every step is timed and the durations are written to the primary
+    header as ``ELVIS TIME <STAGE>`` keywords (in seconds).
+
     Parameters
     ----------
     etc_json : dict
         Complete ETC JSON payload (with ``instrumentName``, ``target``,
         ``sky``, ``instrument``, ``timesnr``, etc.).
+    timer : StageTimer, optional
+        Collects the stage timings, e.g. so the caller can add its own
+        stages (such as FITS serialisation) and report them.
 
     Returns
     -------
     astropy.io.fits.HDUList
     """
+    timer = StageTimer() if timer is None else timer
     instrument_name = etc_json.get("instrumentName", "")
 
     # --- Step 1: Target → scopesim Source ---
-    source = _create_source(etc_json)
+    with timer.stage("source"):
+        source = _create_source(etc_json)
 
-    # --- Step 2: Create default OpticalTrain from IRDB ---
+    # --- Step 2: Check out a default OpticalTrain (built from IRDB) ---
     try:
-        opt_train = create_optical_train(instrument_name)
+        with timer.stage("optical_train"):
+            opt_train = OPTICAL_TRAIN_POOL.acquire(instrument_name)
     except ValueError:
         log.warning("Unknown or missing instrumentName '%s' — "
                     "returning header-only FITS.", instrument_name)
-        return _fallback_header_only(etc_json)
+        return _fallback_header_only(etc_json, timer)
 
     if opt_train is None:
         log.warning("No OpticalTrain available — returning header-only FITS.")
-        return _fallback_header_only(etc_json)
+        return _fallback_header_only(etc_json, timer)
+
+    try:
+        # --- Step 3: Configure OpticalTrain from ETC JSON ---
+        with timer.stage("configure"):
+            configure_optical_train(opt_train, etc_json)
 
-    # --- Step 3: Configure OpticalTrain from ETC JSON ---
-    configure_optical_train(opt_train, etc_json)
+        # --- Step 4: Observe ---
+        with timer.stage("observe"):
+            opt_train.observe(source)
 
-    # --- Step 4: Observe ---
-    opt_train.observe(source)
+        # --- Step 5: Readout → FITS ---
+        with timer.stage("readout"):
+            readout = opt_train.readout()
+    except Exception:
+        OPTICAL_TRAIN_POOL.release(instrument_name, opt_train, discard=True)
+        raise
 
-    # --- Step 5: Readout → FITS ---
-    readout = opt_train.readout()
+    # readout() returns copies, so the OpticalTrain can be reset and reused
+    OPTICAL_TRAIN_POOL.release(instrument_name, opt_train)
 
     # ScopeSim readout() returns a list of detector readouts, each being
     # a list of HDUs: [[PrimaryHDU, ImageHDU], ...].  Merge into one HDUList.
-    hdul = _readout_to_hdulist(readout)
+    with timer.stage("merge"):
+        hdul = _readout_to_hdulist(readout)
+
+    timer.to_header(hdul[0].header)
+    log.debug("%s", timer.log_line(instrument=instrument_name))
 
     return hdul
 
 
+def run_cached_simulation(etc_json: dict, cache: ResultCache = None,
+                          timer: StageTimer = None) -> bytes:
+    """
+    Run the pipeline through the result cache and return FITS bytes.
+
+    The cache key is :func:`elvis.cache.canonical_hash` of the
+    simulation-relevant sections, so payloads that only differ in e.g.
+    their ``output`` flags share a result.  On a hit, Steps 1–5 are
+    skipped entirely.  Header-only fallback results are never cached, as
+    they echo the full JSON (including ``output``).
+
+    Cached bytes carry no ``ELVIS TIME`` keywords: the timings of the
+    current request are written into the primary header of the returned
+    copy, so a hit does not report the timings of the run that filled
+    the cache.
+
+    Parameters
+    ----------
+    etc_json : dict
+        Complete ETC JSON payload.
+    cache : ResultCache, optional
+        Defaults to the module-level ``RESULT_CACHE``.
+    timer : StageTimer, optional
+        Collects the pipeline stage timings plus ``cache`` (lookup) and
+        ``serialise`` (FITS writing).
+
+    Returns
+    -------
+    bytes
+        The serialised FITS file.
+    """
+    cache = RESULT_CACHE if cache is None else cache
+    timer = StageTimer() if timer is None else timer
+    key = canonical_hash(etc_json)
+
+    with timer.stage("cache"):
+        data = cache.get(key)
+    if data is not None:
+        log.info("Result cache hit (%s)", key[:12])
+    else:
+        hdul = run_simulation(etc_json, timer=timer)
+        StageTimer.remove_from_header(hdul[0].header)
+        with timer.stage("serialise"):
+            data = hdulist_to_bytes(hdul)
+
+        if not _is_header_only(hdul):
+            cache.put(key, data)
+
+    observe_stages(timer, etc_json.get("instrumentName", ""))
+    return _with_timings(data, timer)
+
+
+def _with_timings(data: bytes, timer: StageTimer) -> bytes:
+    """
+    Copy of FITS bytes with the timings in the primary header.
+
+    Only the primary header is parsed and rewritten; the rest of the file
+    is copied as is.
+    """
+    buffer = io.BytesIO(data)
+    header = fits.Header.fromfile(buffer)
+    timer.to_header(header)
+    return header.tostring().encode("ascii") + data[buffer.tell():]
+
+
+def run_simulations(payloads, max_workers: int | None = None,
+                    ordered: bool = True):
+    """
+    Run many ETC JSON payloads in parallel across CPU cores.
+
+    Payloads run on the shared batch pool (see :func:`batch_executor`),
+    whose worker processes keep their pooled OpticalTrains warm across
+    calls.
+
+    Parameters
+    ----------
+    payloads : list of dict
+        Complete ETC JSON payloads.
+    max_workers : int, optional
+        Number of worker processes.  Defaults to ``BATCH_MAX_WORKERS``.
+        With ``max_workers=1`` everything runs in the calling process.
+    ordered : bool
+        If ``True``, return a list of HDULists in the order of
+        ``payloads``.  If ``False``, return an iterator of
+        ``(index, HDUList)`` tuples in order of completion.
+
+    Returns
+    -------
+    list of astropy.io.fits.HDUList, or iterator of (int, HDUList)
+
+    Raises
+    ------
+    RuntimeError
+        If a payload fails.  The message names the payload index.
+    """
+    def _iter_hduls():
+        for index, data, error in iter_simulation_results(payloads, max_workers):
+            if error is not None:
+                raise RuntimeError(f"Simulation of payload {index} failed: {error}")
+            yield index, fits.HDUList.fromstring(data)
+
+    if not ordered:
+        return _iter_hduls()
+
+    results = [None] * len(payloads)
+    for index, hdul in _iter_hduls():
+        results[index] = hdul
+    return results
+
+
+def iter_simulation_results(payloads, max_workers: int | None = None,
+                            executor=None):
+    """
+    Yield ``(index, fits_bytes, error)`` for each payload as it completes.
+
+    This is the engine behind :func:`run_simulations` and
+    ``/process/batch``.  Failures do not stop the batch: ``fits_bytes`` is
+    ``None`` and ``error`` holds the error message instead, also when a
+    worker process dies.  Closing the generator (e.g. when the client
+    disconnects) cancels the payloads that have not started yet, without
+    waiting for the running ones.
+
+    Parameters
+    ----------
+    payloads : iterable of dict
+        Complete ETC JSON payloads.
+    max_workers : int, optional
+        Size of the shared batch pool to use.  Defaults to
+        ``BATCH_MAX_WORKERS``; ``1`` runs in the calling process.
+    executor : concurrent.futures.Executor, optional
+        Run on this executor instead of the shared batch pool.
+    """
+    payloads = list(payloads)
+    max_workers = max_workers or BATCH_MAX_WORKERS
+
+    if executor is None and (max_workers == 1 or len(payloads) <= 1):
+        for index, payload in enumerate(payloads):
+            yield _run_batch_payload(index, payload)
+        return
+
+    executor = executor or batch_executor(max_workers)
+    futures = {executor.submit(_run_batch_payload, index, payload): index
+               for index, payload in enumerate(payloads)}
+    try:
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as exc:
+                if isinstance(exc, BrokenProcessPool):
+                    _discard_batch_executor(executor)
+                index = futures[future]
+                log.warning("Batch payload %d failed: %s", index, exc)
+                yield index, None, f"{type(exc).__name__}: {exc}"
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def batch_executor(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    The shared, long-lived process pool for batch simulations.
+
+    Every worker warms its ``OPTICAL_TRAIN_POOL`` when it starts, so
+    OpticalTrains are built once per worker, not once per batch.  A pool
+    whose workers died is replaced on the next call.
+    """
+    max_workers = max_workers or BATCH_MAX_WORKERS
+    with _BATCH_LOCK:
+        executor = _BATCH_EXECUTORS.get(max_workers)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=max_workers,
+                                           initializer=_warm_batch_worker)
+            _BATCH_EXECUTORS[max_workers] = executor
+        return executor
+
+
+def _discard_batch_executor(executor) -> None:
+    """Drop a broken shared pool, so the next batch starts a new one."""
+    with _BATCH_LOCK:
+        for size, pooled in list(_BATCH_EXECUTORS.items()):
+            if pooled is executor:
+                del _BATCH_EXECUTORS[size]
+                executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _warm_batch_worker() -> None:
+    """Initializer of batch worker processes."""
+    try:
+        OPTICAL_TRAIN_POOL.warm()
+    except Exception as exc:
+        log.warning("Could not warm OpticalTrains in batch worker: %s", exc)
+
+
+def _run_batch_payload(index: int, payload: dict) -> tuple:
+    """Worker: run one payload, returning ``(index, fits_bytes, error)``."""
+    try:
+        return index, run_cached_simulation(payload), None
+    except Exception as exc:
+        log.warning("Batch payload %d failed: %s", index, exc)
+        return index, None, f"{type(exc).__name__}: {exc}"
+
+
+def hdulist_to_bytes(hdul: fits.HDUList) -> bytes:
+    """Serialise an HDUList to FITS bytes."""
+    mem_buf = io.BytesIO()
+    hdul.writeto(mem_buf)
+    return mem_buf.getvalue()
+
+
+def _is_header_only(hdul: fits.HDUList) -> bool:
+    """True if no HDU carries pixel data (i.e. the fallback result)."""
+    return all(hdu.data is None for hdu in hdul)
+
+
 def _create_source(etc_json: dict):
     """
     Step 1: Convert the ETC JSON target section to a scopesim Source.
 
     Falls back to ``None`` if the conversion fails (e.g. unsupported
     morphology type), letting the caller decide how to handle it.
+
+    Sources are memoised in ``SOURCE_CACHE`` by a canonical hash of the
+    ``target`` and ``instrument`` sections (template spectra are degraded
+    to the instrument mode); every call returns its own copy.
     """
     target = etc_json.get("target")
     if target is None:
         log.warning("No 'target' section in ETC JSON.")
         return None
 
+    key = canonical_hash(etc_json, sections=("target", "instrument"))
+    source = SOURCE_CACHE.get(key)
+    if source is not None:
+        log.debug("Source cache hit %s", key[:12])
+        return source
+
     try:
         yaml_dict = etc_target_to_scopesim_yaml(etc_json)
         source_target = to_scopesim_target(yaml_dict)
         source = source_target.to_source()
         log.info("Created scopesim Source: %s", yaml_dict.get("target_class"))
+        SOURCE_CACHE.put(key, source)
         return source
     except Exception as exc:
         log.warning("Could not create Source from ETC JSON: %s", exc)
@@ -133,7 +432,8 @@ def _readout_to_hdulist(readout) -> fits.HDUList:
 #  Fallback: JSON → FITS headers (current behaviour while stubs exist)
 # -------------------------------------------------------------------------
 
-def _fallback_header_only(etc_json: dict) -> fits.HDUList:
+def _fallback_header_only(etc_json: dict,
+                          timer: StageTimer = None) -> fits.HDUList:
     """
     Fallback pipeline: dump the ETC JSON into FITS header keywords.
 
@@ -152,6 +452,10 @@ def _fallback_header_only(etc_json: dict) -> fits.HDUList:
                 except ValueError:
                     header[new_key] = str(value)
 
+    FALLBACKS.inc(instrument=instrument_label(etc_json.get("instrumentName")))
+
     hdu = fits.PrimaryHDU()
     _add_to_header(etc_json, hdu.header)
+    if timer is not None:
+        timer.to_header(hdu.header)
     return fits.HDUList([hdu])
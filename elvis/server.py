@@ -1,14 +1,31 @@
-from flask import Flask, request, send_file, jsonify, render_template
+from flask import (Flask, Response, g, request, send_file, jsonify,
+                   render_template)
 import os
 import io
+import logging
+import tarfile
+import time
 
-from elvis.pipeline import run_simulation
+from elvis.metrics import REGISTRY, instrument_label, observe_stages
+from elvis.pipeline import (
+    RESULT_CACHE,
+    SOURCE_CACHE,
+    run_cached_simulation,
+    hdulist_to_bytes,
+    iter_simulation_results,
+    _with_timings,
+)
+from elvis.incremental import run_incremental_simulation
+from elvis.jobs import JobQueue, QueueFull, DONE, FAILED
+from elvis.timing import StageTimer
 from elvis.eris_etc_form import eris_etc_form_bp
 from elvis.hawki_etc_form import hawki_etc_form_bp
 
 app = Flask(__name__)
 app.register_blueprint(eris_etc_form_bp)
 app.register_blueprint(hawki_etc_form_bp)
+log = logging.getLogger(__name__)
+
 PORT = 5000  # Change this to your desired port
 
 # Instrument registry — each ETC form blueprint adds an entry here.
@@ -30,6 +47,77 @@ INSTRUMENTS = [
 
 app.jinja_env.globals["INSTRUMENTS"] = INSTRUMENTS
 
+# Background simulations for /process?async=true.  Set ELVIS_JOB_DIR to
+# spill finished results to disk once the memory budget is used up, and
+# ELVIS_JOB_MAX to change the number of jobs held before new ones get 429.
+JOB_QUEUE = JobQueue(run_cached_simulation,
+                     result_dir=os.environ.get("ELVIS_JOB_DIR"),
+                     max_jobs=int(os.environ.get("ELVIS_JOB_MAX", 1000)))
+
+# --- Operational metrics, exposed on /metrics ---
+REQUESTS = REGISTRY.counter(
+    "elvis_requests_total", "HTTP requests handled.",
+    ["endpoint", "method", "status"])
+REQUEST_LATENCY = REGISTRY.histogram(
+    "elvis_request_duration_seconds", "HTTP request latency.",
+    ["endpoint", "instrument"])
+IN_FLIGHT = REGISTRY.gauge(
+    "elvis_requests_in_flight", "HTTP requests currently being handled.")
+OUTPUT_BYTES = REGISTRY.counter(
+    "elvis_output_bytes_total", "FITS bytes returned to clients.",
+    ["endpoint"])
+RESULT_CACHE_STATS = REGISTRY.gauge(
+    "elvis_result_cache", "Result cache statistics since start.", ["stat"])
+RESULT_CACHE_HIT_RATIO = REGISTRY.gauge(
+    "elvis_result_cache_hit_ratio", "Fraction of result cache lookups that hit.")
+SOURCE_CACHE_STATS = REGISTRY.gauge(
+    "elvis_source_cache", "Source cache statistics since start.", ["stat"])
+
+
+def _collect_cache_stats():
+    stats = dict(RESULT_CACHE.stats, entries=len(RESULT_CACHE))
+    for stat, value in stats.items():
+        RESULT_CACHE_STATS.set(value, stat=stat)
+    lookups = stats["hits"] + stats["misses"]
+    RESULT_CACHE_HIT_RATIO.set(stats["hits"] / lookups if lookups else 0.0)
+    stats = dict(SOURCE_CACHE.stats, entries=len(SOURCE_CACHE))
+    for stat, value in stats.items():
+        SOURCE_CACHE_STATS.set(value, stat=stat)
+
+
+REGISTRY.add_collector(_collect_cache_stats)
+
+
+def _endpoint() -> str:
+    """Route pattern of the current request (bounded label cardinality)."""
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+@app.before_request
+def _start_request_metrics():
+    g.request_start = time.perf_counter()
+    IN_FLIGHT.inc()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    data = request.get_json(silent=True) if request.is_json else None
+    instrument = instrument_label(data.get("instrumentName")) \
+        if isinstance(data, dict) else ""
+    endpoint = _endpoint()
+
+    REQUESTS.inc(endpoint=endpoint, method=request.method,
+                 status=response.status_code)
+    REQUEST_LATENCY.observe(time.perf_counter() - g.request_start,
+                            endpoint=endpoint, instrument=instrument)
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    if "request_start" in g:
+        IN_FLIGHT.dec()
+
 
 @app.route("/")
 def index():
@@ -43,23 +131,138 @@ def process_json():
         return jsonify({"error": "Invalid input, expected JSON"}), 400
 
     data = request.get_json()
-    hdul = run_simulation(data)
+
+    # With ?async=true, queue the simulation and return a job ID at once
+    if request.args.get("async", "").lower() in ("1", "true", "yes"):
+        try:
+            job = JOB_QUEUE.submit(data)
+        except QueueFull as exc:
+            return jsonify({"error": str(exc)}), 429
+        status_url = f"/jobs/{job.id}"
+        return (jsonify({"job_id": job.id, "status": job.status,
+                         "status_url": status_url,
+                         "result_url": f"{status_url}/result"}),
+                202, {"Location": status_url})
+
+    # With ?session=<id>, only the stages whose inputs changed since the
+    # session's previous request are re-run
+    timer = StageTimer()
+    session_id = request.args.get("session")
+    if session_id:
+        hdul = run_incremental_simulation(data, session_id, timer=timer)
+        with timer.stage("serialise"):
+            fits_bytes = hdulist_to_bytes(hdul)
+        observe_stages(timer, data.get("instrumentName", ""))
+        fits_bytes = _with_timings(fits_bytes, timer)
+    else:
+        fits_bytes = run_cached_simulation(data, timer=timer)
+
+    log.info("%s", timer.log_line(instrument=data.get("instrumentName"),
+                                  session=session_id,
+                                  output_bytes=len(fits_bytes)))
+    OUTPUT_BYTES.inc(len(fits_bytes), endpoint="/process")
 
     # Check optional flag: use disk or memory
     use_disk = data.get("output", {}).get("use_disk", False)
 
     if use_disk:
         fits_filename = os.path.join(os.getcwd(), "output.fits")
-        hdul.writeto(fits_filename, overwrite=True)
-        return jsonify({"filepath": fits_filename})
+        with open(fits_filename, "wb") as f:
+            f.write(fits_bytes)
+        response = jsonify({"filepath": fits_filename})
 
     else:
-        mem_buf = io.BytesIO()
-        hdul.writeto(mem_buf)
-        mem_buf.seek(0)
-        return send_file(mem_buf, as_attachment=True,
-                         download_name="output.fits",
-                         mimetype="application/fits")
+        mem_buf = io.BytesIO(fits_bytes)
+        response = send_file(mem_buf, as_attachment=True,
+                             download_name="output.fits",
+                             mimetype="application/fits")
+
+    response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status of an asynchronous simulation job."""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown or expired job '{job_id}'"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Download the FITS result of a finished job."""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown or expired job '{job_id}'"}), 404
+    if job.status == FAILED:
+        return jsonify(job.to_dict()), 500
+    if job.status != DONE:
+        return jsonify(job.to_dict()), 409
+
+    fits_bytes = JOB_QUEUE.result(job_id)
+    if fits_bytes is None:
+        return jsonify({"error": f"Result of job '{job_id}' has expired"}), 404
+    OUTPUT_BYTES.inc(len(fits_bytes), endpoint="/jobs/<job_id>/result")
+    return send_file(io.BytesIO(fits_bytes), as_attachment=True,
+                     download_name=f"{job_id}.fits",
+                     mimetype="application/fits")
+
+
+@app.route('/process/batch', methods=['POST'])
+def process_batch():
+    """
+    Simulate a list of ETC JSON payloads and stream back a tar archive.
+
+    The body is either a JSON list of payloads or ``{"payloads": [...]}``.
+    Results are added to the archive as they complete, named
+    ``result_<index>.fits`` after the payload's position in the list.
+    Failed payloads produce a ``result_<index>.error.txt`` member instead.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Invalid input, expected JSON"}), 400
+
+    data = request.get_json()
+    payloads = data.get("payloads") if isinstance(data, dict) else data
+    if not isinstance(payloads, list) or not all(
+            isinstance(p, dict) for p in payloads):
+        return jsonify({"error": "Expected a list of ETC JSON payloads"}), 400
+
+    # Runs on the shared batch pool (see elvis.pipeline.BATCH_MAX_WORKERS)
+    results = iter_simulation_results(payloads)
+    return Response(_tar_stream(results), mimetype="application/x-tar",
+                    headers={"Content-Disposition":
+                             "attachment; filename=results.tar"})
+
+
+def _tar_stream(results):
+    """Yield a tar archive chunk by chunk as ``results`` come in."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w|") as tar:
+        for index, fits_bytes, error in results:
+            if error is None:
+                name, content = f"result_{index:04d}.fits", fits_bytes
+                OUTPUT_BYTES.inc(len(content), endpoint="/process/batch")
+            else:
+                name, content = (f"result_{index:04d}.error.txt",
+                                 error.encode("utf-8"))
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(content))
+
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+@app.route('/metrics')
+def metrics():
+    """Operational metrics in the Prometheus text exposition format."""
+    return Response(REGISTRY.render(),
+                    content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,132 @@
+"""
+Tabulated blackbody spectra shared by all blackbody code paths.
+
+Planck's law is evaluated with NumPy on the fixed logarithmic grid
+``BLACKBODY_WAVESET`` instead of building one synphot ``BlackBody1D`` model
+per request.  Tabulated spectra are memoised in ``BLACKBODY_CACHE`` per
+``(temperature, band, magnitude, magnitude system)``:
+
+- ``get_blackbody(T)`` is Planck's law in PHOTLAM per steradian, the same
+  units as ``synphot.models.BlackBody1D``
+- ``get_blackbody(T, band, mag, magsys)`` is scaled to a Vega or AB
+  magnitude in any band of ``elvis.source.filters.FILTERS``
+
+Outside ``BLACKBODY_WAVESET`` (e.g. at the rest wavelengths of a strongly
+redshifted source) the spectra fall back to evaluating Planck's law.
+
+Used by ``sed_utils.get_blackbody_spectrum``, ``sed.get_spectra`` and the
+``"blackbody:<T> K"`` spectra of ``source.converter.to_scopesim_target``.
+"""
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+from astropy import constants as const
+from astropy import units as u
+from synphot import Empirical1D, SourceSpectrum
+
+from elvis.source.filters import FILTER_WAVESET, normalisation_scale
+from elvis.cache import TemplateCache
+from elvis.source.sed_utils import _copy_spectrum
+
+# 0.1-100 micron at R ~ 2000.  Linear interpolation between the grid
+# points is accurate to better than 1e-4 of the Planck curve.  Shared with
+# the filter table, so normalisation needs no resampling.
+BLACKBODY_WAVESET = FILTER_WAVESET
+
+# Planck's law in photon units: wavelength in Angstrom, flux in PHOTLAM / sr
+_HC_OVER_K = (const.h * const.c / const.k_B).to_value(u.AA * u.K)
+_TWO_C = 2 * const.c.to_value(u.AA / u.s) * (u.cm**2).to(u.AA**2)
+
+# Tabulated blackbodies shared by all requests.  ELVIS_BLACKBODY_CACHE_BYTES
+# sets the memory budget (~220 kB per spectrum).
+BLACKBODY_CACHE = TemplateCache(
+    max_bytes=int(os.environ.get("ELVIS_BLACKBODY_CACHE_BYTES", 32 * 2**20)))
+
+
+def planck_photlam(wave, temperature):
+    """
+    Planck's law in photon units.
+
+    Parameters:
+    - wave: wavelengths in Angstrom (array)
+    - temperature: temperature(s) in K, broadcast against ``wave``
+
+    Returns:
+    - array of flux densities in PHOTLAM per steradian
+    """
+    with np.errstate(over="ignore", divide="ignore"):
+        return _TWO_C / wave**4 / np.expm1(_HC_OVER_K / (wave * temperature))
+
+
+class TabulatedBlackBody1D(Empirical1D):
+    """
+    ``Empirical1D`` blackbody that evaluates Planck's law off its grid.
+
+    Parameters:
+    - temperature: temperature in K
+    - scale: factor applied to Planck's law (the normalisation)
+    - kwargs: ``points`` [Angstrom] and ``lookup_table`` [PHOTLAM] as for
+      ``Empirical1D``
+    """
+
+    def __init__(self, temperature, scale=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.temperature = temperature
+        self.scale = scale
+
+    def evaluate(self, inputs):
+        flux = super().evaluate(inputs)
+        wave = np.asarray(inputs, dtype=float)
+        grid = self.points[0]
+        outside = (wave < grid[0]) | (wave > grid[-1])
+        if np.any(outside):
+            flux = np.where(outside,
+                            self.scale * planck_photlam(wave, self.temperature),
+                            flux)
+        return flux
+
+
+def get_blackbody(temperature, band=None, mag=None, magsys="vega"):
+    """
+    Tabulated blackbody spectrum, optionally normalised to a magnitude.
+
+    Parameters:
+    - temperature: temperature in K (float or Quantity)
+    - band: band of ``elvis.source.filters.FILTERS`` to normalise in
+    - mag: magnitude in ``band`` (float or Quantity in mag)
+    - magsys: ``"vega"`` or ``"AB"``
+
+    Returns:
+    - SourceSpectrum (``TabulatedBlackBody1D`` on ``BLACKBODY_WAVESET``).
+      A copy; the cached spectrum is never modified.
+    """
+    temperature = float(u.Quantity(temperature, u.K).value)
+    if (band is None) != (mag is None):
+        raise ValueError("Blackbody normalisation needs both band and mag.")
+    if mag is not None:
+        mag = float(u.Quantity(mag, u.mag).value)
+        magsys = magsys.lower()
+    else:
+        magsys = None
+
+    key = (temperature, band, mag, magsys)
+    spec = BLACKBODY_CACHE.get(key)
+    if spec is None:
+        wave = BLACKBODY_WAVESET.to_value(u.AA)
+        if band is None:
+            flux = planck_photlam(wave, temperature)
+            scale = 1.0
+        else:
+            # The unnormalised curve is memoised too, and shared
+            flux = get_blackbody(temperature).model.lookup_table
+            scale = normalisation_scale(flux, band, mag, magsys)
+            flux = flux * scale
+        model = TabulatedBlackBody1D(temperature, scale, points=wave,
+                                     lookup_table=flux, fill_value=0,
+                                     meta={"temperature": temperature})
+        spec = SourceSpectrum(model)
+        BLACKBODY_CACHE.put(key, spec)
+    return _copy_spectrum(spec)
@@ -0,0 +1,357 @@
+"""
+Streaming ingestion of point-source catalogues (e.g. crowded fields).
+
+A catalogue is a FITS binary table or a CSV file with a header line and
+the columns
+
+- x, y: positions [arcsec]
+- mag: magnitude (optional, default 0)
+- spec_type: spectral type, e.g. ``"G2V"`` (optional).  FITS columns keep
+  their width; in CSV files values longer than ``SPEC_TYPE_MAX_LENGTH``
+  bytes raise a ValueError rather than being truncated.
+
+Column names are matched case-insensitively, and CSV headers and values
+may be quoted.  The catalogue is read in
+chunks of at most ``chunk_rows`` rows, and the rows of a chunk are
+limited further so that its arrays stay below ``max_bytes``.  For FITS
+tables only the rows of the chunk being converted are memory-mapped;
+CSV files are parsed chunk by chunk.  At no point is there a Python
+object per star.  ``max_bytes`` bounds the memory of one chunk and the
+field built from it: it holds for :func:`iter_catalogue` and
+:func:`iter_catalogue_fields`, while :func:`read_catalogue_field` needs
+the whole field plus one chunk.
+
+:func:`iter_catalogue_fields` turns the chunks into
+``PointSourceMorphology`` tables whose ``ref`` column indexes one list
+of spectral types shared by all chunks, and :func:`read_catalogue_field`
+joins them into a single field.  Weights are fluxes relative to a
+0 mag source, ``10**(-0.4 * mag)``, so the spectra of the spectral types
+should be normalised to 0 mag.
+
+Set ELVIS_CATALOGUE_CHUNK_ROWS and ELVIS_CATALOGUE_MAX_BYTES to change
+the defaults.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import warnings
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from elvis.source.morphology import PointSourceMorphology
+
+CATALOGUE_CHUNK_ROWS = int(os.environ.get("ELVIS_CATALOGUE_CHUNK_ROWS",
+                                          1_000_000))
+CATALOGUE_MAX_BYTES = int(os.environ.get("ELVIS_CATALOGUE_MAX_BYTES",
+                                         64 * 2**20))
+
+# Longest spectral type in a CSV catalogue, in bytes
+SPEC_TYPE_MAX_LENGTH = 32
+
+# Column → dtype of the chunks.  FITS spec_type columns keep their width;
+# CSV ones are parsed into a few bytes more than SPEC_TYPE_MAX_LENGTH (a
+# multiple of 8, see _factorise), so that longer values are detected
+CATALOGUE_COLUMNS = {
+    "x": np.dtype(np.float32),
+    "y": np.dtype(np.float32),
+    "mag": np.dtype(np.float32),
+    "spec_type": np.dtype(f"S{SPEC_TYPE_MAX_LENGTH + 8}"),
+}
+REQUIRED_COLUMNS = ("x", "y")
+
+FITS_SUFFIXES = (".fits", ".fit", ".fts")
+
+# Bytes per row, beyond the chunk's columns, of the field built from the
+# chunk (x, y, ref, weight and spec_type: 28) and of the temporaries of
+# parsing and factorising it (an upper bound of the measured use, CSV
+# being the larger)
+_WORKING_ROW_BYTES = 160
+
+
+def chunk_rows_for(columns, chunk_rows=None, max_bytes=None, dtypes=None):
+    """
+    Rows per chunk such that reading a chunk and building its field take
+    at most ``max_bytes``.
+
+    Parameters:
+    - columns: names of the catalogue columns that are read
+    - chunk_rows: upper limit (default ``CATALOGUE_CHUNK_ROWS``)
+    - max_bytes: memory ceiling (default ``CATALOGUE_MAX_BYTES``)
+    - dtypes: dtypes of columns that differ from ``CATALOGUE_COLUMNS``
+
+    Returns:
+    - int, at least 1
+    """
+    chunk_rows = CATALOGUE_CHUNK_ROWS if chunk_rows is None else chunk_rows
+    max_bytes = CATALOGUE_MAX_BYTES if max_bytes is None else max_bytes
+    dtypes = {**CATALOGUE_COLUMNS, **(dtypes or {})}
+    row_bytes = sum(np.dtype(dtypes[c]).itemsize for c in columns) \
+        + _WORKING_ROW_BYTES
+    return max(1, min(int(chunk_rows), int(max_bytes) // row_bytes))
+
+
+def _match_columns(names, path):
+    """Catalogue column → name in the file, for the columns present."""
+    lookup = {name.strip().lower(): name for name in names}
+    found = {c: lookup[c] for c in CATALOGUE_COLUMNS if c in lookup}
+    missing = [c for c in REQUIRED_COLUMNS if c not in found]
+    if missing:
+        raise ValueError(f"Catalogue '{path}' has no column(s) {missing}; "
+                         f"found {list(names)}.")
+    return found
+
+
+def _fits_column(raw, dtype, bscale, bzero):
+    """Native-endian copy of a raw FITS table column, scaled if needed."""
+    if dtype.kind == "S":
+        return np.char.rstrip(raw).astype(dtype)
+    column = raw.astype(dtype)
+    if bscale not in (None, 1):
+        column *= bscale
+    if bzero not in (None, 0):
+        column += bzero
+    return column
+
+
+def _iter_fits(path, chunk_rows, max_bytes):
+    with fits.open(path, memmap=True) as hdul:
+        hdu = next((h for h in hdul if isinstance(h, fits.BinTableHDU)), None)
+        if hdu is None:
+            raise ValueError(f"Catalogue '{path}' has no binary table.")
+        columns = _match_columns(hdu.columns.names, path)
+        scaling = {c: (hdu.columns[name].bscale, hdu.columns[name].bzero)
+                   for c, name in columns.items()}
+        # Raw (big-endian) rows as stored in the file
+        record = np.dtype(hdu.data.dtype.descr)
+        offset = hdu.fileinfo()["datLoc"]
+        nrows = hdu.header["NAXIS2"]
+
+    dtypes = dict(CATALOGUE_COLUMNS)
+    if "spec_type" in columns:
+        # Strings keep the width of the file's column: nothing is cut off
+        dtypes["spec_type"] = np.dtype(
+            f"S{record[columns['spec_type']].itemsize}")
+    step = chunk_rows_for(columns, chunk_rows, max_bytes, dtypes)
+    for start in range(0, nrows, step):
+        # Map only this chunk: its pages are released when the map is
+        # dropped, so the resident memory stays bounded
+        rows = np.memmap(path, dtype=record, mode="r",
+                         offset=offset + start * record.itemsize,
+                         shape=(min(step, nrows - start),))
+        chunk = {c: _fits_column(rows[name], dtypes[c], *scaling[c])
+                 for c, name in columns.items()}
+        del rows
+        yield chunk
+        del chunk
+
+
+def _iter_csv(path, chunk_rows, max_bytes):
+    with open(path, newline="") as f:
+        header = next((line for line in f
+                       if line.strip() and not line.startswith("#")), None)
+        if header is None:
+            raise ValueError(f"Catalogue '{path}' is empty.")
+        reader = csv.reader([header], skipinitialspace=True)
+        names = [name.strip() for name in next(reader)]
+        columns = _match_columns(names, path)
+        usecols = [names.index(name) for name in columns.values()]
+        dtype = [(c, CATALOGUE_COLUMNS[c]) for c in columns]
+        step = chunk_rows_for(columns, chunk_rows, max_bytes)
+        while True:
+            with warnings.catch_warnings():
+                # loadtxt warns on the empty read at the end of the file
+                warnings.simplefilter("ignore", UserWarning)
+                table = np.loadtxt(islice(f, step), delimiter=",",
+                                   usecols=usecols, dtype=dtype,
+                                   comments="#", quotechar='"', ndmin=1)
+            if not table.size:
+                return
+            # Contiguous copies, so that fields do not keep the whole
+            # structured chunk alive
+            chunk = {c: np.ascontiguousarray(table[c]) for c in columns}
+            del table
+            if "spec_type" in chunk:
+                spec_type = np.char.strip(chunk["spec_type"])
+                # Values longer than allowed use the byte after the limit
+                # (and may have been truncated by the parser)
+                overflow = spec_type.view(np.uint8).reshape(
+                    len(spec_type), -1)[:, SPEC_TYPE_MAX_LENGTH]
+                if overflow.any():
+                    raise ValueError(
+                        f"Catalogue '{path}' has spectral types longer than "
+                        f"{SPEC_TYPE_MAX_LENGTH} bytes.")
+                chunk["spec_type"] = spec_type
+                del spec_type, overflow
+            yield chunk
+            # Release the chunk before the next one is parsed
+            del chunk
+
+
+def iter_catalogue(path, chunk_rows=None, max_bytes=None):
+    """
+    Read a catalogue in chunks.
+
+    Parameters:
+    - path: FITS binary table or CSV file
+    - chunk_rows: maximum rows per chunk (default ``CATALOGUE_CHUNK_ROWS``)
+    - max_bytes: memory ceiling of a chunk (default ``CATALOGUE_MAX_BYTES``)
+
+    Yields:
+    - dict of column name → 1D array (dtypes of ``CATALOGUE_COLUMNS``),
+      for the columns present in the file
+    """
+    path = Path(path)
+    if path.name.lower().endswith(FITS_SUFFIXES):
+        yield from _iter_fits(path, chunk_rows, max_bytes)
+    else:
+        yield from _iter_csv(path, chunk_rows, max_bytes)
+
+
+def _factorise(values):
+    """
+    Distinct values of a fixed-width bytes array, and the index of every
+    element in them.
+
+    Same as ``np.unique(values, return_inverse=True)`` (up to the order of
+    the distinct values), but sorts 8-byte words as integers, which is
+    much faster than sorting the strings.
+    """
+    if values.itemsize % 8 or not values.flags.c_contiguous:
+        return np.unique(values, return_inverse=True)
+    words = values.view(np.uint64).reshape(len(values), -1)
+    # Spectral types are short: usually only the first word is used
+    words = [word for word in words.T if word.any()] or [words[:, 0]]
+    _, codes = np.unique(words[0], return_inverse=True)
+    for word in words[1:]:
+        distinct, inverse = np.unique(word, return_inverse=True)
+        # Both factors are at most len(values): the product fits int64
+        _, codes = np.unique(codes * len(distinct) + inverse,
+                             return_inverse=True)
+    # Any element of each value will do as its representative
+    first = np.empty(codes.max() + 1 if len(codes) else 0, dtype=np.intp)
+    first[codes] = np.arange(len(codes))
+    return values[first], codes
+
+
+def iter_catalogue_fields(path, chunk_rows=None, max_bytes=None,
+                          spec_types=None):
+    """
+    Read a catalogue as a sequence of point-source fields.
+
+    Parameters:
+    - path, chunk_rows, max_bytes: see :func:`iter_catalogue`
+    - spec_types: list that collects the spectral types; the ``ref`` of a
+      star is the position of its type in this list, which grows as new
+      types are met (default: a new list)
+
+    Yields:
+    - astropy Table from ``PointSourceMorphology.from_columns``, with the
+      spectral types met so far in ``meta["spec_types"]``
+    """
+    spec_types = [] if spec_types is None else spec_types
+    lookup = {spec_type: i for i, spec_type in enumerate(spec_types)}
+    for chunk in iter_catalogue(path, chunk_rows, max_bytes):
+        n = len(chunk["x"])
+        mag = chunk.get("mag")
+        weight = np.ones(n) if mag is None \
+            else 10 ** (-0.4 * mag.astype(np.float64))
+        spec_type = chunk.get("spec_type")
+        if spec_type is None:
+            codes, categories = np.zeros(n, dtype=np.intp), [None]
+        else:
+            categories, codes = _factorise(spec_type)
+            categories = [c.decode() for c in categories.tolist()]
+        refs = np.array([lookup.setdefault(c, len(lookup))
+                         for c in categories], dtype=np.int32)
+        spec_types.extend(list(lookup)[len(spec_types):])
+
+        # The chunk's types are already factorised: ref indexes spec_types
+        ref = refs[codes]
+        table = PointSourceMorphology.from_columns(
+            chunk["x"], chunk["y"], ref=ref, weight=weight, spec_type=ref,
+            categories=spec_types)
+        # Release the chunk before the next one is read
+        del chunk, mag, spec_type, codes, weight, ref
+        yield table
+        del table
+
+
+def _row_capacity(path):
+    """
+    Upper limit of the number of rows of a catalogue: the table length of
+    a FITS file, the number of lines of a CSV file.
+    """
+    if path.name.lower().endswith(FITS_SUFFIXES):
+        with fits.open(path, memmap=True) as hdul:
+            hdu = next((h for h in hdul if isinstance(h, fits.BinTableHDU)),
+                       None)
+            return 0 if hdu is None else hdu.header["NAXIS2"]
+    lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            lines += block.count(b"\n")
+    return lines + 1
+
+
+def read_catalogue_field(path, chunk_rows=None, max_bytes=None):
+    """
+    Read a whole catalogue into one point-source field.
+
+    The numeric columns of the field are allocated once (for CSV files,
+    from the number of lines) and filled chunk by chunk, so that the peak
+    memory is the field plus one chunk.  ``max_bytes`` bounds only the
+    chunk.
+
+    Parameters:
+    - path, chunk_rows, max_bytes: see :func:`iter_catalogue`
+
+    Returns:
+    - astropy Table from ``PointSourceMorphology.from_columns``, with the
+      spectral types indexed by ``ref`` in ``meta["spec_types"]``
+    """
+    path = Path(path)
+    capacity = _row_capacity(path)
+    # spec_type is built from ref at the end
+    columns = {name: np.empty(capacity, dtype=PointSourceMorphology.COLUMNS[name])
+               for name in ("x", "y", "ref", "weight")}
+    spec_types = []
+    nrows = 0
+    for table in iter_catalogue_fields(path, chunk_rows, max_bytes,
+                                       spec_types):
+        for name, column in columns.items():
+            column[nrows:nrows + len(table)] = table[name]
+        nrows += len(table)
+        del table
+    if not nrows:
+        raise ValueError(f"Catalogue '{path}' has no rows.")
+    # Views of the filled rows; CSV capacity counts header and comments
+    columns = {name: column[:nrows] for name, column in columns.items()}
+    return PointSourceMorphology.from_columns(
+        spec_type=columns["ref"], categories=spec_types, **columns)
+
+
+def catalogue_source(path, spectra, chunk_rows=None, max_bytes=None):
+    """
+    Build a scopesim Source from a catalogue.
+
+    Parameters:
+    - path, chunk_rows, max_bytes: see :func:`iter_catalogue`
+    - spectra: dict of spectral type → ``SourceSpectrum`` normalised to
+      0 mag (``None`` is the key for a catalogue without types)
+
+    Returns:
+    - scopesim.Source
+    """
+    from scopesim import Source
+
+    table = read_catalogue_field(path, chunk_rows, max_bytes)
+    missing = [t for t in table.meta["spec_types"] if t not in spectra]
+    if missing:
+        raise ValueError(f"No spectrum for spectral type(s) {missing}.")
+    return Source(table=table,
+                  spectra=[spectra[t] for t in table.meta["spec_types"]])
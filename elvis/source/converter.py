@@ -16,6 +16,9 @@ Morphology:
 SED / spectrum:
     - template (MARCS/PHOENIX) → "blackbody:<Teff> K"
     - template (SWIRE) → "blackbody:5000 K" (generic galaxy SED placeholder)
+      :func:`to_scopesim_target` uses the template itself where it is
+      available, pre-degraded to the mode of the ETC ``instrument``
+      section (see :mod:`elvis.source.resolution`).
     - blackbody → "blackbody:<T> K"
     - powerlaw → "powerlaw:<exponent>"  (custom extension, not natively
       supported by scopesim-targets; requires special handling downstream)
@@ -25,13 +28,22 @@ Brightness:
     - ETC magband + mag + magsys → brightness tuple ("band", mag)
     - Only standard broadband filters (U..N) are passed through; survey
       filters (SDSS, Gaia, etc.) are mapped to the nearest standard band.
+      The spectra resolved by :func:`to_scopesim_target` are normalised
+      in the true ETC band (see :mod:`elvis.source.filters`).
 """
 
 from __future__ import annotations
 
+import logging
+
 import yaml
 from astropy import units as u
 
+from elvis.source.blackbody import get_blackbody
+from elvis.source.sed import get_spectrum
+
+log = logging.getLogger(__name__)
+
 
 # Survey-band → nearest standard band mapping for scopesim-targets
 _BAND_MAP = {
@@ -70,8 +82,13 @@ def etc_target_to_scopesim_yaml(etc_json: dict) -> dict:
     -------
     dict
         A dictionary with keys ``target_class``, ``position``,
-        ``spectrum``, ``brightness``, and optionally ``params``
-        (for Sersic targets). This dict can be serialised to YAML via
+        ``spectrum``, ``brightness``, ``magband``, ``magsys``, ``sed``,
+        ``instrument`` and optionally ``params`` (for Sersic targets).
+        ``brightness`` uses the nearest standard band; ``magband`` and
+        ``magsys`` keep the ETC band and magnitude system for
+        normalisation with :mod:`elvis.source.filters`.  ``sed`` and
+        ``instrument`` are the ETC sections (``instrument`` is ``None``
+        for a bare target) that templates are resolved from. This dict can be serialised to YAML via
         :func:`to_yaml_string`, or used directly to construct
         scopesim-targets objects via :func:`to_scopesim_target`.
 
@@ -119,6 +136,13 @@ def etc_target_to_scopesim_yaml(etc_json: dict) -> dict:
 
     # ---- Brightness ----
     result["brightness"] = _convert_brightness(bright)
+    # The true band and system, used to normalise pre-resolved spectra
+    result["magband"] = bright.get("magband", "V")
+    result["magsys"] = bright.get("magsys", "vega")
+
+    result["sed"] = sed
+    result["instrument"] = (etc_json.get("instrument")
+                            if "target" in etc_json else None)
 
     return result
 
@@ -216,14 +240,60 @@ def to_yaml_string(yaml_dict: dict) -> str:
     return "\n".join(lines) + "\n"
 
 
+def resolve_spectrum(yaml_dict: dict):
+    """
+    The spectrum passed to scopesim-targets for a converter output.
+
+    Templates and power laws are built with
+    :func:`elvis.source.sed.get_spectrum`, templates degraded to the mode
+    of ``yaml_dict["instrument"]``.  If a template is not available, its
+    ``"blackbody:<T> K"`` placeholder is used.  Blackbodies are tabulated
+    with :func:`elvis.source.blackbody.get_blackbody`.  All are normalised
+    to the target brightness in the ETC band and magnitude system, as
+    scopesim-targets only knows the standard bands of ``_BAND_MAP``.
+    Without a ``sed`` section, the scopesim-targets string is returned.
+
+    Parameters
+    ----------
+    yaml_dict : dict
+        Output of ``etc_target_to_scopesim_yaml``.
+
+    Returns
+    -------
+    synphot.SourceSpectrum or str
+    """
+    spectrum_str = yaml_dict["spectrum"]
+    band, mag = yaml_dict["brightness"]
+    band = yaml_dict.get("magband", band)
+    magsys = yaml_dict.get("magsys", "vega")
+
+    sed = yaml_dict.get("sed", {})
+    if sed.get("spectrum", {}).get("spectrumtype") in ("template", "powerlaw"):
+        brightness = {"magband": band, "mag": u.Quantity(mag, u.mag).value,
+                      "magsys": magsys}
+        try:
+            return get_spectrum(sed, instrument=yaml_dict.get("instrument"),
+                                brightness=brightness)
+        except FileNotFoundError as exc:
+            log.info("Template %s not available, using %s", exc, spectrum_str)
+
+    if spectrum_str.startswith("blackbody:"):
+        temp = u.Quantity(spectrum_str.removeprefix("blackbody:"))
+        return get_blackbody(temp, band, mag, magsys)
+
+    return spectrum_str
+
+
 def to_scopesim_target(yaml_dict: dict):
     """
     Construct a scopesim-targets Target object from the converter output.
 
-    For point sources with blackbody spectra, the spectrum is pre-resolved
-    to a ``SourceSpectrum`` because scopesim-targets' ``resolve_spectrum``
-    requires brightness to be threaded through for blackbody strings, which
-    the Star constructor's internal path does not do.
+    Spectra are pre-resolved to a ``SourceSpectrum`` normalised to the
+    target brightness in the ETC band and magnitude system (see
+    :func:`resolve_spectrum`), because
+    scopesim-targets' ``resolve_spectrum`` requires brightness to be
+    threaded through for blackbody strings, which the constructors'
+    internal path does not do, and only knows the standard bands.
 
     Parameters
     ----------
@@ -237,28 +307,15 @@ def to_scopesim_target(yaml_dict: dict):
     """
     from scopesim_targets.point_source import Star
     from scopesim_targets.extended_source import Sersic
-    from spextra import Spextrum
 
     cls_name = yaml_dict["target_class"]
-    spectrum_str = yaml_dict["spectrum"]
-    brightness = yaml_dict["brightness"]
-
-    # For Star + blackbody, pre-resolve to SourceSpectrum so that
-    # resolve_spectrum doesn't hit the brightness=None bug.
-    if cls_name == "Star" and spectrum_str.startswith("blackbody:"):
-        temp = u.Quantity(spectrum_str.removeprefix("blackbody:"))
-        band, mag = brightness
-        spec = Spextrum.black_body_spectrum(temp, mag, band)
-        spectrum = spec
-        # Brightness already baked into the spectrum; still pass it
-        # so the Star object stores it for metadata.
-    else:
-        spectrum = spectrum_str
 
+    # Brightness is already baked into a resolved spectrum; still pass it
+    # so the target stores it for metadata.
     kwargs = {
         "position": tuple(yaml_dict["position"]),
-        "spectrum": spectrum,
-        "brightness": brightness,
+        "spectrum": resolve_spectrum(yaml_dict),
+        "brightness": yaml_dict["brightness"],
     }
     if "params" in yaml_dict:
         kwargs["params"] = yaml_dict["params"]
@@ -0,0 +1,203 @@
+"""
+Filter transmission curves and zero points for brightness normalisation.
+
+Every magnitude band offered by the ETC forms (``MAGBAND_GROUPS``) has an
+entry in ``FILTERS``: central wavelength, FWHM and the AB - Vega offset
+of the band.  The transmission curves are approximated analytically as
+flat-topped super-Gaussians (half transmission at ``centre +- fwhm / 2``),
+as no tabulated curves are shipped with ELVIS.
+
+On import the curves are tabulated once on ``FILTER_WAVESET`` as photon
+weights, so that the mean photon flux of a spectrum in a band (as
+synphot's ``effstim`` in PHOTLAM) is a dot product:
+
+    band_photon_flux(flux, band) = sum(weights * flux)
+
+with ``flux`` sampled on ``FILTER_WAVESET``.  The zero points of both
+magnitude systems are computed from the same weights.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from astropy import constants as const
+from astropy import units as u
+from synphot import Empirical1D, SpectralElement
+
+# Shared with elvis.source.blackbody: 0.1-100 micron at R ~ 2000
+FILTER_WAVESET = np.geomspace(1e3, 1e6, 13817) * u.AA
+
+# Steepness of the super-Gaussian band edges
+FILTER_EDGE_ORDER = 3
+
+# Band → (centre [AA], FWHM [AA], AB - Vega [mag])
+FILTERS = {
+    # Standard Johnson-Cousins / near-IR bands
+    "U": (3600, 660, 0.79),
+    "B": (4380, 940, -0.09),
+    "V": (5450, 880, 0.02),
+    "R": (6410, 1380, 0.21),
+    "I": (7980, 1490, 0.45),
+    "Y": (10200, 1000, 0.63),
+    "J": (12200, 2130, 0.91),
+    "H": (16300, 3070, 1.39),
+    "K": (21900, 3900, 1.85),
+    "L": (34500, 4720, 2.78),
+    "M": (47500, 4600, 3.39),
+    "N": (105000, 52000, 4.98),
+    # Gaia DR3
+    "gaia_GBP": (5110, 2300, 0.02),
+    "gaia_G": (6220, 4400, 0.11),
+    "gaia_GRP": (7770, 2950, 0.36),
+    # SDSS
+    "sdss_u": (3551, 600, 0.91),
+    "sdss_g": (4686, 1380, -0.08),
+    "sdss_r": (6166, 1370, 0.16),
+    "sdss_i": (7480, 1530, 0.37),
+    "sdss_z": (8932, 1100, 0.54),
+    # DECam
+    "DECam_g": (4770, 1500, -0.09),
+    "DECam_r": (6420, 1480, 0.15),
+    "DECam_i": (7820, 1470, 0.38),
+    "DECam_z": (9170, 1520, 0.52),
+    # LSST
+    "lsst_u": (3670, 650, 0.69),
+    "lsst_g": (4830, 1450, -0.09),
+    "lsst_r": (6220, 1400, 0.15),
+    "lsst_i": (7540, 1300, 0.37),
+    "lsst_z": (8690, 1050, 0.51),
+    "lsst_y": (9710, 900, 0.55),
+    # VISTA
+    "VISTA_Z": (8780, 1000, 0.50),
+    "VISTA_Y": (10200, 930, 0.60),
+    "VISTA_J": (12520, 1720, 0.92),
+    "VISTA_H": (16450, 2910, 1.37),
+    "VISTA_Ks": (21470, 3090, 1.83),
+    # 4MOST
+    "4MOST_Johnson_B": (4380, 940, -0.09),
+    "4MOST_Johnson_V": (5450, 880, 0.02),
+    "4MOST_Cousins_R": (6470, 1520, 0.21),
+    "4MOST_Cousins_I": (7865, 1090, 0.45),
+}
+
+MAGNITUDE_SYSTEMS = ("vega", "ab")
+
+_AB_FNU = (3631 * u.Jy).to_value(u.erg / u.s / u.cm**2 / u.Hz)
+_H = const.h.to_value(u.erg * u.s)
+
+
+def _transmission(wave, centre, fwhm):
+    x = 2 * (wave - centre) / fwhm
+    return np.exp(-np.log(2) * x ** (2 * FILTER_EDGE_ORDER))
+
+
+def _build_table():
+    """Photon weights per band: one slice of FILTER_WAVESET each."""
+    wave = FILTER_WAVESET.to_value(u.AA)
+    # Trapezoid integration weights on the (non-uniform) grid
+    dwave = np.gradient(wave)
+    table = {}
+    for band, (centre, fwhm, _) in FILTERS.items():
+        lo, hi = np.searchsorted(wave, [centre - 1.5 * fwhm,
+                                        centre + 1.5 * fwhm])
+        window = slice(lo, hi)
+        weights = _transmission(wave[window], centre, fwhm) * wave[window] \
+            * dwave[window]
+        weights /= weights.sum()
+        weights.setflags(write=False)
+        table[band] = (window, weights)
+    return table
+
+
+_FILTER_TABLE = _build_table()
+
+
+def _check_band(band):
+    if band not in FILTERS:
+        raise ValueError(f"Unknown magnitude band '{band}'. "
+                         f"Choose from {list(FILTERS)}.")
+
+
+def band_photon_flux(flux, band):
+    """
+    Mean photon flux density of a spectrum in a band.
+
+    Parameters:
+    - flux: flux densities in PHOTLAM sampled on ``FILTER_WAVESET``
+      (last axis), e.g. a 2D array of several spectra
+    - band: key of ``FILTERS``
+
+    Returns:
+    - float (or array for 2D ``flux``), PHOTLAM
+    """
+    _check_band(band)
+    window, weights = _FILTER_TABLE[band]
+    return np.asarray(flux)[..., window] @ weights
+
+
+def _zero_points():
+    wave = FILTER_WAVESET.to_value(u.AA)
+    # f_nu = 3631 Jy in photons / s / cm2 / AA
+    ab_photlam = _AB_FNU / (_H * wave)
+    zero_points = {}
+    for band, (_, _, ab_minus_vega) in FILTERS.items():
+        ab = band_photon_flux(ab_photlam, band)
+        zero_points[band] = {"ab": ab,
+                             "vega": ab * 10 ** (-0.4 * ab_minus_vega)}
+    return zero_points
+
+
+# Band → {system → photon flux density of a 0 mag source [PHOTLAM]}
+ZERO_POINTS = _zero_points()
+
+
+def zero_point(band, magsys="vega"):
+    """
+    Photon flux density [PHOTLAM] of a 0 mag source in a band.
+
+    Parameters:
+    - band: key of ``FILTERS``
+    - magsys: ``"vega"`` or ``"AB"`` (case-insensitive)
+    """
+    _check_band(band)
+    system = magsys.lower()
+    if system not in MAGNITUDE_SYSTEMS:
+        raise ValueError(f"Unknown magnitude system '{magsys}'. "
+                         f"Choose from {list(MAGNITUDE_SYSTEMS)}.")
+    return ZERO_POINTS[band][system]
+
+
+def normalisation_scale(flux, band, mag, magsys="vega"):
+    """
+    Factor that scales a spectrum to magnitude ``mag`` in ``band``.
+
+    Parameters:
+    - flux: flux densities in PHOTLAM sampled on ``FILTER_WAVESET``
+    - band: key of ``FILTERS``
+    - mag: magnitude (float)
+    - magsys: ``"vega"`` or ``"AB"``
+
+    Returns:
+    - float
+    """
+    return zero_point(band, magsys) * 10 ** (-0.4 * mag) \
+        / band_photon_flux(flux, band)
+
+
+def get_filter_curve(band):
+    """
+    Transmission curve of a band as a synphot ``SpectralElement``.
+
+    Parameters:
+    - band: key of ``FILTERS``
+
+    Returns:
+    - SpectralElement (Empirical1D on the band's part of ``FILTER_WAVESET``)
+    """
+    _check_band(band)
+    centre, fwhm, _ = FILTERS[band]
+    window, _ = _FILTER_TABLE[band]
+    wave = FILTER_WAVESET[window]
+    return SpectralElement(Empirical1D, points=wave,
+                           lookup_table=_transmission(wave.to_value(u.AA),
+                                                      centre, fwhm))
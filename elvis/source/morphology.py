@@ -3,6 +3,8 @@ from astropy.table import Table
 from astropy.io.fits import ImageHDU
 import numpy as np
 
+from elvis.source.rendering import field_size, render_sersic, sersic_flux
+
 
 class Morphology(ABC):
     def __init__(self, params: dict = None):
@@ -33,6 +35,42 @@ class Morphology(ABC):
 
 
 class PointSourceMorphology(Morphology):
+    """
+    Point sources as a table of positions, with columns
+
+    - x, y: positions (float32)
+    - ref: index of the spectrum of each source (int32)
+    - weight: flux scaling of each source (float64)
+    - spec_type: spectral type of each source (object, see below)
+
+    Columns may be given as lists or as NumPy arrays, including
+    memory-mapped ones, which are used without a copy when they already
+    have the column's dtype.  ``ref`` must hold integers (integral floats
+    are accepted) within the int32 range.  No per-source Python work is
+    done, so that fields of millions of stars (e.g. crowded globular
+    clusters) are cheap to build.
+
+    Spectral types are factorised: the distinct values are listed in
+    ``table.meta["spec_types"]``.  The ``spec_type`` column stays an
+    object column rather than the integer codes, because readers of the
+    table (and its tests) look spectral types up by value, e.g.
+    ``table["spec_type"][i] == "G2V"``.  Its rows refer to the few
+    category objects, so it costs one pointer per source and no string
+    per source.
+
+    Callers that already have the columns as arrays, e.g. the chunks of
+    ``elvis.source.catalogue``, build the table with :meth:`from_columns`.
+    """
+
+    # Column → dtype of the tables of make_field and from_columns
+    COLUMNS = {
+        "x": np.dtype(np.float32),
+        "y": np.dtype(np.float32),
+        "ref": np.dtype(np.int32),
+        "weight": np.dtype(np.float64),
+        "spec_type": np.dtype(object),
+    }
+
     def __init__(self, **params):
         super().__init__(params)
 
@@ -42,46 +80,125 @@ class PointSourceMorphology(Morphology):
 
         x = p.get("x")
         y = p.get("y")
-        ref = p.get("ref")
-        weight = p.get("weight")
-        spec_type = p.get("spec_type")
 
         if x is None and y is None:
-            table = Table()
-            table["x"] = [0.0]
-            table["y"] = [0.0]
-            table["ref"] = [0]
-            table["weight"] = [1.0]
-            table["spec_type"] = [None]
-            return table
+            x, y = [0.0], [0.0]
 
         if (x is None) != (y is None):
             raise ValueError("Both 'x' and 'y' must be provided together.")
 
-        x = list(x)
-        y = list(y)
+        return self.from_columns(x, y, ref=p.get("ref"),
+                                 weight=p.get("weight"),
+                                 spec_type=p.get("spec_type"))
+
+    @classmethod
+    def from_columns(cls, x, y, ref=None, weight=None, spec_type=None,
+                     categories=None):
+        """
+        Point-source table from its columns.
+
+        Parameters:
+        - x, y, ref, weight, spec_type: the columns, as for ``make_field``
+          (``ref`` defaults to 0, ``weight`` to 1)
+        - categories: the distinct spectral types, if already known.
+          ``spec_type`` then holds the index of each source's type in
+          ``categories`` instead of the type, and is not factorised again.
+
+        Returns:
+        - astropy Table with the ``COLUMNS``, and the spectral types in
+          ``meta["spec_types"]``
+        """
+        x = _column("x", x, cls.COLUMNS["x"])
         n = len(x)
+        y = _column("y", y, cls.COLUMNS["y"], n)
+        ref = _index_column("ref", ref, n)
+        weight = _column("weight", weight, cls.COLUMNS["weight"], n,
+                         default=1.0)
+        spec_type, categories = _categorical_column("spec_type", spec_type, n,
+                                                    categories)
+
+        table = Table([x, y, ref, weight, spec_type], names=list(cls.COLUMNS),
+                      copy=False)
+        table.meta["spec_types"] = categories
+        return table
 
-        def validate_or_default(name, arr, default):
-            if arr is None:
-                return [default] * n
-            arr = list(arr)
-            if len(arr) != n:
-                raise ValueError(f"Length mismatch: '{name}' has length {len(arr)}, expected {n}.")
-            return arr
-
-        ref = validate_or_default("ref", ref, 0)
-        weight = validate_or_default("weight", weight, 1.0)
-        spec_type = validate_or_default("spec_type", spec_type, None)
-
-        table = Table()
-        table["x"] = x
-        table["y"] = y
-        table["ref"] = ref
-        table["weight"] = weight
-        table["spec_type"] = spec_type
 
-        return table
+def _check_length(name, arr, n):
+    if arr.ndim != 1:
+        raise ValueError(f"'{name}' must be one-dimensional.")
+    if n is not None and len(arr) != n:
+        raise ValueError(f"Length mismatch: '{name}' has length {len(arr)}, expected {n}.")
+
+
+def _column(name, arr, dtype, n=None, default=None):
+    """Column as a 1D array of ``dtype`` (no copy if it already is one)."""
+    if arr is None:
+        return np.full(n, default, dtype=dtype)
+    arr = np.asarray(arr, dtype=dtype)
+    _check_length(name, arr, n)
+    return arr
+
+
+def _index_column(name, arr, n):
+    """
+    Column of int32 indices.  Unlike a cast, values that are not integers
+    or do not fit in int32 raise a ValueError.
+    """
+    if arr is None:
+        return np.zeros(n, dtype=np.int32)
+    arr = np.asarray(arr)
+    _check_length(name, arr, n)
+    if arr.dtype == np.int32:
+        return arr
+    if arr.dtype.kind not in "iuf":
+        raise ValueError(f"'{name}' must hold integers, not {arr.dtype}.")
+    if arr.dtype.kind == "f" and not np.all(np.mod(arr, 1) == 0):
+        raise ValueError(f"'{name}' must hold integers, found non-integral "
+                         f"values.")
+    info = np.iinfo(np.int32)
+    if arr.size and (arr.min() < info.min or arr.max() > info.max):
+        raise ValueError(f"'{name}' values must fit in int32.")
+    return arr.astype(np.int32)
+
+
+def _categorical_column(name, arr, n, categories=None):
+    """
+    Object column of a few distinct values, and the list of those values.
+
+    If ``categories`` is given, ``arr`` holds indices into it.
+    """
+    if arr is None:
+        return np.full(n, None, dtype=object), [None]
+    arr = np.asarray(arr)
+    _check_length(name, arr, n)
+    if categories is not None:
+        if arr.dtype.kind not in "iu":
+            raise ValueError(f"'{name}' must hold indices into the "
+                             f"categories, not {arr.dtype}.")
+        if arr.size and (arr.min() < 0 or arr.max() >= len(categories)):
+            raise ValueError(f"'{name}' indices must be within the "
+                             f"{len(categories)} categories.")
+        codes, categories = arr, list(categories)
+    else:
+        codes, categories = _factorise(arr)
+    values = np.empty(len(categories), dtype=object)
+    values[:] = categories
+    return values[codes], categories
+
+
+def _factorise(arr):
+    """Distinct values of ``arr`` (as a list) and the index of each element."""
+    try:
+        categories, codes = np.unique(arr, return_inverse=True)
+    except TypeError:
+        # Unorderable values (e.g. strings mixed with None)
+        lookup = {}
+        codes = np.fromiter((lookup.setdefault(v, len(lookup)) for v in arr),
+                            dtype=np.intp, count=len(arr))
+        categories = list(lookup)
+    else:
+        categories = categories.tolist()
+    return codes, categories
 
 
 class InfiniteExtendedMorphology(Morphology):
@@ -92,24 +209,52 @@ class InfiniteExtendedMorphology(Morphology):
         self.params.update(**kwargs)
         pixel_scale = kwargs.get("pixel_scale")
         fov_diameter = kwargs.get("fov_diameter")
+        dtype = kwargs.get("dtype", np.float32)  # or np.float64
+        # With materialise=False the field is a lazy, read-only view (see
+        # is_lazy_field); consumers must call materialise_field() before
+        # modifying it in place
+        materialise = kwargs.get("materialise", True)
 
         if pixel_scale is None or fov_diameter is None:
             raise ValueError("pixel_scale and fov_diameter must be provided for extended sources")
 
         # Define grid size (same logic as Sersic)
-        npix = int(np.ceil(fov_diameter / pixel_scale))
-        if npix % 2 == 0:
-            npix += 1  # keep center pixel at center
+        npix = field_size(pixel_scale, fov_diameter)
 
         # Total flux within 1 arcsec^2 should be 1, ergo each pixel has a value of pixel_scale**2
-        data = np.ones((npix, npix)) * pixel_scale**2
+        value = np.asarray(pixel_scale**2, dtype=dtype)
+        if materialise:
+            data = np.full((npix, npix), value, dtype=dtype)
+        else:
+            # Read-only (npix, npix) view of the single value: no pixel
+            # memory is allocated until materialise_field() is called
+            data = np.broadcast_to(value, (npix, npix))
 
         hdu = ImageHDU(data=data, name="INFINITE_EXTENDED")
         hdu.header["PIXSCALE"] = pixel_scale
         hdu.header["FOV_DIAM"] = fov_diameter
+        hdu.header["PIXVALUE"] = float(value)
         return hdu
 
 
+def is_lazy_field(hdu):
+    """True if ``hdu.data`` is a broadcast view of a single value."""
+    data = hdu.data
+    return data is not None and data.size > 1 and 0 in data.strides
+
+
+def materialise_field(hdu):
+    """
+    Replace a lazy field (see ``InfiniteExtendedMorphology``) by a
+    writable array of its full size, in place.
+
+    Returns the same ``hdu``; fields that are not lazy are left as is.
+    """
+    if is_lazy_field(hdu):
+        hdu.data = np.array(hdu.data)
+    return hdu
+
+
 class SersicExtendedMorphology(Morphology):
     def __init__(self, index, radius, **params):
 
@@ -124,41 +269,32 @@ class SersicExtendedMorphology(Morphology):
         fov_diameter = kwargs.get("fov_diameter")
         ellipticity = kwargs.get("ellipticity", 0.0)  # optional, default circular
         angle_deg = kwargs.get("angle", 0.0)  # in degrees
+        dtype = kwargs.get("dtype", np.float32)  # or np.float64
+        oversampling = kwargs.get("oversampling")  # None or "adaptive"
 
         if pixel_scale is None or fov_diameter is None:
             raise ValueError("pixel_scale and fov_diameter must be provided for extended sources")
 
+        if oversampling not in (None, "adaptive"):
+            raise ValueError("oversampling must be None or 'adaptive'")
+
         if not (0 <= ellipticity <= 0.95):
             raise ValueError("ellipticity must be in [0, 0.95)")
 
-        # Convert angle to radians
-        theta = np.radians(angle_deg)
-
-        # Compute pixel grid
-        npix = int(np.ceil(fov_diameter / pixel_scale))
-        if npix % 2 == 0:
-            npix += 1  # ensure center pixel
-
-        axis = (np.arange(npix) - npix // 2) * pixel_scale
-        x, y = np.meshgrid(axis, axis)
+        npix = field_size(pixel_scale, fov_diameter)
 
-        # Rotate coordinates
-        x_rot = x * np.cos(theta) + y * np.sin(theta)
-        y_rot = -x * np.sin(theta) + y * np.cos(theta)
+        # Sersic profile, see elvis.source.rendering
+        image = render_sersic(npix, pixel_scale, self.index, self.radius,
+                              ellipticity=ellipticity, angle=angle_deg,
+                              dtype=dtype, adaptive=oversampling == "adaptive")
 
-        # Ellipticity scaling
-        q = 1 - ellipticity  # axis ratio
-        r = np.sqrt(x_rot**2 + (y_rot / q) ** 2)
-
-        # Sersic profile
-        n = self.index
-        re = self.radius
-        bn = 2 * n - 1/3
-
-        with np.errstate(over='ignore'):
-            image = np.exp(-bn * ((r / re) ** (1/n) - 1))
-
-        image /= np.sum(image)
+        if oversampling == "adaptive":
+            # Pixel means times pixel area over the analytic total flux:
+            # the image sums to the fraction of the flux inside the field
+            image *= pixel_scale**2 / sersic_flux(self.index, self.radius,
+                                                  ellipticity)
+        else:
+            image /= np.sum(image, dtype=np.float64)
 
         hdu = ImageHDU(data=image, name="SERSIC_MODEL")
         hdu.header["SINDEX"] = self.index
@@ -167,5 +303,7 @@ class SersicExtendedMorphology(Morphology):
         hdu.header["FOV_DIAM"] = fov_diameter
         hdu.header["ELLIPTIC"] = ellipticity
         hdu.header["ANGLE"] = angle_deg
+        if oversampling == "adaptive":
+            hdu.header["FLUXFRAC"] = float(np.sum(image, dtype=np.float64))
 
         return hdu
@@ -0,0 +1,343 @@
+"""
+Fast rendering of extended-source images.
+
+:func:`render_sersic` evaluates an elliptical Sersic profile on a square,
+centred pixel grid.  Instead of evaluating ``exp(-bn * ((r / re)**(1/n) - 1))``
+on every pixel it
+
+- tabulates the profile once on a uniform grid of radii
+  (``SERSIC_LUT_SIZE`` points out to the largest radius in the image) and
+  linearly interpolates the table at each pixel's elliptical radius,
+- evaluates the profile exactly close to the centre (within
+  ``SERSIC_EXACT_STEPS`` table steps), where a cuspy high-index profile
+  is poorly approximated by linear interpolation,
+- renders only the lower half of the image (plus the centre row) and
+  fills the upper half by point symmetry,
+- works in the requested ``dtype`` throughout, so ``float32`` output also
+  halves the memory traffic.
+
+With ``adaptive=True`` the pixels in the steep core of the profile are
+sub-sampled (see :func:`_oversample_core`) and hold pixel-averaged
+values; :func:`sersic_flux` gives the analytic flux for normalisation.
+
+The geometry-only part of this work (elliptical radius of every pixel as
+a position in the lookup table) is cached per field geometry in
+``GRID_CACHE``, so repeated renders for the same instrument mode only
+allocate the output image.
+
+With the defaults the rendered (unnormalised) image deviates from the
+direct evaluation by less than ``1e-4`` of its peak value.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import NamedTuple
+
+import numpy as np
+from scipy.special import gammainc, gammaln
+
+from elvis.cache import TemplateCache
+
+
+# Number of points of the radial lookup table
+SERSIC_LUT_SIZE = 8192
+
+# Radius (in table steps) inside which the profile is evaluated exactly
+SERSIC_EXACT_STEPS = 64
+
+# Adaptive oversampling: pixels whose centre value is estimated to differ
+# from their mean by more than OVERSAMPLING_TOLERANCE of it are sub-sampled,
+# with up to MAX_OVERSAMPLING x MAX_OVERSAMPLING samples.  Pixels fainter
+# than OVERSAMPLING_FLOOR of the profile one pixel from the centre are
+# held to the tolerance relative to that level instead.
+OVERSAMPLING_TOLERANCE = 0.01
+OVERSAMPLING_FLOOR = 1e-3
+MAX_OVERSAMPLING = 31
+
+# Sub-sampled pixels evaluated per batch (bounds the temporary arrays)
+OVERSAMPLING_BATCH = 4096
+
+# Levels of recursive refinement of the central sub-pixel of the central
+# pixel, where profiles with n > 1 have a cusp
+CENTRE_REFINEMENT_LEVELS = 4
+
+
+def sersic_profile(r, index, radius):
+    """
+    Sersic surface brightness, normalised to 1 at the effective radius.
+
+    Parameters:
+    - r: (elliptical) radius, same units as ``radius``
+    - index: Sersic index n
+    - radius: effective radius r_e
+
+    Returns:
+    - array like ``r``
+    """
+    bn = 2 * index - 1 / 3
+    with np.errstate(over="ignore"):
+        return np.exp(-bn * ((r / radius) ** (1 / index) - 1))
+
+
+def sersic_flux(index, radius, ellipticity=0.0, r=None):
+    """
+    Analytic flux of an elliptical :func:`sersic_profile`.
+
+    ``F(<r) = 2 pi q re^2 n exp(bn) bn^(-2n) gamma(2n, bn (r/re)^(1/n))``
+
+    Parameters:
+    - index: Sersic index n
+    - radius: effective radius r_e
+    - ellipticity: 1 - b/a
+    - r: elliptical radius to integrate out to (default: the total flux)
+
+    Returns:
+    - float, in units of the profile at r_e times ``radius`` squared
+    """
+    bn = 2 * index - 1 / 3
+    q = 1 - ellipticity
+    flux = np.exp(np.log(2 * np.pi * q * radius**2 * index) + bn
+                  - 2 * index * np.log(bn) + gammaln(2 * index))
+    if r is not None:
+        flux *= gammainc(2 * index, bn * (r / radius) ** (1 / index))
+    return flux
+
+
+def _quadratic_form(ellipticity, angle):
+    """
+    Coefficients of r^2 = a x^2 + b x y + c y^2 for the elliptical radius.
+
+    ``angle`` in degrees, counter-clockwise, as in the rotation
+    ``x' = x cos + y sin``, ``y' = -x sin + y cos`` with ``r^2 = x'^2 + (y'/q)^2``.
+    """
+    theta = np.radians(angle)
+    cos, sin = np.cos(theta), np.sin(theta)
+    inv_q2 = 1.0 / (1.0 - ellipticity) ** 2
+    a = cos**2 + sin**2 * inv_q2
+    b = 2 * cos * sin * (1 - inv_q2)
+    c = sin**2 + cos**2 * inv_q2
+    return a, b, c
+
+
+def _grid_nbytes(grid):
+    """Bytes of the arrays in a grid (a tuple of arrays and scalars)."""
+    return sum(getattr(item, "nbytes", 0) for item in grid)
+
+
+# Grids shared by all requests.  ELVIS_GRID_CACHE_BYTES sets the memory
+# budget; a 4k x 4k float32 Sersic grid takes ~64 MB.
+GRID_CACHE = TemplateCache(
+    max_bytes=int(os.environ.get("ELVIS_GRID_CACHE_BYTES", 256 * 2**20)),
+    sizeof=_grid_nbytes)
+
+
+class SersicGrid(NamedTuple):
+    """
+    Elliptical radii of the lower half (rows 0..npix//2) of a field,
+    expressed as positions in a radial lookup table of spacing ``step``.
+    """
+    step: float
+    index: np.ndarray       # int32, table point below each pixel's radius
+    fraction: np.ndarray    # fraction of a step above that point
+    centre: np.ndarray      # flat indices of pixels evaluated exactly
+    r_centre: np.ndarray    # their radii
+
+
+def field_size(pixel_scale, fov_diameter):
+    """Odd number of pixels across a field, so a pixel sits on the centre."""
+    npix = int(np.ceil(fov_diameter / pixel_scale))
+    if npix % 2 == 0:
+        npix += 1
+    return npix
+
+
+def sersic_grid(npix, pixel_scale, ellipticity=0.0, angle=0.0,
+                dtype=np.float32, lut_size=SERSIC_LUT_SIZE):
+    """
+    Read-only :class:`SersicGrid` for a field geometry, from ``GRID_CACHE``.
+
+    The grid does not depend on the Sersic index or effective radius, so
+    all profiles rendered for one instrument mode share it.
+    """
+    dtype = np.dtype(dtype)
+    key = (npix, pixel_scale, ellipticity, angle, dtype.str, lut_size)
+    grid = GRID_CACHE.get(key)
+    if grid is None:
+        grid = _build_sersic_grid(npix, pixel_scale, ellipticity, angle,
+                                  dtype, lut_size)
+        for item in grid[1:]:
+            item.setflags(write=False)
+        GRID_CACHE.put(key, grid)
+    return grid
+
+
+def _build_sersic_grid(npix, pixel_scale, ellipticity, angle, dtype, lut_size):
+    a, b, c = _quadratic_form(ellipticity, angle)
+    half = npix // 2
+    axis = ((np.arange(npix) - half) * pixel_scale).astype(dtype)
+
+    # Largest radius in the image: the quadratic form peaks at a corner
+    corner = half * pixel_scale
+    r_max = np.sqrt(corner**2 * (a + c + abs(b)))
+    # r_max falls on the second-to-last point, so index + 1 stays in range
+    # even when rounding pushes a radius slightly past r_max
+    step = r_max / (lut_size - 2) if r_max > 0 else 1.0
+
+    # Rows 0..half: the rest follows from image[i, j] = image[-1-i, -1-j]
+    x = axis
+    y = axis[:half + 1, None]
+    r = np.multiply(b * x, y, dtype=dtype)
+    r += a * x * x
+    r += c * y * y
+    np.sqrt(r, out=r)                               # elliptical radius
+
+    centre = np.flatnonzero(r < SERSIC_EXACT_STEPS * step)
+    r_centre = r.ravel()[centre].astype(np.float64)
+
+    r *= dtype.type(1 / step)                       # position in the table
+    index = r.astype(np.int32)
+    r -= index                                      # fraction of a step
+    return SersicGrid(step, index, r, centre, r_centre)
+
+
+def render_sersic(npix, pixel_scale, index, radius, ellipticity=0.0,
+                  angle=0.0, dtype=np.float32, lut_size=SERSIC_LUT_SIZE,
+                  adaptive=False, tolerance=OVERSAMPLING_TOLERANCE):
+    """
+    Render an (unnormalised) elliptical Sersic profile.
+
+    Parameters:
+    - npix: image size in pixels (odd, so that a pixel sits on the centre)
+    - pixel_scale: pixel size, same units as ``radius`` (e.g. arcsec)
+    - index: Sersic index n
+    - radius: effective radius r_e
+    - ellipticity: 1 - b/a
+    - angle: position angle in degrees
+    - dtype: output dtype (``np.float32`` or ``np.float64``)
+    - lut_size: number of points of the radial lookup table
+    - adaptive: sub-sample the pixels where the profile is steep (see
+      :func:`_oversample_core`), so that those pixels hold the mean of
+      the profile over the pixel rather than its value at the centre
+    - tolerance: largest change of the profile across a pixel, as a
+      fraction of its central value, that is not sub-sampled
+
+    Returns:
+    - 2D array (npix, npix) of ``sersic_profile`` values at pixel centres
+      (or pixel means, if ``adaptive``)
+    """
+    dtype = np.dtype(dtype)
+    grid = sersic_grid(npix, pixel_scale, ellipticity, angle, dtype, lut_size)
+
+    table = sersic_profile(np.arange(lut_size) * grid.step, index, radius)
+    table = table.astype(dtype)
+    slope = np.diff(table, append=table[-1:])
+
+    # Only the output image is allocated: rows 0..half-1 are interpolated
+    # using the (not yet mirrored) upper half as scratch space.
+    half = npix // 2
+    image = np.empty((npix, npix), dtype=dtype)
+    lower, upper = image[:half + 1], image[half + 1:]
+
+    np.take(table, grid.index[:half], out=upper)
+    np.take(slope, grid.index[:half], out=lower[:half])
+    lower[:half] *= grid.fraction[:half]
+    lower[:half] += upper
+
+    row = grid.index[half]
+    lower[half] = table[row] + grid.fraction[half] * slope[row]
+
+    lower.flat[grid.centre] = sersic_profile(grid.r_centre, index, radius)
+    if adaptive:
+        _oversample_core(lower, grid, table, slope, pixel_scale, index, radius,
+                         ellipticity, angle, tolerance)
+    upper[:] = lower[half - 1::-1, ::-1]
+    return image
+
+
+def _oversample_core(lower, grid, table, slope, pixel_scale, index, radius,
+                     ellipticity, angle, tolerance):
+    """
+    Replace strongly curved pixels of the lower half image by sub-sampled
+    means.
+
+    The value at a pixel's centre differs from the pixel mean by about
+    ``size**2 / 24`` times the Laplacian of the profile.  This error is
+    estimated from the lookup table at the smallest radius the pixel
+    touches, relative to the pixel's value (but at least
+    ``OVERSAMPLING_FLOOR`` of the profile one pixel from the centre, so
+    the faint outskirts are left alone).  Only pixels inside the bounding
+    box of the largest radius that needs sub-sampling are inspected, so
+    the cost scales with the size of the core, not of the image.  A pixel
+    with an error of ``delta`` (in units of ``tolerance``) is sampled
+    ``k x k`` times with odd ``k >= sqrt(delta)``, as the error of the
+    mean falls with ``k**2``.
+    """
+    npix = lower.shape[1]
+    half = npix // 2
+    q = 1 - ellipticity
+    size = pixel_scale / q          # largest extent in elliptical radius
+    values = table.astype(np.float64)
+    r = np.arange(len(values)) * grid.step
+    r[0] = grid.step
+    curvature = np.abs(np.diff(values, 2, prepend=values[1],
+                               append=values[-1])) / grid.step**2
+    gradient = np.abs(slope.astype(np.float64)) / grid.step / r
+    floor = OVERSAMPLING_FLOOR * sersic_profile(pixel_scale, index, radius)
+    delta = size**2 / 24 * (curvature + gradient) \
+        / np.maximum(values, floor) / tolerance
+    # A pixel reaches up to size / sqrt(2) closer to the centre
+    reach = int(np.ceil(size / np.sqrt(2) / grid.step))
+    delta = delta[np.maximum(np.arange(len(delta)) - reach, 0)]
+    steep = np.flatnonzero(delta > 1)
+    if steep.size == 0:
+        return
+
+    # Bounding box of the ellipse a x^2 + b x y + c y^2 <= r_sel^2
+    a, b, c = _quadratic_form(ellipticity, angle)
+    r_sel = (steep[-1] + 2) * grid.step
+    det = a * c - b * b / 4
+    nx = min(int(np.ceil(r_sel * np.sqrt(c / det) / pixel_scale)), half)
+    ny = min(int(np.ceil(r_sel * np.sqrt(a / det) / pixel_scale)), half)
+    rows = slice(half - ny, half + 1)
+    cols = slice(half - nx, half + nx + 1)
+
+    window_delta = delta[grid.index[rows, cols]]
+    iy, ix = np.nonzero(window_delta > 1)
+    factors = 2 * np.ceil((np.sqrt(window_delta[iy, ix]) - 1) / 2).astype(int) + 1
+    np.minimum(factors, MAX_OVERSAMPLING, out=factors)
+    iy += rows.start
+    ix += cols.start
+
+    for k in np.unique(factors):
+        offsets = ((np.arange(k) + 0.5) / k - 0.5) * pixel_scale
+        sub_x = offsets[None, None, :]
+        sub_y = offsets[None, :, None]
+        (pixels,) = np.nonzero(factors == k)
+        for start in range(0, pixels.size, OVERSAMPLING_BATCH):
+            batch = pixels[start:start + OVERSAMPLING_BATCH]
+            x = (ix[batch] - half)[:, None, None] * pixel_scale + sub_x
+            y = (iy[batch] - half)[:, None, None] * pixel_scale + sub_y
+            r = np.sqrt(a * x * x + b * x * y + c * y * y)
+            lower[iy[batch], ix[batch]] = \
+                sersic_profile(r, index, radius).mean(axis=(1, 2))
+
+    if delta[0] > 1:
+        lower[half, half] = _central_pixel_mean(
+            pixel_scale, index, radius, (a, b, c), MAX_OVERSAMPLING,
+            CENTRE_REFINEMENT_LEVELS)
+
+
+def _central_pixel_mean(size, index, radius, form, k, levels):
+    """Mean of the profile over a pixel centred on the cusp, refining the
+    central sub-pixel recursively."""
+    a, b, c = form
+    offsets = ((np.arange(k) + 0.5) / k - 0.5) * size
+    x = offsets[None, :]
+    y = offsets[:, None]
+    samples = sersic_profile(np.sqrt(a * x * x + b * x * y + c * y * y),
+                             index, radius)
+    if levels > 1:
+        samples[k // 2, k // 2] = _central_pixel_mean(
+            size / k, index, radius, form, k, levels - 1)
+    return samples.mean()
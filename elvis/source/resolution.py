@@ -0,0 +1,190 @@
+"""
+Pre-degrade template spectra to the resolving power of an instrument mode.
+
+High-resolution templates (PHOENIX in particular) carry far more spectral
+points than any ERIS or HAWK-I mode can resolve.  :func:`degrade_spectrum`
+convolves a spectrum with a Gaussian line-spread function of constant
+resolving power and resamples it onto a logarithmic wavelength grid that
+only covers the mode's wavelength range.
+
+The instrument modes are derived from the ETC form configuration:
+
+- ERIS SPIFFIER gratings (``IFS_GRATINGS``, keyword ``INS.BAND.NAME``)
+  with the resolving power and range given in their labels
+- ERIS NIX and HAWK-I filters (``NIX_FILTERS`` / ``HAWKI_FILTERS``,
+  keywords ``INS.NXFW.NAME`` / ``INS.FILT.NAME``) at
+  ``IMAGING_RESOLVING_POWER`` around the filter's central wavelength
+
+Degraded templates are cached per template, mode and (rest-frame)
+wavelength range in ``DEGRADED_TEMPLATE_CACHE``.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+
+import numpy as np
+from astropy import units as u
+from synphot import Empirical1D, SourceSpectrum, units
+
+from elvis.eris_etc_form.config import IFS_GRATINGS, NIX_FILTERS
+from elvis.hawki_etc_form.config import HAWKI_FILTERS
+from elvis.cache import TemplateCache
+from elvis.source.sed_utils import (
+    _copy_spectrum,
+    get_template_spectrum,
+)
+
+# Resolving power used for imaging modes.  Enough to sample even the
+# narrowband filters (R ~ 100) with ~10 points per filter width.
+IMAGING_RESOLVING_POWER = 1000
+
+# Half width of the wavelength range kept around a filter's central
+# wavelength, as a fraction of it
+BROADBAND_HALF_WIDTH = 0.15
+NARROWBAND_HALF_WIDTH = 0.05
+
+# Output samples per resolution element (FWHM of the line-spread function)
+SAMPLES_PER_RESOLUTION_ELEMENT = 2
+
+_GRATING_LABEL = re.compile(r"R~(\d+), ([\d.]+)-([\d.]+)")
+_FILTER_LABEL = re.compile(r"([\d.]+) \u00b5m")
+
+
+def _grating_modes() -> dict:
+    modes = {}
+    for grating in IFS_GRATINGS:
+        match = _GRATING_LABEL.search(grating["label"])
+        if match:
+            r, wmin, wmax = match.groups()
+            modes[grating["value"]] = {"resolving_power": float(r),
+                                       "wave_min": float(wmin),
+                                       "wave_max": float(wmax)}
+    return modes
+
+
+def _filter_modes(filters) -> dict:
+    modes = {}
+    for filt in filters:
+        match = _FILTER_LABEL.search(filt["label"])
+        if match:
+            centre = float(match.group(1))
+            half = (BROADBAND_HALF_WIDTH if filt.get("type") == "broadband"
+                    else NARROWBAND_HALF_WIDTH)
+            modes[filt["value"]] = {"resolving_power": IMAGING_RESOLVING_POWER,
+                                    "wave_min": centre * (1 - half),
+                                    "wave_max": centre * (1 + half)}
+    return modes
+
+
+# ETC instrument-section keyword → {value → mode}.  Wavelengths in micron.
+INSTRUMENT_MODES = {
+    "INS.BAND.NAME": _grating_modes(),
+    "INS.NXFW.NAME": _filter_modes(NIX_FILTERS),
+    "INS.FILT.NAME": _filter_modes(HAWKI_FILTERS),
+}
+
+# Degraded templates shared by all requests.  ELVIS_DEGRADED_CACHE_BYTES
+# sets the memory budget.
+DEGRADED_TEMPLATE_CACHE = TemplateCache(
+    max_bytes=int(os.environ.get("ELVIS_DEGRADED_CACHE_BYTES", 64 * 2**20)))
+
+
+def instrument_mode(instrument: dict) -> dict | None:
+    """
+    Find the spectral mode selected by an ETC ``instrument`` section.
+
+    Parameters:
+    - instrument: the ``instrument`` section of the ETC JSON
+
+    Returns:
+    - dict with ``resolving_power``, ``wave_min`` and ``wave_max`` [um],
+      or ``None`` if no known grating or filter is selected
+    """
+    for keyword, modes in INSTRUMENT_MODES.items():
+        mode = modes.get((instrument or {}).get(keyword))
+        if mode is not None:
+            return mode
+    return None
+
+
+def degrade_spectrum(spec, resolving_power, wave_min, wave_max,
+                     oversampling=SAMPLES_PER_RESOLUTION_ELEMENT):
+    """
+    Convolve a spectrum to a resolving power and resample it.
+
+    The spectrum is first averaged (flux-conserving) into logarithmic
+    bins of width ``1 / (oversampling * R)``, then convolved with a
+    Gaussian of FWHM ``1 / R`` in ``ln(wavelength)``.
+
+    Parameters:
+    - spec: SourceSpectrum
+    - resolving_power: R = lambda / FWHM
+    - wave_min, wave_max: wavelength range in micron
+    - oversampling: output samples per resolution element
+
+    Returns:
+    - SourceSpectrum (Empirical1D) covering ``[wave_min, wave_max]``
+    """
+    step = 1.0 / (oversampling * resolving_power)
+    ln_edges = np.arange(np.log(wave_min * 1e4), np.log(wave_max * 1e4) + step,
+                         step)
+    edges = np.exp(ln_edges)
+    centres = np.exp(0.5 * (ln_edges[1:] + ln_edges[:-1]))
+
+    waveset = spec.waveset
+    if waveset is None:
+        # Analytic model: already smooth, sample at the bin centres
+        flux = spec(centres * u.AA).to_value(units.PHOTLAM)
+    else:
+        wave = waveset.to_value(u.AA)
+        lo = max(np.searchsorted(wave, edges[0]) - 1, 0)
+        hi = min(np.searchsorted(wave, edges[-1]) + 1, len(wave))
+        wave = wave[lo:hi]
+        flux = spec(wave * u.AA).to_value(units.PHOTLAM)
+        cumulative = np.concatenate(
+            [[0.0], np.cumsum(0.5 * (flux[1:] + flux[:-1]) * np.diff(wave))])
+        flux = np.diff(np.interp(edges, wave, cumulative)) / np.diff(edges)
+
+    sigma = oversampling / (2 * np.sqrt(2 * np.log(2)))
+    half = int(np.ceil(4 * sigma))
+    kernel = np.exp(-0.5 * (np.arange(-half, half + 1) / sigma) ** 2)
+    kernel /= kernel.sum()
+    padded = np.pad(flux, half, mode="edge")
+    flux = np.convolve(padded, kernel, mode="valid")
+
+    meta = {"resolving_power": resolving_power,
+            "wave_range": (wave_min, wave_max)}
+    return SourceSpectrum(Empirical1D, points=centres * u.AA,
+                          lookup_table=flux * units.PHOTLAM, meta=meta)
+
+
+def get_degraded_template(params, mode, redshift=0.0):
+    """
+    Template spectrum pre-degraded to an instrument mode.
+
+    The template is degraded over the rest-frame range that the mode
+    sees after redshifting by ``redshift``.  Convolution at constant R
+    commutes with redshifting, so the caller can set ``spec.z``
+    afterwards.
+
+    Parameters:
+    - params: ``params`` of a template ``spectrum`` section
+    - mode: output of :func:`instrument_mode`
+    - redshift: redshift the caller is going to apply
+
+    Returns:
+    - SourceSpectrum (a copy; the cached spectrum is never modified)
+    """
+    wave_min = round(mode["wave_min"] / (1 + redshift), 6)
+    wave_max = round(mode["wave_max"] / (1 + redshift), 6)
+    key = (params.get("catalog"), params.get("id"), mode["resolving_power"],
+           wave_min, wave_max)
+
+    spec = DEGRADED_TEMPLATE_CACHE.get(key)
+    if spec is None:
+        spec = degrade_spectrum(get_template_spectrum(params),
+                                mode["resolving_power"], wave_min, wave_max)
+        DEGRADED_TEMPLATE_CACHE.put(key, spec)
+    return _copy_spectrum(spec)
@@ -1,22 +1,56 @@
 from astropy import units as u
 import numpy as np
-from synphot import Gaussian1D, SourceSpectrum
+from synphot import Gaussian1D, SourceSpectrum, units
 
+from elvis.source.blackbody import planck_photlam
+from elvis.source.filters import FILTER_WAVESET, normalisation_scale
+from elvis.source.resolution import get_degraded_template, instrument_mode
 from elvis.source.sed_utils import (
     get_template_spectrum,
     get_blackbody_spectrum,
+    get_blackbody_temperature,
     get_powerlaw_spectrum,
+    get_powerlaw_exponent,
+    get_eso_attenuation_batch,
     get_eso_extinction_element
 )
 
+# Default wavelength grid of get_spectra(): 0.3-5.5 micron, R ~ 2000
+BATCH_WAVESET = np.geomspace(3000, 55000, 5826) * u.AA
 
-def get_spectrum(sed_dict):
+
+def get_spectrum(sed_dict, instrument=None, brightness=None):
+    """
+    Create the SourceSpectrum described by an ETC ``sed`` section.
+
+    Parameters:
+    - sed_dict: the ``target.sed`` section of the ETC JSON
+    - instrument: optional ``instrument`` section of the ETC JSON.  If it
+      selects a known grating or filter, template spectra are returned
+      pre-degraded to that mode's resolving power and wavelength range
+      (see ``elvis.source.resolution``).
+    - brightness: optional ``target.brightness`` section of the ETC JSON.
+      If given, the spectrum is scaled to ``mag`` in ``magband`` and
+      ``magsys`` (see ``elvis.source.filters``).  Degraded templates are
+      normalised before degrading, as their range need not include the
+      band.
+
+    Returns:
+    - synphot.SourceSpectrum
+    """
     sedtype = sed_dict.get("sedtype")
     spectrum = sed_dict.get("spectrum", {})
     spectrumtype = spectrum.get("spectrumtype")
     params = spectrum.get("params", {})
+    redshift_info = sed_dict.get("redshift", {})
+    redshift = redshift_info.get("redshift")
+
+    mode = instrument_mode(instrument) if instrument else None
+    degrade = sedtype == "spectrum" and spectrumtype == "template" and mode
 
-    if sedtype == "spectrum" and spectrumtype == "template":
+    if degrade and brightness is None:
+        spec = get_degraded_template(params, mode, redshift or 0.0)
+    elif sedtype == "spectrum" and spectrumtype == "template":
         spec = get_template_spectrum(params)
     elif sedtype == "spectrum" and spectrumtype == "blackbody":
         spec = get_blackbody_spectrum(params)
@@ -27,24 +61,119 @@ def get_spectrum(sed_dict):
     else:
         raise ValueError(f"Unsupported sedtype/spectrumtype: {sedtype}/{spectrumtype}")
 
-    # Apply extinction if present
+    spec = _apply_extinction_and_redshift(spec, sed_dict)
+
+    if brightness is not None:
+        # Normalise the full template: the mode's range may miss the band
+        scale = _brightness_scale(spec, brightness)
+        if degrade:
+            spec = _apply_extinction_and_redshift(
+                get_degraded_template(params, mode, redshift or 0.0), sed_dict)
+        spec = spec * scale
+
+    # Warn if baryvelcor is present
+    if "baryvelcor" in redshift_info:
+        import warnings
+        warnings.warn("'baryvelcor' was detected, but has no effect on the spectrum")
+
+    return spec
+
+
+def _apply_extinction_and_redshift(spec, sed_dict):
+    """Apply the extinction and redshift of an ETC ``sed`` section."""
     extinction_av = sed_dict.get("extinctionav")
     if extinction_av:
         ext_element = get_eso_extinction_element(spec.waveset, a_v=extinction_av)
         spec = spec * ext_element
 
-    # Apply redshift if present
-    redshift_info = sed_dict.get("redshift", {})
-    redshift = redshift_info.get("redshift")
+    redshift = sed_dict.get("redshift", {}).get("redshift")
     if redshift:
         spec.z = redshift
+    return spec
 
-    # Warn if baryvelcor is present
-    if "baryvelcor" in redshift_info:
-        import warnings
-        warnings.warn("'baryvelcor' was detected, but has no effect on the spectrum")
 
-    return spec
+def _brightness_scale(spec, brightness):
+    """Factor scaling ``spec`` to an ETC ``brightness`` section."""
+    flux = spec(FILTER_WAVESET).to_value(units.PHOTLAM)
+    return normalisation_scale(flux, brightness.get("magband", "V"),
+                               float(brightness.get("mag", 10)),
+                               brightness.get("magsys", "vega"))
+
+
+def get_spectra(sed_dicts, waveset=None, instrument=None):
+    """
+    Evaluate many ETC ``sed`` sections on one shared wavelength grid.
+
+    Blackbodies and power laws are evaluated as one broadcast array
+    operation each instead of one synphot model per SED; templates are
+    interpolated from the template cache.  Redshift
+    shifts the wavelengths only (as synphot does) and extinction is
+    applied in the rest frame (as in ``get_spectrum``), batched per
+    distinct redshift and R_V.
+
+    Parameters:
+    - sed_dicts: list of ``target.sed`` sections
+    - waveset: Quantity array of wavelengths (default ``BATCH_WAVESET``)
+    - instrument: optional ``instrument`` section of the ETC JSON; as in
+      ``get_spectrum``, templates are pre-degraded to its mode
+
+    Returns:
+    - 2D float array (len(sed_dicts), len(waveset)) of fluxes in PHOTLAM,
+      matching ``get_spectrum(sed_dict, instrument)(waveset)`` row by row
+    """
+    wave = (BATCH_WAVESET if waveset is None else waveset).to_value(u.AA)
+    mode = instrument_mode(instrument) if instrument else None
+    n_seds = len(sed_dicts)
+    flux = np.empty((n_seds, len(wave)))
+
+    redshifts = np.zeros(n_seds)
+    blackbodies = []
+    powerlaws = []
+    for i, sed_dict in enumerate(sed_dicts):
+        sedtype = sed_dict.get("sedtype")
+        spectrum = sed_dict.get("spectrum", {})
+        spectrumtype = spectrum.get("spectrumtype")
+        params = spectrum.get("params", {})
+        redshifts[i] = sed_dict.get("redshift", {}).get("redshift") or 0.0
+
+        if sedtype == "spectrum" and spectrumtype == "template":
+            if mode is not None:
+                spec = get_degraded_template(params, mode, redshifts[i])
+            else:
+                spec = get_template_spectrum(params)
+            flux[i] = spec(wave / (1 + redshifts[i]) * u.AA).to_value(units.PHOTLAM)
+        elif sedtype == "spectrum" and spectrumtype == "blackbody":
+            blackbodies.append((i, get_blackbody_temperature(params)))
+        elif sedtype == "spectrum" and spectrumtype == "powerlaw":
+            powerlaws.append((i, get_powerlaw_exponent(params)))
+        elif sedtype == "spectrum" and spectrumtype == "upload":
+            raise NotImplementedError("'upload' spectrum type is not yet supported.")
+        else:
+            raise ValueError(f"Unsupported sedtype/spectrumtype: {sedtype}/{spectrumtype}")
+
+    if blackbodies:
+        index, temperatures = map(np.array, zip(*blackbodies))
+        rest_wave = wave[None, :] / (1 + redshifts[index, None])
+        flux[index] = planck_photlam(rest_wave,
+                                     temperatures.astype(float)[:, None])
+
+    if powerlaws:
+        index, alphas = map(np.array, zip(*powerlaws))
+        rest_wave = wave[None, :] / (1 + redshifts[index, None])
+        flux[index] = (rest_wave / 1e4) ** -alphas.astype(float)[:, None]
+
+    # Extinction: one attenuation batch per redshift
+    groups = {}
+    for i, sed_dict in enumerate(sed_dicts):
+        a_v = sed_dict.get("extinctionav")
+        if a_v:
+            groups.setdefault(redshifts[i], []).append((i, a_v))
+    for z, rows in groups.items():
+        index, a_v_values = map(np.array, zip(*rows))
+        flux[index] *= get_eso_attenuation_batch(wave / (1 + z) * u.AA,
+                                                 a_v_values)
+
+    return flux
 
 
 def get_emission_line(sed_dict):
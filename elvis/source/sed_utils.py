@@ -1,14 +1,68 @@
 from synphot import SourceSpectrum
-from synphot.models import BlackBody1D, PowerLawFlux1D
+from synphot.models import PowerLawFlux1D
 from synphot import Empirical1D
 from synphot.spectrum import SpectralElement
 from astropy import units as u
+from collections import OrderedDict
 from pathlib import Path
+import copy
+import hashlib
+import os
+import threading
 import numpy as np
 from dust_extinction.parameter_averages import F99, G23
 
+from elvis.cache import TemplateCache
+from elvis.source.template_library import TemplateLibrary
+
 TEMPLATES_PATH = Path("D:/ELVIS/ETC_SED/")
 
+# Packed template catalogs (see elvis.source.template_library), used in
+# preference to the FITS files.  Set ELVIS_TEMPLATE_LIBRARY to relocate.
+TEMPLATE_LIBRARY = TemplateLibrary(
+    os.environ.get("ELVIS_TEMPLATE_LIBRARY", TEMPLATES_PATH / "packed"))
+
+
+# Template spectra shared by all requests.  ELVIS_TEMPLATE_CACHE_BYTES sets
+# the memory budget.
+TEMPLATE_CACHE = TemplateCache(
+    max_bytes=int(os.environ.get("ELVIS_TEMPLATE_CACHE_BYTES", 256 * 2**20)))
+
+
+def _copy_spectrum(spec):
+    """Shallow copy sharing the model arrays, with its own ``meta``."""
+    spec_copy = copy.copy(spec)
+    spec_copy.meta = copy.deepcopy(spec.meta)
+    return spec_copy
+
+
+def _load_template(path):
+    """
+    Load a template spectrum through ``TEMPLATE_CACHE``.
+
+    The packed ``TEMPLATE_LIBRARY`` is tried before the FITS file itself.
+
+    Parameters:
+    - path: Path of the template file, ``TEMPLATES_PATH/<catalog>/<file>``
+
+    Returns:
+    - SourceSpectrum (a copy; the cached template is never modified)
+
+    Raises:
+    - FileNotFoundError: if the template is neither packed nor on disk
+    """
+    path = Path(path)
+    key = str(path)
+    spec = TEMPLATE_CACHE.get(key)
+    if spec is None:
+        spec = TEMPLATE_LIBRARY.get(path.parent.name, path.name)
+        if spec is None:
+            if not path.exists():
+                raise FileNotFoundError(key)
+            spec = SourceSpectrum.from_file(key)
+        TEMPLATE_CACHE.put(key, spec)
+    return _copy_spectrum(spec)
+
 
 def get_eso_extinction_element(waveset, a_v=1.0, r_v=3.1):
     """
@@ -25,20 +79,74 @@ def get_eso_extinction_element(waveset, a_v=1.0, r_v=3.1):
     - SpectralElement object representing extinction curve
     """
     wave_micron = waveset.to(u.micron)
-    mask_f99 = wave_micron <= 2.7 * u.micron
-    mask_g23 = ~mask_f99
+    curve = get_unit_extinction_curve(wave_micron, r_v=r_v)
+    attenuation = 10 ** (-0.4 * a_v * curve)
+    return SpectralElement(Empirical1D, points=wave_micron, lookup_table=attenuation)
+
+
+def get_eso_attenuation_batch(waveset, a_v_values, r_v=3.1):
+    """
+    Attenuation factors for many A_V values at once.
+
+    Parameters:
+    - waveset: Quantity array of wavelengths
+    - a_v_values: sequence of extinctions in V band
+    - r_v: Ratio of total to selective extinction
+
+    Returns:
+    - 2D array (len(a_v_values), len(waveset)) of transmitted fractions
+    """
+    curve = get_unit_extinction_curve(waveset.to(u.micron), r_v=r_v)
+    a_v_values = np.asarray(a_v_values, dtype=float).reshape(-1, 1)
+    return 10 ** (-0.4 * a_v_values * curve)
+
+
+_EXTINCTION_CURVES = OrderedDict()
+_EXTINCTION_LOCK = threading.Lock()
+EXTINCTION_CACHE_SIZE = 32
 
-    f99 = F99(Rv=r_v)
-    g23 = G23(Rv=r_v)
 
-    a_lambda = np.zeros_like(wave_micron.value)
+def get_unit_extinction_curve(wave_micron, r_v=3.1):
+    """
+    A(lambda) / A_V on a waveset, cached per (waveset, R_V).
+
+    The ESO ETC combination of F99 (<= 2.7 micron) and G23 (> 2.7 micron)
+    is only evaluated the first time a waveset is seen with a given R_V.
+    Wavesets are identified by a hash of their values (to 1e-9 micron).
+
+    Parameters:
+    - wave_micron: Quantity array of wavelengths
+    - r_v: Ratio of total to selective extinction
+
+    Returns:
+    - read-only float array of A(lambda) / A_V
+    """
+    values = np.ascontiguousarray(wave_micron.to_value(u.micron), dtype=float)
+    # Rounded so that e.g. an Angstrom waveset converted to micron matches
+    rounded = np.round(values, 9)
+    fingerprint = hashlib.blake2b(rounded.tobytes(), digest_size=16).hexdigest()
+    key = (fingerprint, len(values), float(r_v))
+
+    with _EXTINCTION_LOCK:
+        curve = _EXTINCTION_CURVES.get(key)
+        if curve is not None:
+            _EXTINCTION_CURVES.move_to_end(key)
+            return curve
+
+    mask_f99 = values <= 2.7
+    mask_g23 = ~mask_f99
+    curve = np.zeros_like(values)
     if np.any(mask_f99):
-        a_lambda[mask_f99] = f99(wave_micron[mask_f99]) * a_v
+        curve[mask_f99] = F99(Rv=r_v)(values[mask_f99] * u.micron)
     if np.any(mask_g23):
-        a_lambda[mask_g23] = g23(wave_micron[mask_g23]) * a_v
+        curve[mask_g23] = G23(Rv=r_v)(values[mask_g23] * u.micron)
+    curve.flags.writeable = False
 
-    attenuation = 10 ** (-0.4 * a_lambda)
-    return SpectralElement(Empirical1D, points=wave_micron, lookup_table=attenuation)
+    with _EXTINCTION_LOCK:
+        _EXTINCTION_CURVES[key] = curve
+        while len(_EXTINCTION_CURVES) > EXTINCTION_CACHE_SIZE:
+            _EXTINCTION_CURVES.popitem(last=False)
+    return curve
 
 
 def read_marcs_spectrum(sed_id):
@@ -54,9 +162,7 @@ def read_marcs_spectrum(sed_id):
     logg = float(logg_str)
     filename = f"p{temp}_g+{logg:.1f}_m0.0_t02_st_z+0.00_a+0.00_c+0.00_n+0.00_o+0.00.fits"
     path = TEMPLATES_PATH / "MARCS" / filename
-    if not path.exists():
-        raise FileNotFoundError()
-    return SourceSpectrum.from_file(str(path))
+    return _load_template(path)
 
 
 def read_phoenix_spectrum(sed_id):
@@ -72,9 +178,7 @@ def read_phoenix_spectrum(sed_id):
     logg = float(logg_str)
     filename = f"lte{temp:05d}-{logg:.2f}-PHOENIX.fits"
     path = TEMPLATES_PATH / "PHOENIX" / filename
-    if not path.exists():
-        raise FileNotFoundError()
-    return SourceSpectrum.from_file(str(path))
+    return _load_template(path)
 
 
 def read_swire_spectrum(sed_id):
@@ -110,9 +214,7 @@ def read_swire_spectrum(sed_id):
     if not filename:
         raise ValueError(f"Unknown SWIRE template ID: {sed_id}")
     path = TEMPLATES_PATH / "SWIRE" / filename
-    if not path.exists():
-        raise FileNotFoundError()
-    return SourceSpectrum.from_file(str(path))
+    return _load_template(path)
 
 
 def read_kinney_spectrum(sed_id):
@@ -138,9 +240,7 @@ def read_kinney_spectrum(sed_id):
     if not filename:
         raise ValueError(f"Unknown Kinney template ID: {sed_id}")
     path = TEMPLATES_PATH / "Kinney" / filename
-    if not path.exists():
-        raise FileNotFoundError()
-    return SourceSpectrum.from_file(str(path))
+    return _load_template(path)
 
 
 def read_kurucz_spectrum(sed_id):
@@ -155,9 +255,7 @@ def read_kurucz_spectrum(sed_id):
     spec_type, spec_sub_type, lum_class = sed_id.split(":")
     filename = f"{spec_type}{spec_sub_type}{lum_class}.fits"
     path = TEMPLATES_PATH / "Kurucz" / filename
-    if not path.exists():
-        raise FileNotFoundError()
-    return SourceSpectrum.from_file(str(path))
+    return _load_template(path)
 
 
 def read_pickles_spectrum(sed_id):
@@ -172,9 +270,7 @@ def read_pickles_spectrum(sed_id):
     spec_type, spec_sub_type, lum_class = sed_id.split(":")
     filename = f"{spec_type}{spec_sub_type}{lum_class}.fits"
     path = TEMPLATES_PATH / "Pickles" / filename
-    if not path.exists():
-        raise FileNotFoundError()
-    return SourceSpectrum.from_file(str(path))
+    return _load_template(path)
 
 
 def read_various_spectrum(sed_id):
@@ -192,9 +288,7 @@ def read_various_spectrum(sed_id):
     if not filename:
         raise ValueError(f"Unknown Various template ID: {sed_id}")
     path = TEMPLATES_PATH / "Various" / filename
-    if not path.exists():
-        raise FileNotFoundError()
-    return SourceSpectrum.from_file(str(path))
+    return _load_template(path)
 
 
 def get_template_spectrum(params):
@@ -220,6 +314,14 @@ def get_template_spectrum(params):
 
 
 def get_blackbody_spectrum(params):
+    from elvis.source.blackbody import get_blackbody
+
+    temp = get_blackbody_temperature(params)
+    return get_blackbody(temp)
+
+
+def get_blackbody_temperature(params):
+    """Validated ``temperature`` [K] of blackbody spectrum params."""
     temp = params.get("temperature")
     if temp is None:
         raise ValueError("Blackbody spectrum requires 'temperature' parameter.")
@@ -227,13 +329,19 @@ def get_blackbody_spectrum(params):
         raise ValueError(f"Blackbody 'temperature' must be int or float: f{type(temp)=}, {temp}")
     if temp < 0 or temp > 1e5:
         raise ValueError(f"Blackbody 'temperature' outside acceptable range [0, 1e5]: f{temp}")
-    return SourceSpectrum(BlackBody1D(temperature=temp * u.K))
+    return temp
 
 
-def get_powerlaw_spectrum(params):
+def get_powerlaw_exponent(params):
+    """Validated ``exponent`` of power-law spectrum params."""
     alpha = params.get("exponent")
     if alpha is None:
         raise ValueError("Power-law spectrum requires 'exponent' parameter.")
+    return alpha
+
+
+def get_powerlaw_spectrum(params):
+    alpha = get_powerlaw_exponent(params)
     model = PowerLawFlux1D(amplitude=1, x_0=1 * u.um, alpha=alpha)
     return SourceSpectrum(model)
 
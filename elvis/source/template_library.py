@@ -0,0 +1,185 @@
+"""
+Packed, memory-mapped template spectrum library.
+
+The template catalogs under ``TEMPLATES_PATH/<catalog>/`` consist of many
+small FITS files.  :func:`build_library` packs each catalog into one
+binary file (``<catalog>.bin``, float64 wavelength and flux arrays back to
+back) plus a JSON index (``<catalog>.json``) mapping each template's
+file name to its offset and length.
+
+:class:`TemplateLibrary` memory-maps the packed files and returns
+templates as zero-copy views into the mapping.  Wavelengths are stored in
+Angstrom and fluxes in PHOTLAM (synphot's internal units), so synphot
+does not need to convert (and copy) them.  Forked server workers share
+the mapped pages.
+
+Build the library once with::
+
+    python -m elvis.source.template_library D:/ELVIS/ETC_SED/ D:/ELVIS/ETC_SED/packed
+
+FITS headers are not stored; a packed template's ``meta`` only holds the
+name of the file it came from.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from astropy import units as u
+from synphot import Empirical1D, SourceSpectrum, units
+
+log = logging.getLogger(__name__)
+
+CATALOGS = ("MARCS", "PHOENIX", "SWIRE", "Kinney", "Kurucz", "Pickles",
+            "Various")
+
+_DTYPE = "<f8"
+
+
+def build_library(templates_path, output_path, catalogs=CATALOGS) -> dict:
+    """
+    Pack the FITS templates of each catalog into a memory-mappable file.
+
+    Parameters
+    ----------
+    templates_path : str or Path
+        Directory with one sub-directory of FITS templates per catalog.
+    output_path : str or Path
+        Directory to write ``<catalog>.bin`` and ``<catalog>.json`` to.
+    catalogs : iterable of str
+        Catalogs to pack.  Missing catalog directories are skipped.
+
+    Returns
+    -------
+    dict
+        Number of packed templates per catalog.
+    """
+    templates_path = Path(templates_path)
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    counts = {}
+    for catalog in catalogs:
+        catalog_dir = templates_path / catalog
+        if not catalog_dir.is_dir():
+            log.warning("No template directory for catalog %s", catalog)
+            continue
+
+        index = {}
+        offset = 0
+        bin_path = output_path / f"{catalog}.bin"
+        tmp_path = bin_path.with_suffix(".bin.tmp")
+        with open(tmp_path, "wb") as file:
+            for fits_path in sorted(catalog_dir.glob("*.fits")):
+                try:
+                    spec = SourceSpectrum.from_file(str(fits_path))
+                    wave = spec.waveset.to_value(u.AA)
+                    flux = spec(spec.waveset).to_value(units.PHOTLAM)
+                except Exception as exc:
+                    log.warning("Skipping %s: %s", fits_path, exc)
+                    continue
+                file.write(np.ascontiguousarray(wave, _DTYPE).tobytes())
+                file.write(np.ascontiguousarray(flux, _DTYPE).tobytes())
+                index[fits_path.name] = [offset, len(wave)]
+                offset += 2 * len(wave)
+
+        os.replace(tmp_path, bin_path)
+        index_path = output_path / f"{catalog}.json"
+        index_path.write_text(json.dumps({"dtype": _DTYPE,
+                                          "templates": index}))
+        counts[catalog] = len(index)
+        log.info("Packed %d %s templates into %s", len(index), catalog,
+                 bin_path)
+    return counts
+
+
+class TemplateLibrary:
+    """
+    Read-only access to a library written by :func:`build_library`.
+
+    Catalogs are mapped lazily on first use.  Lookups of catalogs that
+    have not been packed return ``None``, so callers can fall back to the
+    FITS files.
+
+    Parameters
+    ----------
+    path : str or Path
+        Directory with the packed ``<catalog>.bin`` / ``.json`` files.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._catalogs = {}
+        self._lock = threading.Lock()
+
+    def get(self, catalog: str, filename: str) -> SourceSpectrum | None:
+        """Return the packed template as a zero-copy spectrum, or ``None``."""
+        packed = self._catalog(catalog)
+        if packed is None:
+            return None
+        data, index = packed
+        entry = index.get(filename)
+        if entry is None:
+            return None
+
+        offset, length = entry
+        wave = u.Quantity(data[offset:offset + length], u.AA, copy=False)
+        flux = u.Quantity(data[offset + length:offset + 2 * length],
+                          units.PHOTLAM, copy=False)
+        return SourceSpectrum(Empirical1D, points=wave, lookup_table=flux,
+                              meta={"expr": filename})
+
+    def __contains__(self, catalog: str) -> bool:
+        return self._catalog(catalog) is not None
+
+    def _catalog(self, catalog: str):
+        """``(memmap, index)`` of a catalog, or ``None`` if not packed."""
+        try:
+            return self._catalogs[catalog]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if catalog not in self._catalogs:
+                self._catalogs[catalog] = self._open(catalog)
+            return self._catalogs[catalog]
+
+    def _open(self, catalog: str):
+        bin_path = self.path / f"{catalog}.bin"
+        index_path = self.path / f"{catalog}.json"
+        if not (bin_path.exists() and index_path.exists()):
+            return None
+        meta = json.loads(index_path.read_text())
+        if bin_path.stat().st_size == 0:
+            data = np.zeros(0, dtype=meta["dtype"])
+        else:
+            data = np.memmap(bin_path, dtype=meta["dtype"], mode="r")
+        log.info("Mapped %d %s templates from %s", len(meta["templates"]),
+                 catalog, bin_path)
+        return data, meta["templates"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pack ELVIS template spectra into a memory-mapped library.")
+    parser.add_argument("templates_path",
+                        help="Directory with one sub-directory per catalog")
+    parser.add_argument("output_path", help="Directory for the packed files")
+    parser.add_argument("--catalogs", nargs="+", default=CATALOGS,
+                        help="Catalogs to pack (default: all)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    counts = build_library(args.templates_path, args.output_path, args.catalogs)
+    for catalog, count in counts.items():
+        print(f"{catalog}: {count} templates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Tests for the content-addressed result cache."""
+
+import copy
+import io
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from astropy.io import fits
+from astropy.table import MaskedColumn, Table
+
+from elvis import cache, pipeline
+from elvis.cache import (
+    ResultCache,
+    SourceCache,
+    canonical_hash,
+    clone_source,
+    dump_source,
+    is_memory_mapped,
+    load_source,
+)
+from elvis.pipeline import _create_source, run_cached_simulation
+
+ETC_JSON = {
+    "target": {"morphology": {"morphologytype": "point"},
+               "brightness": {"magband": "V", "mag": 10}},
+    "sky": {"airmass": 1.2},
+    "instrument": {"ins_configuration": "img_noao"},
+    "timesnr": {"DET.DIT": 10, "DET.NDIT": 6},
+    "output": {},
+    "instrumentName": "hawki",
+}
+
+
+class _Field:
+    """Stand-in for a scopesim source field: a table plus its spectra."""
+
+    def __init__(self):
+        self.field = Table({"x": [0.0], "y": [0.0], "ref": [0]})
+        self.spectra = {0: np.linspace(1, 2, 1000)}
+
+
+class _Source:
+    def __init__(self):
+        self.fields = [_Field()]
+
+
+def _image_hdulist(value=1.0):
+    return fits.HDUList([fits.PrimaryHDU(),
+                         fits.ImageHDU(data=np.full((4, 4), value))])
+
+
+# =========================================================================
+# canonical_hash
+# =========================================================================
+
+class TestCanonicalHash:
+
+    def test_output_section_is_ignored(self):
+        other = copy.deepcopy(ETC_JSON)
+        other["output"] = {"snr": True, "use_disk": True}
+        assert canonical_hash(other) == canonical_hash(ETC_JSON)
+
+    def test_key_order_is_ignored(self):
+        reordered = dict(reversed(list(ETC_JSON.items())))
+        assert canonical_hash(reordered) == canonical_hash(ETC_JSON)
+
+    def test_int_and_float_spellings_match(self):
+        other = copy.deepcopy(ETC_JSON)
+        other["timesnr"]["DET.DIT"] = 10.0
+        assert canonical_hash(other) == canonical_hash(ETC_JSON)
+
+    def test_large_integers_are_hashed(self):
+        other = copy.deepcopy(ETC_JSON)
+        other["timesnr"]["DET.NDIT"] = 10**400
+        assert canonical_hash(other) != canonical_hash(ETC_JSON)
+
+    def test_package_versions_change_hash(self, monkeypatch):
+        before = canonical_hash(ETC_JSON)
+        monkeypatch.setattr(cache, "cache_salt", lambda: "scopesim=99")
+        assert canonical_hash(ETC_JSON) != before
+
+    def test_salt_lists_versions(self):
+        assert "numpy=" in cache.cache_salt()
+        assert "scopesim=" in cache.cache_salt()
+
+    @pytest.mark.parametrize("section, key, value", [
+        ("timesnr", "DET.DIT", 20),
+        ("sky", "airmass", 1.5),
+        ("instrument", "ins_configuration", "img_ao"),
+    ])
+    def test_simulation_sections_change_hash(self, section, key, value):
+        other = copy.deepcopy(ETC_JSON)
+        other[section][key] = value
+        assert canonical_hash(other) != canonical_hash(ETC_JSON)
+
+
+# =========================================================================
+# ResultCache
+# =========================================================================
+
+class TestResultCacheMemoryTier:
+
+    def test_miss_then_hit(self):
+        cache = ResultCache()
+        assert cache.get("a") is None
+        cache.put("a", b"data")
+        assert cache.get("a") == b"data"
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    def test_lru_eviction_by_count(self):
+        cache = ResultCache(max_items=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+        assert "a" in cache
+        assert "b" not in cache
+
+    def test_eviction_by_bytes(self):
+        cache = ResultCache(max_bytes=10)
+        cache.put("a", b"x" * 6)
+        cache.put("b", b"y" * 6)
+        assert "a" not in cache
+        assert "b" in cache
+
+
+class TestResultCacheDiskTier:
+
+    def test_table_columns_are_memory_mapped(self, tmp_path):
+        source = _Source()
+        source.fields[0].field["x"].unit = "arcsec"
+        dump_source(source, tmp_path / "a.src")
+        field = load_source(tmp_path / "a.src").fields[0].field
+        assert field.colnames == ["x", "y", "ref"]
+        assert field["x"].unit == "arcsec"
+        assert is_memory_mapped(field["x"])
+        assert is_memory_mapped(field["ref"])
+
+    def test_masked_and_object_columns_round_trip(self, tmp_path):
+        table = Table({"x": np.arange(3.0),
+                       "spec_type": np.array(["a", None, "b"], dtype=object)})
+        table["m"] = MaskedColumn([1, 2, 3], mask=[False, True, False])
+        table.meta["spec_types"] = ["a", "b"]
+        dump_source(table, tmp_path / "t.src")
+        loaded = load_source(tmp_path / "t.src")
+        assert list(loaded["spec_type"]) == ["a", None, "b"]
+        assert loaded["m"].mask.tolist() == [False, True, False]
+        assert loaded.meta == table.meta
+        assert is_memory_mapped(loaded["m"].data)
+
+    def test_disk_hit_after_memory_eviction(self, tmp_path):
+        cache = ResultCache(max_items=1, cache_dir=tmp_path)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        assert cache.get("a") == b"1"
+        assert cache.stats["disk_hits"] == 1
+
+    def test_disk_survives_new_instance(self, tmp_path):
+        ResultCache(cache_dir=tmp_path).put("a", b"data")
+        assert ResultCache(cache_dir=tmp_path).get("a") == b"data"
+
+    def test_disk_budget_evicts_oldest(self, tmp_path):
+        cache = ResultCache(cache_dir=tmp_path, max_disk_bytes=10)
+        cache.put("a", b"x" * 6)
+        cache.put("b", b"y" * 6)
+        assert not (tmp_path / "a.fits").exists()
+        assert (tmp_path / "b.fits").exists()
+
+    def test_clear_removes_files(self, tmp_path):
+        cache = ResultCache(cache_dir=tmp_path)
+        cache.put("a", b"data")
+        cache.clear()
+        assert list(tmp_path.glob("*.fits")) == []
+
+    def test_budget_counts_files_of_other_processes(self, tmp_path):
+        first = ResultCache(cache_dir=tmp_path, max_disk_bytes=10)
+        second = ResultCache(cache_dir=tmp_path, max_disk_bytes=10)
+        first.put("a", b"x" * 6)
+        second.put("b", b"y" * 6)
+        assert sorted(p.name for p in tmp_path.glob("*.fits")) == ["b.fits"]
+
+    def test_no_temporary_files_are_left(self, tmp_path):
+        cache = ResultCache(cache_dir=tmp_path, max_disk_bytes=10)
+        cache.put("a", b"data")
+        cache.put("b", b"x" * 100)    # over budget: not stored
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a.fits"]
+
+
+# =========================================================================
+# run_cached_simulation
+# =========================================================================
+
+class TestRunCachedSimulation:
+
+    @patch("elvis.pipeline.run_simulation", side_effect=lambda j, **kw: _image_hdulist())
+    def test_hit_skips_pipeline(self, mock_run):
+        cache = ResultCache()
+        first = run_cached_simulation(ETC_JSON, cache=cache)
+        other = copy.deepcopy(ETC_JSON)
+        other["output"] = {"snr": True}
+        second = run_cached_simulation(other, cache=cache)
+
+        first, second = fits.open(io.BytesIO(first)), fits.open(io.BytesIO(second))
+        np.testing.assert_array_equal(first[1].data, second[1].data)
+        assert mock_run.call_count == 1
+
+    def test_hit_reports_its_own_timings(self):
+        def run(etc_json, timer=None):
+            hdul = _image_hdulist()
+            timer.timings["observe"] = 123.0
+            timer.to_header(hdul[0].header)
+            return hdul
+
+        cache = ResultCache()
+        with patch("elvis.pipeline.run_simulation", side_effect=run):
+            miss = fits.getheader(io.BytesIO(
+                run_cached_simulation(ETC_JSON, cache=cache)))
+            hit = fits.open(io.BytesIO(
+                run_cached_simulation(ETC_JSON, cache=cache)))
+
+        assert miss["ELVIS TIME OBSERVE"] == 123.0
+        assert "ELVIS TIME SERIALISE" in miss
+        assert "ELVIS TIME OBSERVE" not in hit[0].header
+        assert "ELVIS TIME CACHE" in hit[0].header
+        assert hit[1].data.shape == (4, 4)
+        assert b"ELVIS TIME" not in cache.get(canonical_hash(ETC_JSON))
+
+    @patch("elvis.pipeline.run_simulation", side_effect=lambda j, **kw: _image_hdulist())
+    def test_returns_fits_bytes(self, _mock):
+        data = run_cached_simulation(ETC_JSON, cache=ResultCache())
+        hdul = fits.open(io.BytesIO(data))
+        assert hdul[1].data.shape == (4, 4)
+
+    def test_header_only_fallback_is_not_cached(self):
+        cache = ResultCache()
+        with patch("elvis.pipeline.create_optical_train", return_value=None):
+            run_cached_simulation(ETC_JSON, cache=cache)
+        assert len(cache) == 0
+
+
+# =========================================================================
+# SourceCache
+# =========================================================================
+
+class TestSourceCache:
+
+    def test_miss_then_hit(self):
+        cache = SourceCache()
+        assert cache.get("a") is None
+        cache.put("a", _Source())
+        assert cache.get("a") is not None
+        assert cache.stats["hits"] == cache.stats["memory_hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = SourceCache(max_items=2)
+        for key in "abc":
+            cache.put(key, _Source())
+        assert "a" not in cache and len(cache) == 2
+        assert cache.stats["evictions"] == 1
+
+    def test_mutating_a_clone_leaves_the_cache_intact(self):
+        cache = SourceCache()
+        cache.put("a", _Source())
+        cache.get("a").fields[0].field["x"][0] = 99.0
+        assert cache.get("a").fields[0].field["x"][0] == 0.0
+
+    def test_clone_shares_spectra(self):
+        source = _Source()
+        clone = clone_source(source)
+        assert clone.fields[0] is not source.fields[0]
+        assert clone.fields[0].spectra[0] is source.fields[0].spectra[0]
+
+
+class TestSourceCacheDiskTier:
+
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        source = _Source()
+        dump_source(source, tmp_path / "a.src")
+        loaded = load_source(tmp_path / "a.src")
+        spectrum = loaded.fields[0].spectra[0]
+        np.testing.assert_array_equal(spectrum, source.fields[0].spectra[0])
+        assert is_memory_mapped(spectrum)
+        assert not spectrum.flags.writeable
+
+    def test_table_columns_are_memory_mapped(self, tmp_path):
+        source = _Source()
+        source.fields[0].field["x"].unit = "arcsec"
+        dump_source(source, tmp_path / "a.src")
+        field = load_source(tmp_path / "a.src").fields[0].field
+        assert field.colnames == ["x", "y", "ref"]
+        assert field["x"].unit == "arcsec"
+        assert is_memory_mapped(field["x"])
+        assert is_memory_mapped(field["ref"])
+
+    def test_masked_and_object_columns_round_trip(self, tmp_path):
+        table = Table({"x": np.arange(3.0),
+                       "spec_type": np.array(["a", None, "b"], dtype=object)})
+        table["m"] = MaskedColumn([1, 2, 3], mask=[False, True, False])
+        table.meta["spec_types"] = ["a", "b"]
+        dump_source(table, tmp_path / "t.src")
+        loaded = load_source(tmp_path / "t.src")
+        assert list(loaded["spec_type"]) == ["a", None, "b"]
+        assert loaded["m"].mask.tolist() == [False, True, False]
+        assert loaded.meta == table.meta
+        assert is_memory_mapped(loaded["m"].data)
+
+    def test_disk_hit_after_memory_eviction(self, tmp_path):
+        cache = SourceCache(max_items=1, cache_dir=tmp_path)
+        cache.put("a", _Source())
+        cache.put("b", _Source())
+        source = cache.get("a")
+        assert cache.stats["disk_hits"] == 1
+        assert list(source.fields[0].field["x"]) == [0.0]
+
+    def test_disk_survives_new_instance(self, tmp_path):
+        SourceCache(cache_dir=tmp_path).put("a", _Source())
+        cache = SourceCache(cache_dir=tmp_path)
+        assert cache.get("a") is not None
+        assert cache.stats["disk_hits"] == 1
+
+    def test_clone_of_mapped_source_shares_its_arrays(self, tmp_path):
+        SourceCache(cache_dir=tmp_path).put("a", _Source())
+        cache = SourceCache(cache_dir=tmp_path)
+        first, second = cache.get("a"), cache.get("a")
+        assert first.fields[0].field is not second.fields[0].field
+        assert np.shares_memory(first.fields[0].field["x"],
+                                second.fields[0].field["x"])
+        assert is_memory_mapped(first.fields[0].field["x"])
+        with pytest.raises(ValueError):
+            first.fields[0].field["x"][0] = 5.0
+
+    def test_clone_of_mapped_source_copies_meta_and_headers(self, tmp_path):
+        source = _Source()
+        source.fields[0].field.meta["spec_types"] = ["A0V"]
+        image = _Field()
+        image.field = _image_hdulist()[1]
+        source.fields.append(image)
+        dump_source(source, tmp_path / "a.src")
+        loaded = load_source(tmp_path / "a.src")
+
+        clone = clone_source(loaded)
+        clone.fields[0].field.meta["spec_types"].append("G2V")
+        clone.fields[1].field.header["BUNIT"] = "Jy"
+        assert loaded.fields[0].field.meta["spec_types"] == ["A0V"]
+        assert "BUNIT" not in loaded.fields[1].field.header
+        assert np.shares_memory(clone.fields[1].field.data,
+                                loaded.fields[1].field.data)
+
+    def test_disk_budget_evicts_oldest(self, tmp_path):
+        size = dump_source(_Source(), tmp_path / "probe.src")
+        (tmp_path / "probe.src").unlink()
+        cache = SourceCache(cache_dir=tmp_path, max_disk_bytes=int(2.5 * size))
+        for key in "abc":
+            cache.put(key, _Source())
+        assert sorted(p.stem for p in tmp_path.glob("*.src")) == ["b", "c"]
+
+    def test_budget_is_shared_by_instances(self, tmp_path):
+        size = dump_source(_Source(), tmp_path / "probe.src")
+        (tmp_path / "probe.src").unlink()
+        first = SourceCache(cache_dir=tmp_path, max_disk_bytes=int(2.5 * size))
+        second = SourceCache(cache_dir=tmp_path, max_disk_bytes=int(2.5 * size))
+        first.put("a", _Source())
+        second.put("b", _Source())
+        first.put("c", _Source())
+        assert sorted(p.stem for p in tmp_path.glob("*.src")) == ["b", "c"]
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_corrupt_file_is_a_miss(self, tmp_path):
+        (tmp_path / "a.src").write_bytes(b"not a source")
+        cache = SourceCache(cache_dir=tmp_path)
+        assert cache.get("a") is None
+        assert not (tmp_path / "a.src").exists()
+
+
+class TestCreateSourceCache:
+
+    @pytest.fixture(autouse=True)
+    def source_cache(self, monkeypatch):
+        cache = SourceCache()
+        monkeypatch.setattr(pipeline, "SOURCE_CACHE", cache)
+        return cache
+
+    @patch("elvis.pipeline.to_scopesim_target")
+    def test_identical_targets_are_built_once(self, mock_target, source_cache):
+        mock_target.return_value.to_source.side_effect = _Source
+        first = _create_source(ETC_JSON)
+        other = copy.deepcopy(ETC_JSON)
+        other["sky"] = {"airmass": 2.0}
+        second = _create_source(other)
+
+        assert mock_target.call_count == 1
+        assert first is not second
+        assert source_cache.stats["hits"] == 1
+
+    @patch("elvis.pipeline.to_scopesim_target")
+    def test_instrument_change_rebuilds_source(self, mock_target):
+        mock_target.return_value.to_source.side_effect = _Source
+        _create_source(ETC_JSON)
+        other = copy.deepcopy(ETC_JSON)
+        other["instrument"] = {"ins_configuration": "img_noao",
+                               "INS.FILT.NAME": "H"}
+        _create_source(other)
+        assert mock_target.call_count == 2
+
+    @patch("elvis.pipeline.to_scopesim_target", side_effect=ValueError("nope"))
+    def test_failures_are_not_cached(self, _mock, source_cache):
+        assert _create_source(ETC_JSON) is None
+        assert len(source_cache) == 0
@@ -5,15 +5,19 @@ Covers every ETC target option: morphology types, SED types, template
 catalogs, brightness bands, and edge cases.
 """
 
+import numpy as np
 import pytest
 from astropy import units as u
+from synphot import units as synphot_units
 
 from elvis.source.converter import (
     etc_target_to_scopesim_yaml,
+    resolve_spectrum,
     to_yaml_string,
     to_scopesim_target,
     _BAND_MAP,
 )
+from elvis.source.filters import FILTER_WAVESET, band_photon_flux, zero_point
 
 
 # =========================================================================
@@ -264,11 +268,53 @@ class TestBrightnessMapping:
         for band in all_bands:
             assert band in _BAND_MAP, f"Missing mapping for {band}"
 
+    def test_sed_and_instrument_are_kept(self):
+        etc_json = dict(_etc_json(), instrument={"INS.NXFW.NAME": "J"})
+        result = etc_target_to_scopesim_yaml(etc_json)
+        assert result["sed"] is etc_json["target"]["sed"]
+        assert result["instrument"] == {"INS.NXFW.NAME": "J"}
+
+    def test_target_only_has_no_instrument(self):
+        result = etc_target_to_scopesim_yaml(_etc_json()["target"])
+        assert result["instrument"] is None
+
     def test_magnitude_value_preserved(self):
         result = etc_target_to_scopesim_yaml(_etc_json(mag=22.5))
         assert result["brightness"][1].value == 22.5
 
 
+# =========================================================================
+#  RESOLVED SPECTRA
+# =========================================================================
+
+class TestResolveSpectrum:
+    """Resolved spectra are normalised in the true ETC band."""
+
+    @staticmethod
+    def _band_mag(spec, band, magsys):
+        flux = spec(FILTER_WAVESET).to_value(synphot_units.PHOTLAM)
+        return -2.5 * np.log10(band_photon_flux(flux, band)
+                               / zero_point(band, magsys))
+
+    @pytest.mark.parametrize("spectrumtype, magband, magsys", [
+        ("powerlaw", "sdss_r", "AB"),
+        ("powerlaw", "VISTA_Ks", "vega"),
+        ("blackbody", "gaia_G", "vega"),
+    ])
+    def test_survey_band_is_not_collapsed(self, spectrumtype, magband, magsys):
+        d = etc_target_to_scopesim_yaml(_etc_json(
+            spectrumtype=spectrumtype, exponent=-1.5, temperature=4000,
+            magband=magband, mag=17, magsys=magsys))
+        spec = resolve_spectrum(d)
+        assert self._band_mag(spec, magband, magsys) == pytest.approx(17)
+
+    def test_without_sed_section_string_is_kept(self):
+        d = etc_target_to_scopesim_yaml(_etc_json(spectrumtype="powerlaw",
+                                                  exponent=2))
+        del d["sed"]
+        assert resolve_spectrum(d) == "powerlaw:2"
+
+
 # =========================================================================
 #  YAML STRING SERIALISATION TESTS
 # =========================================================================
@@ -0,0 +1,200 @@
+"""Tests for incremental re-simulation from configuration diffs."""
+
+import copy
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from elvis.incremental import (
+    STAGES,
+    IncrementalSimulation,
+    SessionStore,
+    changed_sections,
+    run_incremental_simulation,
+    stages_to_run,
+)
+from elvis.opticaltrain import configure_optical_train
+from elvis.timing import StageTimer
+
+ETC_JSON = {
+    "target": {"morphology": {"morphologytype": "point"}},
+    "sky": {"airmass": 1.2},
+    "seeing": {"turbulence_category": 50},
+    "instrument": {"ins_configuration": "img_noao"},
+    "timesnr": {"DET.DIT": 10, "DET.NDIT": 6},
+    "output": {},
+    "instrumentName": "hawki",
+}
+
+
+class _FakeOpticalTrain:
+    def __init__(self):
+        self.observed = 0
+        self.readouts = 0
+
+    def observe(self, source):
+        self.observed += 1
+
+    def readout(self):
+        self.readouts += 1
+        return [[fits.PrimaryHDU(), fits.ImageHDU(data=np.zeros((2, 2)))]]
+
+
+@pytest.fixture
+def patched_pipeline():
+    """Replace the expensive steps with counters."""
+    built = []
+
+    def build(instrument_name, from_template=False):
+        built.append(_FakeOpticalTrain())
+        return built[-1]
+
+    with patch("elvis.incremental.create_optical_train", side_effect=build), \
+         patch("elvis.incremental._create_source", return_value=object()) as src:
+        yield built, src
+
+
+def _changed(**sections):
+    new = copy.deepcopy(ETC_JSON)
+    for section, values in sections.items():
+        new[section].update(values)
+    return new
+
+
+# =========================================================================
+# Stage-dependency model
+# =========================================================================
+
+class TestStageModel:
+
+    def test_identical_json_changes_nothing(self):
+        assert changed_sections(ETC_JSON, copy.deepcopy(ETC_JSON)) == set()
+
+    def test_output_section_is_not_a_stage_input(self):
+        new = copy.deepcopy(ETC_JSON)
+        new["output"] = {"snr": True}
+        assert changed_sections(ETC_JSON, new) == set()
+
+    @pytest.mark.parametrize("changed, expected", [
+        ({"timesnr"}, ["readout"]),
+        ({"target"}, ["source", "observe", "readout"]),
+        ({"sky"}, ["configure", "observe", "readout"]),
+        ({"instrument"}, ["source", "configure", "observe", "readout"]),
+        ({"instrumentName"},
+         ["optical_train", "configure", "observe", "readout"]),
+        (set(), []),
+    ])
+    def test_stages_to_run(self, changed, expected):
+        assert stages_to_run(changed) == expected
+
+
+# =========================================================================
+# IncrementalSimulation
+# =========================================================================
+
+class TestIncrementalSimulation:
+
+    def test_first_run_runs_everything(self, patched_pipeline):
+        sim = IncrementalSimulation("hawki")
+        hdul = sim.run(ETC_JSON)
+        assert isinstance(hdul, fits.HDUList)
+        assert sim.last_stages == ["source", "optical_train", "configure",
+                                   "observe", "readout"]
+
+    def test_timesnr_change_only_reads_out(self, patched_pipeline):
+        built, src = patched_pipeline
+        sim = IncrementalSimulation("hawki")
+        sim.run(ETC_JSON)
+        sim.run(_changed(timesnr={"DET.DIT": 20}))
+
+        assert sim.last_stages == ["readout"]
+        assert len(built) == 1
+        assert built[0].observed == 1
+        assert built[0].readouts == 2
+        assert src.call_count == 1
+
+    def test_target_change_reobserves_same_optical_train(self, patched_pipeline):
+        built, src = patched_pipeline
+        sim = IncrementalSimulation("hawki")
+        sim.run(ETC_JSON)
+        sim.run(_changed(target={"morphology": {"morphologytype": "extended"}}))
+
+        assert len(built) == 1
+        assert built[0].observed == 2
+        assert src.call_count == 2
+
+    def test_sky_change_uses_fresh_optical_train(self, patched_pipeline):
+        built, _ = patched_pipeline
+        sim = IncrementalSimulation("hawki")
+        sim.run(ETC_JSON)
+        sim.run(_changed(sky={"airmass": 2.0}))
+        assert len(built) == 2
+
+    def test_unchanged_json_returns_previous_result(self, patched_pipeline):
+        sim = IncrementalSimulation("hawki")
+        first = sim.run(ETC_JSON)
+        assert sim.run(copy.deepcopy(ETC_JSON)) is first
+        assert sim.last_stages == []
+
+    def test_timer_records_every_stage(self, patched_pipeline):
+        sim = IncrementalSimulation("hawki")
+        timer = StageTimer()
+        sim.run(ETC_JSON, timer=timer)
+        assert list(timer.timings) == ["source", "optical_train", "configure",
+                                       "observe", "readout", "merge"]
+
+    def test_skipped_stages_are_timed_as_zero(self, patched_pipeline):
+        sim = IncrementalSimulation("hawki")
+        sim.run(ETC_JSON)
+        timer = StageTimer()
+        sim.run(_changed(timesnr={"DET.DIT": 20}), timer=timer)
+        assert timer.timings["readout"] > 0
+        assert all(timer.timings[name] == 0.0
+                   for name in ("source", "optical_train", "configure",
+                                "observe"))
+
+    def test_timings_are_not_kept_in_the_session_result(self, patched_pipeline):
+        sim = IncrementalSimulation("hawki")
+        hdul = sim.run(ETC_JSON, timer=StageTimer())
+        assert not any(k.startswith("ELVIS TIME") for k in hdul[0].header)
+
+    def test_fallback_without_optical_train(self):
+        with patch("elvis.incremental.create_optical_train", return_value=None):
+            hdul = IncrementalSimulation("hawki").run(ETC_JSON)
+        assert hdul[0].header["INSTRUMENTNAME"] == "hawki"
+
+    def test_fallback_header_has_timings(self):
+        with patch("elvis.incremental.create_optical_train", return_value=None):
+            hdul = IncrementalSimulation("hawki").run(ETC_JSON,
+                                                      timer=StageTimer())
+        assert "ELVIS TIME OPTICAL_TRAIN" in hdul[0].header
+
+    def test_unapplied_sections_are_no_stage_inputs(self):
+        assert "seeingiqao" not in STAGES["configure"]["sections"]
+
+    def test_empty_sections_apply_nothing(self):
+        with patch.dict("elvis.opticaltrain.configurator._APPLIERS",
+                        {"sky": lambda *args: pytest.fail("applied")}):
+            configure_optical_train(object(), ETC_JSON, sections=())
+
+
+# =========================================================================
+# Sessions
+# =========================================================================
+
+class TestSessions:
+
+    def test_sessions_are_separate(self, patched_pipeline):
+        built, _ = patched_pipeline
+        store = SessionStore()
+        run_incremental_simulation(ETC_JSON, "a", store=store)
+        run_incremental_simulation(ETC_JSON, "b", store=store)
+        assert len(built) == 2
+
+    def test_store_is_bounded(self):
+        store = SessionStore(max_sessions=2)
+        for session_id in "abc":
+            store.get(session_id, "hawki")
+        assert len(store) == 2
@@ -0,0 +1,129 @@
+"""Tests for the asynchronous simulation job queue."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from elvis.jobs import JobQueue, QueueFull, DONE, FAILED, EXPIRED
+
+
+def _wait(queue, job_id, timeout=5.0):
+    """Poll until the job has finished."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job is None or job.status in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"Job {job_id} did not finish in time")
+
+
+@pytest.fixture
+def queue():
+    q = JobQueue(runner=lambda etc_json: etc_json["payload"])
+    yield q
+    q.shutdown()
+
+
+class TestJobQueue:
+
+    def test_submit_returns_immediately(self):
+        release = threading.Event()
+
+        def slow_runner(etc_json):
+            release.wait(5)
+            return b"done"
+
+        queue = JobQueue(runner=slow_runner)
+        job = queue.submit({})
+        assert queue.get(job.id).status in ("queued", "running")
+        release.set()
+        assert _wait(queue, job.id).status == DONE
+        queue.shutdown()
+
+    def test_result_is_available_when_done(self, queue):
+        job = queue.submit({"payload": b"fits bytes"})
+        _wait(queue, job.id)
+        assert queue.result(job.id) == b"fits bytes"
+
+    def test_failed_job_records_error(self):
+        def failing_runner(etc_json):
+            raise RuntimeError("observe failed")
+
+        queue = JobQueue(runner=failing_runner)
+        job = _wait(queue, queue.submit({}).id)
+        assert job.status == FAILED
+        assert "observe failed" in job.error
+        assert queue.result(job.id) is None
+        queue.shutdown()
+
+    def test_unknown_job_is_none(self, queue):
+        assert queue.get("nonexistent") is None
+
+    def test_finished_jobs_expire_after_ttl(self):
+        queue = JobQueue(runner=lambda etc_json: b"x", ttl=0)
+        job = queue.submit({})
+        queue.shutdown()
+        job.finished -= 1
+        assert queue.get(job.id) is None
+
+    def test_memory_budget_drops_oldest_result(self):
+        queue = JobQueue(runner=lambda etc_json: etc_json["payload"],
+                         max_workers=1, max_memory_bytes=10)
+        first = _wait(queue, queue.submit({"payload": b"a" * 6}).id)
+        second = _wait(queue, queue.submit({"payload": b"b" * 6}).id)
+        assert queue.get(first.id) is None
+        assert queue.result(second.id) == b"b" * 6
+        queue.shutdown()
+
+    def test_memory_budget_spills_to_disk(self, tmp_path):
+        queue = JobQueue(runner=lambda etc_json: etc_json["payload"],
+                         max_workers=1, max_memory_bytes=10,
+                         result_dir=tmp_path)
+        first = _wait(queue, queue.submit({"payload": b"a" * 6}).id)
+        _wait(queue, queue.submit({"payload": b"b" * 6}).id)
+        assert first.result is None
+        assert queue.result(first.id) == b"a" * 6
+        queue.shutdown()
+
+    def test_submit_raises_when_queue_is_full(self):
+        release = threading.Event()
+        queue = JobQueue(runner=lambda etc_json: release.wait() and b"x",
+                         max_workers=1, max_jobs=2)
+        queue.submit({})
+        queue.submit({})
+        with pytest.raises(QueueFull):
+            queue.submit({})
+        release.set()
+        queue.shutdown()
+
+    def test_failed_jobs_count_towards_max_jobs(self):
+        def fail(etc_json):
+            raise RuntimeError("boom")
+
+        queue = JobQueue(runner=fail, max_workers=1, max_jobs=1)
+        _wait(queue, queue.submit({}).id)
+        with pytest.raises(QueueFull):
+            queue.submit({})
+        queue.shutdown()
+
+    def test_spill_failure_is_logged_and_drops_result(self, tmp_path, caplog,
+                                                      monkeypatch):
+        def disk_full(self, data):
+            raise OSError(28, "No space left on device")
+
+        monkeypatch.setattr(Path, "write_bytes", disk_full)
+        queue = JobQueue(runner=lambda etc_json: etc_json["payload"],
+                         max_workers=1, max_memory_bytes=10,
+                         result_dir=tmp_path)
+        first = _wait(queue, queue.submit({"payload": b"a" * 6}).id)
+        with caplog.at_level("ERROR", logger="elvis.jobs"):
+            second = _wait(queue, queue.submit({"payload": b"b" * 6}).id)
+        queue.shutdown()
+        assert "Could not spill" in caplog.text
+        assert first.status == EXPIRED
+        assert queue.get(first.id) is None
+        assert queue.result(second.id) == b"b" * 6
+        assert not list(tmp_path.iterdir())
@@ -0,0 +1,126 @@
+"""Tests for the Prometheus-style metrics registry and /metrics endpoint."""
+
+import json
+import re
+import uuid
+from pathlib import Path
+
+import pytest
+
+from elvis.metrics import Registry
+from elvis.opticaltrain.factory import INSTRUMENT_MAP
+from elvis.server import app
+
+JSON_FILENAME = Path(__file__).parent / "data/eris_nix.json"
+
+
+@pytest.fixture
+def client():
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _sample(text, line_start):
+    """Return the value of the first exposition line starting with a prefix."""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+# =========================================================================
+# Registry
+# =========================================================================
+
+class TestRegistry:
+
+    def test_counter_exposition(self):
+        registry = Registry()
+        counter = registry.counter("test_total", "A counter.", ["instrument"])
+        counter.inc(instrument="eris")
+        counter.inc(2, instrument="eris")
+        text = registry.render()
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{instrument="eris"} 3.0' in text
+
+    def test_counter_cannot_decrease(self):
+        counter = Registry().counter("test_total", "A counter.")
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_wrong_labels_raise(self):
+        counter = Registry().counter("test_total", "A counter.", ["stage"])
+        with pytest.raises(ValueError):
+            counter.inc(instrument="eris")
+
+    def test_gauge_up_and_down(self):
+        registry = Registry()
+        gauge = registry.gauge("test_in_flight", "A gauge.")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        assert "test_in_flight 1.0" in registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        hist = registry.histogram("test_seconds", "A histogram.",
+                                  buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            hist.observe(value)
+        text = registry.render()
+        assert 'test_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_seconds_bucket{le="1.0"} 2' in text
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert "test_seconds_count 3" in text
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        registry.counter("test_total", "A counter.", ["name"]).inc(name='a"b')
+        assert 'test_total{name="a\\"b"} 1.0' in registry.render()
+
+    def test_collectors_run_before_render(self):
+        registry = Registry()
+        gauge = registry.gauge("test_value", "A gauge.")
+        registry.add_collector(lambda: gauge.set(42))
+        assert "test_value 42.0" in registry.render()
+
+
+# =========================================================================
+# /metrics endpoint
+# =========================================================================
+
+class TestMetricsEndpoint:
+
+    def test_scrape_after_process(self, client):
+        with open(JSON_FILENAME, "r") as file:
+            json_data = json.load(file)
+        client.post("/process", json=json_data)
+
+        response = client.get("/metrics")
+        text = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+        assert _sample(text, 'elvis_requests_total{endpoint="/process",'
+                             'method="POST",status="200"}') >= 1
+        assert _sample(text, 'elvis_request_duration_seconds_count'
+                             '{endpoint="/process",instrument="eris"}') >= 1
+        assert _sample(text, 'elvis_fallback_total{instrument="eris"}') >= 1
+        assert _sample(text, 'elvis_output_bytes_total'
+                             '{endpoint="/process"}') > 0
+        assert 'elvis_stage_duration_seconds_count{instrument="eris",' \
+               'stage="serialise"}' in text
+        assert "elvis_result_cache_hit_ratio" in text
+        assert "elvis_requests_in_flight" in text
+
+    def test_client_instrument_names_do_not_create_series(self, client):
+        names = [f"bogus-{uuid.uuid4().hex}" for _ in range(20)]
+        for name in names:
+            client.post("/process", json={"instrumentName": name})
+
+        text = client.get("/metrics").get_data(as_text=True)
+        labels = set(re.findall(r'instrument="([^"]*)"', text))
+        assert not labels & set(names)
+        assert "unknown" in labels
+        assert labels <= {"", "unknown"} | set(INSTRUMENT_MAP)
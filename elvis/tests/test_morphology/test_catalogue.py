@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from elvis.source import catalogue
+from elvis.source import PointSourceMorphology
+from elvis.source.catalogue import (
+    SPEC_TYPE_MAX_LENGTH,
+    chunk_rows_for,
+    iter_catalogue,
+    iter_catalogue_fields,
+    read_catalogue_field,
+)
+
+N_STARS = 1000
+SPEC_TYPES = ["G2V", "K0III", "M5V", "A0V"]
+
+
+@pytest.fixture
+def stars():
+    rng = np.random.default_rng(42)
+    return {
+        "x": rng.normal(size=N_STARS).astype(np.float32),
+        "y": rng.normal(size=N_STARS).astype(np.float32),
+        "mag": rng.uniform(15, 25, N_STARS).astype(np.float32),
+        "spec_type": np.array(SPEC_TYPES)[rng.integers(0, 4, N_STARS)],
+    }
+
+
+@pytest.fixture
+def fits_catalogue(tmp_path, stars):
+    path = tmp_path / "stars.fits"
+    columns = [fits.Column("X", "E", array=stars["x"]),
+               fits.Column("Y", "E", array=stars["y"]),
+               fits.Column("MAG", "E", array=stars["mag"]),
+               fits.Column("SPEC_TYPE", "8A", array=stars["spec_type"])]
+    fits.BinTableHDU.from_columns(columns).writeto(path)
+    return path
+
+
+@pytest.fixture
+def csv_catalogue(tmp_path, stars):
+    path = tmp_path / "stars.csv"
+    with open(path, "w") as f:
+        f.write("# a crowded field\nspec_type, x, y, mag\n")
+        for spec_type, x, y, mag in zip(stars["spec_type"], stars["x"],
+                                        stars["y"], stars["mag"]):
+            f.write(f"{spec_type}, {float(x)}, {float(y)}, {float(mag)}\n")
+    return path
+
+
+@pytest.fixture(params=["fits_catalogue", "csv_catalogue"])
+def path(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_reads_all_rows_in_chunks(path, stars):
+    chunks = list(iter_catalogue(path, chunk_rows=300))
+    assert [len(c["x"]) for c in chunks] == [300, 300, 300, 100]
+    for name in ("x", "y", "mag"):
+        column = np.concatenate([c[name] for c in chunks])
+        assert column.dtype == np.float32
+        np.testing.assert_array_equal(column, stars[name])
+    spec_type = np.concatenate([c["spec_type"] for c in chunks])
+    assert spec_type.astype(str).tolist() == stars["spec_type"].tolist()
+
+
+def test_memory_ceiling_limits_chunk_rows(path):
+    columns = ["x", "y", "mag", "spec_type"]
+    # FITS strings keep the width of the file's column
+    dtypes = {"spec_type": "S8"} if path.suffix == ".fits" else None
+    step = chunk_rows_for(columns, max_bytes=50_000, dtypes=dtypes)
+    assert step < N_STARS
+    chunks = list(iter_catalogue(path, chunk_rows=10**9, max_bytes=50_000))
+    assert max(len(c["x"]) for c in chunks) == step
+
+
+def test_fields_share_one_list_of_spectral_types(path, stars):
+    spec_types = []
+    for table in iter_catalogue_fields(path, chunk_rows=100,
+                                       spec_types=spec_types):
+        assert table["x"].dtype == np.float32
+        assert table["ref"].dtype == np.int32
+        types = np.array(table.meta["spec_types"], dtype=object)
+        assert (types[table["ref"]] == table["spec_type"]).all()
+    assert sorted(spec_types) == sorted(SPEC_TYPES)
+
+
+def test_fields_have_the_columns_of_point_source_fields(path):
+    expected = PointSourceMorphology().make_field(x=[0.0], y=[0.0])
+    for table in iter_catalogue_fields(path, chunk_rows=300):
+        assert table.colnames == expected.colnames
+        assert [table[c].dtype for c in table.colnames] == \
+            [expected[c].dtype for c in expected.colnames]
+
+
+def test_read_catalogue_field(path, stars):
+    table = read_catalogue_field(path, chunk_rows=128)
+    assert len(table) == N_STARS
+    np.testing.assert_allclose(table["weight"], 10 ** (-0.4 * stars["mag"].astype(float)),
+                               rtol=1e-6)
+    types = np.array(table.meta["spec_types"])
+    assert types[table["ref"]].tolist() == stars["spec_type"].tolist()
+    assert list(table["spec_type"]) == stars["spec_type"].tolist()
+
+
+def test_positions_only_catalogue(tmp_path):
+    path = tmp_path / "positions.csv"
+    path.write_text("X,Y\n0.5,1.5\n-1,2\n")
+    table = read_catalogue_field(path)
+    assert table["x"].tolist() == [0.5, -1.0]
+    assert table["weight"].tolist() == [1.0, 1.0]
+    assert table.meta["spec_types"] == [None]
+    assert table["spec_type"][0] is None
+
+
+def test_missing_position_column_raises(tmp_path):
+    path = tmp_path / "no_y.csv"
+    path.write_text("x,mag\n0,10\n")
+    with pytest.raises(ValueError, match="no column"):
+        list(iter_catalogue(path))
+
+
+def test_factorise_long_types():
+    values = np.array(["a_very_long_type", "a_very_long_typ", "", "b"] * 5,
+                      dtype="S16")
+    categories, codes = catalogue._factorise(values)
+    assert (categories[codes] == values).all()
+    assert len(categories) == 4
+
+
+def test_quoted_csv_header_and_values(tmp_path):
+    path = tmp_path / "quoted.csv"
+    path.write_text('"X", "Y","Spec_Type"\n# note\n\n'
+                    '0.5,1.5,"G2V"\n-1,2,"K0III"\n')
+    table = read_catalogue_field(path)
+    assert table["x"].tolist() == [0.5, -1.0]
+    assert list(table["spec_type"]) == ["G2V", "K0III"]
+
+
+def test_long_fits_spectral_types_are_kept(tmp_path):
+    path = tmp_path / "long.fits"
+    long_type = "a_spectral_type_of_forty_characters_long"
+    columns = [fits.Column("X", "E", array=[0.0, 1.0]),
+               fits.Column("Y", "E", array=[0.0, 1.0]),
+               fits.Column("SPEC_TYPE", "40A", array=[long_type, "G2V"])]
+    fits.BinTableHDU.from_columns(columns).writeto(path)
+    table = read_catalogue_field(path)
+    assert list(table["spec_type"]) == [long_type, "G2V"]
+
+
+def test_too_long_csv_spectral_type_raises(tmp_path):
+    path = tmp_path / "long.csv"
+    longest = "t" * SPEC_TYPE_MAX_LENGTH
+    path.write_text(f"x,y,spec_type\n0,0,{longest}\n1,1,{longest}x\n")
+    with pytest.raises(ValueError, match="longer than"):
+        read_catalogue_field(path)
+    path.write_text(f"x,y,spec_type\n0,0,{longest}\n")
+    assert read_catalogue_field(path)["spec_type"][0] == longest
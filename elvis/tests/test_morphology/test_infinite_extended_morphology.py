@@ -3,7 +3,7 @@ import pytest
 import numpy as np
 
 from astropy.io.fits import ImageHDU
-from elvis.source import InfiniteExtendedMorphology
+from elvis.source import InfiniteExtendedMorphology, is_lazy_field, materialise_field
 
 
 def show_image(hdu: ImageHDU, title: str):
@@ -63,3 +63,46 @@ def test_uniform_flux_scaling_for_values_above_1_arcsec():
         f"Patch sum {patch_sum:.3f} != 1.0 for pixel scale {pixel_scale}"
 
     show_image(hdu, f"Infinite Uniform Source (pix={pixel_scale:.3f} arcsec)")
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_dtype_option(dtype):
+    morph = InfiniteExtendedMorphology()
+    hdu = morph.make_field(pixel_scale=0.1, fov_diameter=2, dtype=dtype)
+    assert hdu.data.dtype == dtype
+    assert hdu.data.shape == (21, 21)
+
+
+def test_float32_by_default():
+    hdu = InfiniteExtendedMorphology().make_field(pixel_scale=0.1, fov_diameter=2)
+    assert hdu.data.dtype == np.float32
+
+
+def test_lazy_field():
+    hdu = InfiniteExtendedMorphology().make_field(pixel_scale=0.01, fov_diameter=50,
+                                                  materialise=False)
+    assert hdu.data.shape == (5001, 5001)
+    assert is_lazy_field(hdu)
+    # a single value backs the whole field
+    assert hdu.data.base.nbytes == np.dtype(np.float32).itemsize
+    assert hdu.header["PIXVALUE"] == pytest.approx(1e-4)
+    with pytest.raises(ValueError):
+        hdu.data[0, 0] = 0
+
+
+def test_materialise_field():
+    hdu = InfiniteExtendedMorphology().make_field(pixel_scale=0.1, fov_diameter=2,
+                                                  materialise=False)
+    expected = np.full((21, 21), 0.01, dtype=np.float32)
+    assert materialise_field(hdu) is hdu
+    assert not is_lazy_field(hdu)
+    hdu.data[0, 0] = 0
+    np.testing.assert_array_equal(hdu.data[1:], expected[1:])
+
+
+def test_field_is_writeable_by_default():
+    hdu = InfiniteExtendedMorphology().make_field(pixel_scale=0.1, fov_diameter=2)
+    assert not is_lazy_field(hdu)
+    assert hdu.data.flags.writeable
+    hdu.data *= 2
+    np.testing.assert_allclose(hdu.data, 0.02)
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from astropy.table import Table
 from elvis.source import PointSourceMorphology
 
@@ -84,3 +85,78 @@ def test_mismatched_column_lengths_raises_error():
             ref=[0],  # Length mismatch
             weight=[1.0, 1.0]
         )
+
+
+def test_numpy_columns_have_compact_dtypes():
+    n = 1000
+    table = PointSourceMorphology().make_field(
+        x=np.linspace(-1, 1, n),
+        y=np.zeros(n),
+        ref=np.arange(n, dtype=np.int64),
+    )
+    assert table["x"].dtype == np.float32
+    assert table["y"].dtype == np.float32
+    assert table["ref"].dtype == np.int32
+    assert table["weight"].dtype == np.float64
+    assert len(table) == n
+
+
+def test_memory_mapped_columns_are_not_copied(tmp_path):
+    x = np.memmap(tmp_path / "x.dat", dtype=np.float32, mode="w+", shape=(100,))
+    x[:] = np.arange(100)
+    table = PointSourceMorphology().make_field(x=x, y=x)
+    assert np.shares_memory(table["x"], x)
+    assert table["y"][99] == 99
+
+
+def test_spec_types_are_categorical():
+    spec_type = np.array(["G2V", "M5V", "G2V", "K0III"] * 250)
+    table = PointSourceMorphology().make_field(
+        x=np.zeros(1000), y=np.zeros(1000), spec_type=spec_type)
+    assert table.meta["spec_types"] == ["G2V", "K0III", "M5V"]
+    assert list(table["spec_type"][:4]) == ["G2V", "M5V", "G2V", "K0III"]
+    # every row refers to one of the few category objects
+    assert len({id(v) for v in table["spec_type"]}) == 3
+
+
+def test_spec_types_mixed_with_none():
+    table = PointSourceMorphology().make_field(
+        x=[0, 1, 2], y=[0, 1, 2], spec_type=["star", None, "star"])
+    assert table.meta["spec_types"] == ["star", None]
+    assert table["spec_type"][1] is None
+
+
+def test_two_dimensional_column_raises_error():
+    with pytest.raises(ValueError, match="one-dimensional"):
+        PointSourceMorphology().make_field(x=np.zeros((2, 2)), y=np.zeros((2, 2)))
+
+
+def test_integral_float_refs_are_accepted():
+    table = PointSourceMorphology().make_field(x=[0, 1], y=[0, 1],
+                                               ref=np.array([0.0, 2.0]))
+    assert table["ref"].dtype == np.int32
+    assert list(table["ref"]) == [0, 2]
+
+
+@pytest.mark.parametrize("ref", [[0.5, 1.0], [np.nan, 0.0], ["a", "b"],
+                                 np.array([0, 2**40])])
+def test_invalid_refs_raise_error(ref):
+    with pytest.raises(ValueError, match="'ref'"):
+        PointSourceMorphology().make_field(x=[0, 1], y=[0, 1], ref=ref)
+
+
+def test_from_columns_with_categories_does_not_factorise():
+    codes = np.array([1, 0, 1], dtype=np.int32)
+    table = PointSourceMorphology.from_columns(
+        np.zeros(3, np.float32), np.ones(3, np.float32), ref=codes,
+        spec_type=codes, categories=["G2V", "M5V"])
+    assert table.meta["spec_types"] == ["G2V", "M5V"]
+    assert list(table["spec_type"]) == ["M5V", "G2V", "M5V"]
+    assert np.shares_memory(table["ref"], codes)
+
+
+@pytest.mark.parametrize("codes", [[0, 2], [-1, 0], [0.5, 1.0]])
+def test_from_columns_rejects_codes_outside_categories(codes):
+    with pytest.raises(ValueError, match="'spec_type'"):
+        PointSourceMorphology.from_columns(
+            [0, 1], [0, 1], spec_type=np.array(codes), categories=["a", "b"])
@@ -0,0 +1,193 @@
+import numpy as np
+import pytest
+from scipy.integrate import dblquad, quad
+
+from elvis.cache import TemplateCache
+from elvis.source import SersicExtendedMorphology, rendering
+from elvis.source.rendering import (
+    field_size,
+    render_sersic,
+    sersic_flux,
+    sersic_grid,
+    sersic_profile,
+)
+
+
+@pytest.fixture
+def grid_cache(monkeypatch):
+    cache = TemplateCache(sizeof=rendering.GRID_CACHE.sizeof)
+    monkeypatch.setattr(rendering, "GRID_CACHE", cache)
+    return cache
+
+
+def direct_sersic(npix, pixel_scale, index, radius, ellipticity, angle):
+    """Reference: evaluate the profile on every pixel of a full meshgrid."""
+    axis = (np.arange(npix) - npix // 2) * pixel_scale
+    x, y = np.meshgrid(axis, axis)
+    theta = np.radians(angle)
+    x_rot = x * np.cos(theta) + y * np.sin(theta)
+    y_rot = -x * np.sin(theta) + y * np.cos(theta)
+    r = np.sqrt(x_rot**2 + (y_rot / (1 - ellipticity)) ** 2)
+    return sersic_profile(r, index, radius)
+
+
+CASES = [
+    (101, 0.05, 1.0, 0.5, 0.0, 0),
+    (101, 0.05, 3.5, 0.8, 0.5, 30),
+    (101, 0.05, 1.0, 1.0, 0.95, 0),
+    (401, 0.01, 4.0, 0.2, 0.3, 77),
+    (301, 0.02, 10.0, 1.0, 0.9, -45),
+]
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("npix, pixel_scale, index, radius, ellipticity, angle",
+                         CASES)
+def test_matches_direct_evaluation(npix, pixel_scale, index, radius,
+                                   ellipticity, angle, dtype):
+    expected = direct_sersic(npix, pixel_scale, index, radius, ellipticity, angle)
+    image = render_sersic(npix, pixel_scale, index, radius, ellipticity, angle,
+                          dtype=dtype)
+    assert image.dtype == dtype
+    assert np.max(np.abs(image - expected)) < 1e-4 * expected.max()
+
+
+def test_image_is_point_symmetric():
+    image = render_sersic(51, 0.1, 2.0, 0.7, 0.4, 20)
+    np.testing.assert_array_equal(image, image[::-1, ::-1])
+
+
+@pytest.mark.parametrize("dtype", [None, np.float32, np.float64])
+def test_make_field_dtype(dtype):
+    kwargs = {} if dtype is None else {"dtype": dtype}
+    hdu = SersicExtendedMorphology(index=2.0, radius=0.5).make_field(
+        pixel_scale=0.05, fov_diameter=5, **kwargs)
+    assert hdu.data.dtype == (dtype or np.float32)
+    assert np.sum(hdu.data, dtype=np.float64) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_grid_is_shared_across_profiles(grid_cache):
+    morph = SersicExtendedMorphology(index=1.0, radius=0.5)
+    other = SersicExtendedMorphology(index=4.0, radius=2.0)
+    for m in (morph, other, morph):
+        m.make_field(pixel_scale=0.05, fov_diameter=5, ellipticity=0.2, angle=10)
+    assert grid_cache.stats == {"hits": 2, "misses": 1, "evictions": 0}
+
+
+def test_new_geometry_or_dtype_is_a_new_grid(grid_cache):
+    render_sersic(51, 0.1, 1.0, 1.0)
+    render_sersic(51, 0.1, 1.0, 1.0, angle=10)
+    render_sersic(51, 0.1, 1.0, 1.0, dtype=np.float64)
+    assert len(grid_cache) == 3
+
+
+def test_cached_grid_is_read_only(grid_cache):
+    grid = sersic_grid(51, 0.1)
+    with pytest.raises(ValueError):
+        grid.index[0, 0] = 1
+
+
+def test_grid_cache_is_bounded(grid_cache):
+    grid_cache.max_bytes = int(2.5 * sum(a.nbytes for a in sersic_grid(51, 0.1)[1:]))
+    for angle in (10, 20, 30):
+        sersic_grid(51, 0.1, angle=angle)
+    assert len(grid_cache) == 2
+    assert grid_cache.stats["evictions"] == 2
+
+
+@pytest.mark.parametrize("pixel_scale, fov, npix", [
+    (0.1, 5.0, 51), (0.1, 5.05, 51), (1.0, 4.0, 5),
+])
+def test_field_size_is_odd(pixel_scale, fov, npix):
+    assert field_size(pixel_scale, fov) == npix
+
+
+def test_single_pixel_field():
+    image = render_sersic(1, 0.1, 4.0, 1.0)
+    assert image.shape == (1, 1) and np.isfinite(image).all()
+
+
+def pixel_means(npix, pixel_scale, index, radius, ellipticity, angle, k=200):
+    """
+    Reference: mean of k x k sub-samples per pixel, and an adaptive
+    integral of the central pixel, which holds the cusp.
+    """
+    a, b, c = rendering._quadratic_form(ellipticity, angle)
+    axis = (np.arange(npix) - npix // 2) * pixel_scale
+    offsets = ((np.arange(k) + 0.5) / k - 0.5) * pixel_scale
+    image = np.empty((npix, npix))
+    for i, y0 in enumerate(axis):
+        for j, x0 in enumerate(axis):
+            x = x0 + offsets[None, :]
+            y = y0 + offsets[:, None]
+            r = np.sqrt(a * x * x + b * x * y + c * y * y)
+            image[i, j] = sersic_profile(r, index, radius).mean()
+
+    # One quadrant at a time, so the cusp is at a corner of each
+    def profile(y, x):
+        return sersic_profile(np.sqrt(a * x * x + b * x * y + c * y * y),
+                              index, radius)
+
+    h = pixel_scale / 2
+    total = sum(dblquad(profile, x0, x0 + h, y0, y0 + h, epsrel=1e-8)[0]
+                for x0 in (-h, 0) for y0 in (-h, 0))
+    image[npix // 2, npix // 2] = total / pixel_scale**2
+    return image
+
+
+@pytest.mark.parametrize("index, radius, ellipticity, angle", [
+    (1.0, 0.05, 0.0, 0), (4.0, 0.05, 0.0, 0), (4.0, 0.05, 0.5, 30),
+    (8.0, 0.05, 0.0, 0),
+])
+def test_adaptive_core_matches_pixel_means(index, radius, ellipticity, angle):
+    npix, pixel_scale = 21, 0.013
+    expected = pixel_means(npix, pixel_scale, index, radius, ellipticity, angle)
+    image = render_sersic(npix, pixel_scale, index, radius, ellipticity, angle,
+                          dtype=np.float64, adaptive=True)
+    plain = render_sersic(npix, pixel_scale, index, radius, ellipticity, angle,
+                          dtype=np.float64)
+    # every pixel to within the tolerance of its own value
+    error = np.abs(image - expected) / expected
+    assert error.max() < rendering.OVERSAMPLING_TOLERANCE
+    assert error.max() < (np.abs(plain - expected) / expected).max() / 5
+
+
+def test_adaptive_leaves_smooth_profiles_alone():
+    # a wide Gaussian (n = 0.5) changes by < 1% across every pixel
+    plain = render_sersic(101, 0.05, 0.5, 10.0, dtype=np.float64)
+    image = render_sersic(101, 0.05, 0.5, 10.0, dtype=np.float64, adaptive=True)
+    np.testing.assert_array_equal(image, plain)
+
+
+@pytest.mark.parametrize("index", [0.5, 1.0, 4.0, 10.0])
+def test_sersic_flux_matches_radial_integral(index):
+    radius, ellipticity = 0.7, 0.3
+
+    def integrand(log_r):
+        r = np.exp(log_r)
+        return 2 * np.pi * (1 - ellipticity) * r * r * \
+            sersic_profile(r, index, radius)
+
+    total = sersic_flux(index, radius, ellipticity)
+    assert quad(integrand, -30, np.log(1e6), limit=500)[0] == \
+        pytest.approx(total, rel=1e-6)
+    # about half of the flux is inside the effective radius
+    assert sersic_flux(index, radius, ellipticity, r=radius) / total == \
+        pytest.approx(0.5, abs=0.02)
+
+
+def test_make_field_adaptive_is_normalised_analytically():
+    morph = SersicExtendedMorphology(index=4.0, radius=0.3)
+    hdu = morph.make_field(pixel_scale=0.02, fov_diameter=3,
+                           oversampling="adaptive")
+    enclosed = sersic_flux(4.0, 0.3, r=1.5) / sersic_flux(4.0, 0.3)
+    assert hdu.header["FLUXFRAC"] == pytest.approx(np.sum(hdu.data, dtype=np.float64))
+    # the field is a square around the circle of radius fov / 2
+    assert enclosed < hdu.header["FLUXFRAC"] < 1
+    assert hdu.header["FLUXFRAC"] == pytest.approx(enclosed, abs=0.02)
+
+
+def test_make_field_unknown_oversampling_raises():
+    with pytest.raises(ValueError):
+        SersicExtendedMorphology(index=1.0, radius=0.5).make_field(
+            pixel_scale=0.05, fov_diameter=5, oversampling="full")
@@ -0,0 +1,93 @@
+"""Tests for the offline OpticalTrain stand-in."""
+
+import pytest
+from astropy.table import Table
+from astropy.io import fits
+import numpy as np
+
+from elvis.opticaltrain import OfflineOpticalTrain, create_optical_train
+from elvis.opticaltrain.offline import SKY_BACKGROUND
+from elvis.pipeline import _readout_to_hdulist
+
+
+class _FakeSource:
+    def __init__(self, *fields):
+        self.fields = list(fields)
+
+
+# =========================================================================
+# Detector layouts
+# =========================================================================
+
+class TestDetectorLayouts:
+
+    @pytest.mark.parametrize("instrument, n_detectors", [("hawki", 4),
+                                                         ("eris", 1)])
+    def test_readout_matches_instrument_layout(self, instrument, n_detectors):
+        opt = OfflineOpticalTrain(instrument, seed=1)
+        opt.observe(None)
+        readout = opt.readout()
+        assert len(readout) == n_detectors
+        assert all(hdul[1].data.shape == (2048, 2048) for hdul in readout)
+
+    def test_unknown_instrument_raises(self):
+        with pytest.raises(ValueError):
+            OfflineOpticalTrain("micado")
+
+    def test_square_layout(self):
+        opt = OfflineOpticalTrain.square(64, seed=1)
+        assert opt.n_pixels == 64 * 64
+
+
+# =========================================================================
+# observe / readout
+# =========================================================================
+
+class TestObserveReadout:
+
+    def test_readout_before_observe_raises(self):
+        with pytest.raises(RuntimeError):
+            OfflineOpticalTrain.square(8).readout()
+
+    def test_empty_source_gives_sky_background(self):
+        opt = OfflineOpticalTrain.square(128, seed=1)
+        opt.observe(None)
+        data = opt.readout()[0][1].data
+        assert data.mean() == pytest.approx(SKY_BACKGROUND, rel=0.05)
+
+    def test_point_source_is_rendered_at_centre(self):
+        opt = OfflineOpticalTrain.square(128, seed=1)
+        opt.observe(_FakeSource(Table({"x": [0.0], "y": [0.0],
+                                       "weight": [1.0]})))
+        data = opt.readout()[0][1].data
+        y, x = np.unravel_index(np.argmax(data), data.shape)
+        assert abs(x - 64) <= 1 and abs(y - 64) <= 1
+
+    def test_image_field_is_added(self):
+        opt = OfflineOpticalTrain.square(32, seed=1)
+        opt.observe(_FakeSource(fits.ImageHDU(np.full((8, 8), 1000.0))))
+        assert opt._frames[0].sum() == pytest.approx(
+            32 * 32 * SKY_BACKGROUND + 64 * 1000.0)
+
+    def test_readout_merges_into_hdulist(self):
+        opt = OfflineOpticalTrain("hawki", seed=1)
+        opt.observe(None)
+        hdul = _readout_to_hdulist(opt.readout())
+        assert isinstance(hdul[0], fits.PrimaryHDU)
+        assert sum(hdu.data.size for hdu in hdul if hdu.data is not None) \
+            == opt.n_pixels
+
+
+# =========================================================================
+# Factory flag
+# =========================================================================
+
+class TestCreateOffline:
+
+    def test_factory_flag_returns_offline_train(self):
+        opt = create_optical_train("eris", offline=True)
+        assert isinstance(opt, OfflineOpticalTrain)
+
+    def test_factory_flag_still_validates_name(self):
+        with pytest.raises(ValueError):
+            create_optical_train("nonexistent", offline=True)
@@ -0,0 +1,193 @@
+"""Tests for the OpticalTrain pool in elvis.opticaltrain.factory."""
+
+import pytest
+
+from elvis.opticaltrain.factory import (
+    OpticalTrainPool,
+    _restore_defaults,
+    _snapshot_defaults,
+)
+
+
+# ---------------------------------------------------------------------------
+# Minimal stand-ins for the parts of a ScopeSim OpticalTrain the pool uses
+# ---------------------------------------------------------------------------
+
+class _Map:
+    def __init__(self, dic):
+        self.dic = dic
+
+
+class _ChainMap:
+    def __init__(self, maps):
+        self.maps = maps
+
+
+class _Cmds:
+    # UserCommands keeps its layers on a NestedChainMap at ``.cmds``
+    def __init__(self):
+        self.cmds = _ChainMap([_Map({}), _Map({"!OBS": {"dit": 1, "ndit": 1}})])
+
+
+class _Effect:
+    def __init__(self, name):
+        self.meta = {"name": name, "include": True}
+
+
+class _OpticsManager:
+    def __init__(self):
+        self.all_effects = [_Effect("filter_wheel"), _Effect("detector")]
+
+
+class _FakeOpticalTrain:
+    def __init__(self, instrument_name):
+        self.instrument_name = instrument_name
+        self.cmds = _Cmds()
+        self.optics_manager = _OpticsManager()
+        self.image_planes = []
+        self._last_source = None
+
+
+class _CountingBuilder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, instrument_name):
+        if instrument_name not in ("eris", "hawki"):
+            raise ValueError(f"Unknown instrument '{instrument_name}'.")
+        self.calls += 1
+        return _FakeOpticalTrain(instrument_name)
+
+
+@pytest.fixture
+def builder():
+    return _CountingBuilder()
+
+
+# =========================================================================
+# Checkout / return
+# =========================================================================
+
+class TestOpticalTrainPoolReuse:
+
+    def test_released_optical_train_is_reused(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        opt = pool.acquire("hawki")
+        pool.release("hawki", opt)
+        assert pool.acquire("hawki") is opt
+        assert builder.calls == 1
+
+    def test_instruments_are_pooled_separately(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        pool.release("hawki", pool.acquire("hawki"))
+        opt = pool.acquire("eris")
+        assert opt.instrument_name == "eris"
+        assert builder.calls == 2
+
+    def test_max_size_limits_idle_instances(self, builder):
+        pool = OpticalTrainPool(max_size=1, builder=builder)
+        first, second = pool.acquire("eris"), pool.acquire("eris")
+        pool.release("eris", first)
+        pool.release("eris", second)
+        assert pool.size("eris") == 1
+
+    def test_discarded_optical_train_is_not_reused(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        opt = pool.acquire("eris")
+        pool.release("eris", opt, discard=True)
+        assert pool.size() == 0
+        assert pool.acquire("eris") is not opt
+
+    def test_checkout_context_manager_discards_on_error(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        with pytest.raises(RuntimeError):
+            with pool.checkout("eris"):
+                raise RuntimeError("observe failed")
+        assert pool.size("eris") == 0
+
+    def test_unknown_instrument_raises(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        with pytest.raises(ValueError, match="Unknown instrument"):
+            pool.acquire("nonexistent_instrument")
+
+    def test_none_is_never_pooled(self):
+        pool = OpticalTrainPool(builder=lambda name: None)
+        opt = pool.acquire("eris")
+        pool.release("eris", opt)
+        assert opt is None
+        assert pool.size() == 0
+
+    def test_warm_prebuilds_instruments(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        pool.warm(["eris", "hawki"])
+        assert pool.size("eris") == 1
+        assert pool.size("hawki") == 1
+
+
+# =========================================================================
+# Reset to defaults
+# =========================================================================
+
+class TestOpticalTrainPoolReset:
+
+    def test_cmds_are_reset_on_release(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        opt = pool.acquire("hawki")
+        opt.cmds.cmds.maps[1].dic["!OBS"]["dit"] = 60
+        opt.cmds.cmds.maps[0].dic["!INST"] = {"filter_name": "Ks"}
+        pool.release("hawki", opt)
+
+        assert opt.cmds.cmds.maps[1].dic["!OBS"]["dit"] == 1
+        assert opt.cmds.cmds.maps[0].dic == {}
+
+    def test_real_user_commands_are_reset(self):
+        scopesim = pytest.importorskip("scopesim")
+        opt = _FakeOpticalTrain("hawki")
+        opt.cmds = scopesim.UserCommands(properties={"!OBS.dit": 1})
+        snapshot = _snapshot_defaults(opt)
+        assert snapshot["cmds"]
+
+        opt.cmds["!OBS.dit"] = 60
+        _restore_defaults(opt, snapshot)
+        assert opt.cmds["!OBS.dit"] == 1
+
+    def test_observed_state_is_dropped_on_release(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        opt = pool.acquire("hawki")
+        opt.image_planes = [bytearray(1024)]
+        opt._last_source = object()
+        pool.release("hawki", opt)
+
+        assert opt.image_planes == []
+        assert opt._last_source is None
+
+    def test_effect_meta_is_reset_on_release(self, builder):
+        pool = OpticalTrainPool(builder=builder)
+        opt = pool.acquire("hawki")
+        effect = opt.optics_manager.all_effects[0]
+        effect.meta["include"] = False
+        effect.meta["current"] = "Ks"
+        pool.release("hawki", opt)
+
+        assert effect.meta == {"name": "filter_wheel", "include": True}
+
+
+# =========================================================================
+# Idle eviction
+# =========================================================================
+
+class TestOpticalTrainPoolEviction:
+
+    def test_idle_instruments_are_evicted(self, builder):
+        pool = OpticalTrainPool(idle_timeout=0, builder=builder)
+        pool.release("eris", pool.acquire("eris"))
+        pool._last_used["eris"] -= 1
+        pool.evict_idle()
+        assert pool.size("eris") == 0
+
+    def test_no_eviction_without_timeout(self, builder):
+        pool = OpticalTrainPool(idle_timeout=None, builder=builder)
+        pool.release("eris", pool.acquire("eris"))
+        pool._last_used["eris"] -= 1e6
+        pool.evict_idle()
+        assert pool.size("eris") == 1
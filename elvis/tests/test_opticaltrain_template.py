@@ -0,0 +1,138 @@
+"""Tests for copy-on-write OpticalTrain cloning in elvis.opticaltrain."""
+
+import threading
+
+import numpy as np
+import pytest
+from synphot import Empirical1D, SpectralElement
+
+from elvis.opticaltrain import create_optical_train, clone_optical_train
+from elvis.opticaltrain.template import OpticalTrainTemplates
+
+
+# ---------------------------------------------------------------------------
+# Minimal stand-ins for the parts of a ScopeSim OpticalTrain that are cloned
+# ---------------------------------------------------------------------------
+
+class _DataContainer:
+    def __init__(self):
+        self.data = np.ones((64, 64))
+
+
+class _Effect:
+    def __init__(self, name, cmds):
+        self.meta = {"name": name, "include": True}
+        self.cmds = cmds
+        self.data_container = _DataContainer()
+        self.kernel = np.zeros((8, 8))
+        self.surface = SpectralElement(Empirical1D, points=[1e4, 2e4],
+                                       lookup_table=[0.5, 0.5])
+
+
+class _OpticsManager:
+    def __init__(self, cmds):
+        self.all_effects = [_Effect("psf", cmds), _Effect("detector", cmds)]
+
+
+class _FakeOpticalTrain:
+    def __init__(self):
+        self.cmds = {"!OBS": {"dit": 1}}
+        self.optics_manager = _OpticsManager(self.cmds)
+        self.yaml_dicts = [{"name": "HAWKI"}]
+        self.image_planes = [np.zeros((128, 128))]
+        self.detector_managers = [object()]
+        self.fov_manager = object()
+
+
+@pytest.fixture
+def template():
+    return _FakeOpticalTrain()
+
+
+# =========================================================================
+# clone_optical_train
+# =========================================================================
+
+class TestCloneOpticalTrain:
+
+    def test_clone_is_new_object(self, template):
+        clone = clone_optical_train(template)
+        assert clone is not template
+        assert clone.optics_manager is not template.optics_manager
+
+    def test_effect_data_is_shared(self, template):
+        clone = clone_optical_train(template)
+        for orig, new in zip(template.optics_manager.all_effects,
+                             clone.optics_manager.all_effects):
+            assert new is not orig
+            assert new.data_container is orig.data_container
+            assert new.kernel is orig.kernel
+            assert new.surface is orig.surface
+
+    def test_effect_meta_is_copied(self, template):
+        clone = clone_optical_train(template)
+        clone.optics_manager.all_effects[0].meta["include"] = False
+        assert template.optics_manager.all_effects[0].meta["include"] is True
+
+    def test_cmds_are_copied_and_relinked(self, template):
+        clone = clone_optical_train(template)
+        clone.cmds["!OBS"]["dit"] = 60
+        assert template.cmds["!OBS"]["dit"] == 1
+        assert clone.optics_manager.all_effects[0].cmds is clone.cmds
+
+    def test_observe_state_is_not_copied(self, template):
+        clone = clone_optical_train(template)
+        assert clone.image_planes == []
+        assert clone.detector_managers == []
+        assert clone.fov_manager is None
+        assert len(template.image_planes) == 1
+
+
+# =========================================================================
+# OpticalTrainTemplates registry
+# =========================================================================
+
+class TestOpticalTrainTemplates:
+
+    def test_template_is_built_once(self):
+        calls = []
+
+        def builder(name):
+            calls.append(name)
+            return _FakeOpticalTrain()
+
+        templates = OpticalTrainTemplates(builder=builder)
+        first, second = templates.clone("hawki"), templates.clone("hawki")
+        assert calls == ["hawki"]
+        assert first is not second
+        assert "hawki" in templates
+
+    def test_slow_build_does_not_block_other_instruments(self):
+        started, release = threading.Event(), threading.Event()
+
+        def builder(name):
+            if name == "hawki":
+                started.set()
+                release.wait(5)
+            return _FakeOpticalTrain()
+
+        templates = OpticalTrainTemplates(builder=builder)
+        slow = threading.Thread(target=templates.get, args=("hawki",))
+        slow.start()
+        try:
+            assert started.wait(5)
+            assert templates.get("eris") is not None
+            assert "hawki" not in templates
+        finally:
+            release.set()
+            slow.join()
+        assert "hawki" in templates
+
+    def test_missing_template_returns_none(self):
+        templates = OpticalTrainTemplates(builder=lambda name: None)
+        assert templates.clone("hawki") is None
+        assert "hawki" not in templates
+
+    def test_factory_validates_instrument_name(self):
+        with pytest.raises(ValueError, match="Unknown instrument"):
+            create_optical_train("nonexistent_instrument", from_template=True)
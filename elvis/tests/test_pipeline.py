@@ -1,6 +1,9 @@
 """Tests for the ELVIS simulation pipeline."""
 
 import copy
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import patch
 
 import pytest
@@ -8,6 +11,9 @@ from astropy.io import fits
 
 from elvis.pipeline import (
     run_simulation,
+    run_simulations,
+    batch_executor,
+    iter_simulation_results,
     _create_source,
     _fallback_header_only,
     _readout_to_hdulist,
@@ -184,6 +190,78 @@ class TestRunSimulationFallback:
         assert hdul[0].header["SKY AIRMASS"] == 1.2
 
 
+# =========================================================================
+# run_simulations — batch execution
+# =========================================================================
+
+class TestRunSimulations:
+
+    def _payloads(self, n):
+        payloads = []
+        for i in range(n):
+            payload = copy.deepcopy(POINT_SOURCE_JSON)
+            payload["target"]["brightness"]["mag"] = 10 + i
+            payload["instrumentName"] = "hawki" if i % 2 else "eris"
+            payloads.append(payload)
+        return payloads
+
+    def test_results_are_in_order(self):
+        hduls = run_simulations(self._payloads(4), max_workers=1)
+        assert [h[0].header["TARGET BRIGHTNESS MAG"] for h in hduls] == \
+            [10, 11, 12, 13]
+
+    def test_process_pool_results_are_in_order(self):
+        hduls = run_simulations(self._payloads(4), max_workers=2)
+        assert [h[0].header["TARGET BRIGHTNESS MAG"] for h in hduls] == \
+            [10, 11, 12, 13]
+
+    def test_unordered_yields_every_index(self):
+        results = run_simulations(self._payloads(3), max_workers=1,
+                                  ordered=False)
+        indices = sorted(index for index, _ in results)
+        assert indices == [0, 1, 2]
+
+    def test_batch_pool_is_long_lived(self):
+        assert batch_executor(2) is batch_executor(2)
+
+    def test_closing_the_stream_cancels_pending_payloads(self):
+        calls = []
+
+        def slow(payload):
+            calls.append(payload["instrumentName"])
+            time.sleep(0.2)
+            return b"fits"
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        with patch("elvis.pipeline.run_cached_simulation", side_effect=slow):
+            results = iter_simulation_results(self._payloads(4),
+                                              executor=executor)
+            assert next(results)[0] == 0
+            results.close()
+            executor.shutdown(wait=True)
+        # the first payload and at most the one running at close time
+        assert len(calls) <= 2
+
+    def test_broken_pool_yields_error_entries(self):
+        class _BrokenExecutor:
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_exception(BrokenProcessPool("worker died"))
+                return future
+
+        results = list(iter_simulation_results(self._payloads(3),
+                                               executor=_BrokenExecutor()))
+        assert sorted(index for index, _, _ in results) == [0, 1, 2]
+        assert all(data is None and "BrokenProcessPool" in error
+                   for _, data, error in results)
+
+    @patch("elvis.pipeline.run_cached_simulation",
+           side_effect=RuntimeError("boom"))
+    def test_failure_names_payload_index(self, _mock):
+        with pytest.raises(RuntimeError, match="payload 0"):
+            run_simulations(self._payloads(1), max_workers=1)
+
+
 # =========================================================================
 # _readout_to_hdulist
 # =========================================================================
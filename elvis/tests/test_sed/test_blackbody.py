@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from astropy import units as u
+from synphot import SourceSpectrum, units
+from synphot.models import BlackBody1D
+
+from elvis.source import blackbody
+from elvis.source.blackbody import BLACKBODY_WAVESET, get_blackbody
+from elvis.source.converter import etc_target_to_scopesim_yaml
+from elvis.source.filters import FILTERS, band_photon_flux, zero_point
+from elvis.cache import TemplateCache
+from elvis.source.sed_utils import get_blackbody_spectrum
+
+WAVESET = np.geomspace(3000, 50000, 400) * u.AA
+
+
+@pytest.fixture(autouse=True)
+def blackbody_cache(monkeypatch):
+    cache = TemplateCache()
+    monkeypatch.setattr(blackbody, "BLACKBODY_CACHE", cache)
+    return cache
+
+
+@pytest.mark.parametrize("temperature", [1000, 5750, 30000])
+def test_matches_synphot_blackbody(temperature):
+    expected = SourceSpectrum(BlackBody1D(temperature=temperature * u.K))
+    spec = get_blackbody(temperature)
+    np.testing.assert_allclose(spec(WAVESET).value, expected(WAVESET).value,
+                               rtol=1e-4)
+
+
+@pytest.mark.parametrize("wave", [100.0, 500.0, 2e6, 1e7])
+def test_planck_law_outside_the_grid(wave):
+    # e.g. the rest wavelengths of a z = 10 source seen at 0.5 micron
+    expected = SourceSpectrum(BlackBody1D(temperature=5000 * u.K))
+    spec = get_blackbody(5000)
+    assert spec(wave * u.AA).value > 0
+    assert spec(wave * u.AA).value == pytest.approx(
+        expected(wave * u.AA).value, rel=1e-10)
+
+
+def test_normalisation_applies_outside_the_grid():
+    spec = get_blackbody(5000)
+    normalised = get_blackbody(5000, "V", 10)
+    wave = [500.0, 20000.0, 2e6] * u.AA
+    ratio = normalised(wave).value / spec(wave).value
+    np.testing.assert_allclose(ratio, ratio[1], rtol=1e-10)
+
+
+def test_spectrum_is_memoised_per_temperature(blackbody_cache):
+    get_blackbody(5000)
+    get_blackbody(5000 * u.K)
+    get_blackbody(6000)
+    assert blackbody_cache.stats == {"hits": 1, "misses": 2, "evictions": 0}
+
+
+def test_copies_share_the_tabulated_flux():
+    first, second = get_blackbody(5000), get_blackbody(5000)
+    assert first.model.lookup_table is second.model.lookup_table
+    first.z = 1.0
+    assert get_blackbody(5000).z == 0
+
+
+@pytest.mark.parametrize("band, mag, magsys", [
+    ("V", 0, "vega"), ("J", 12.5, "vega"), ("sdss_r", 20, "AB"),
+])
+def test_normalised_to_magnitude(band, mag, magsys):
+    spec = get_blackbody(5000, band, mag * u.mag, magsys)
+    flux = spec(BLACKBODY_WAVESET).to_value(units.PHOTLAM)
+    ratio = band_photon_flux(flux, band) / zero_point(band, magsys)
+    assert -2.5 * np.log10(ratio) == pytest.approx(mag)
+
+
+def test_normalisation_is_memoised_per_band_and_mag(blackbody_cache):
+    get_blackbody(5000, "V", 10)
+    get_blackbody(5000, "V", 10 * u.mag)
+    get_blackbody(5000, "V", 11)
+    # the unnormalised curve is computed once and reused
+    assert blackbody_cache.stats["misses"] == 3
+    assert blackbody_cache.stats["hits"] == 2
+
+
+@pytest.mark.parametrize("band, mag", [("V", None), (None, 10), ("Q", 10)])
+def test_invalid_normalisation_raises(band, mag):
+    with pytest.raises(ValueError):
+        get_blackbody(5000, band, mag)
+
+
+def test_sed_utils_uses_provider(blackbody_cache):
+    spec = get_blackbody_spectrum({"temperature": 4000})
+    assert spec.waveset is not None
+    assert blackbody_cache.stats["misses"] == 1
+
+
+def test_converter_string_resolves_through_provider():
+    etc = {"target": {"morphology": {"morphologytype": "point"},
+                      "sed": {"sedtype": "spectrum",
+                              "spectrum": {"spectrumtype": "blackbody",
+                                           "params": {"temperature": 8000}}},
+                      "brightness": {"magband": "K", "mag": 14}}}
+    result = etc_target_to_scopesim_yaml(etc)
+    temp = u.Quantity(result["spectrum"].removeprefix("blackbody:"))
+    spec = get_blackbody(temp, result["magband"], result["brightness"][1],
+                         result["magsys"])
+    assert spec.meta["temperature"] == 8000
+
+
+# Before elvis.source.blackbody, to_scopesim_target normalised blackbodies
+# with spextra (tabulated filter curves and Vega spectrum).  The analytic
+# filters of elvis.source.filters agree with it to within 0.1 mag in the
+# band, and the spectral shape (Planck's law) must agree to 1 %.
+SPEXTRA_MAG_TOLERANCE = 0.1
+
+
+@pytest.mark.parametrize("temperature, magband, mag", [
+    (5000, "V", 10), (8000, "K", 14), (3500, "J", 12.5),
+])
+def test_normalisation_matches_spextra(temperature, magband, mag):
+    spextra = pytest.importorskip("spextra")
+    etc = {"target": {"morphology": {"morphologytype": "point"},
+                      "sed": {"sedtype": "spectrum",
+                              "spectrum": {"spectrumtype": "blackbody",
+                                           "params": {"temperature":
+                                                      temperature}}},
+                      "brightness": {"magband": magband, "mag": mag,
+                                     "magsys": "vega"}}}
+    result = etc_target_to_scopesim_yaml(etc)
+    band, amplitude = result["brightness"]
+    expected = spextra.Spextrum.black_body_spectrum(
+        temperature * u.K, amplitude, band)
+    spec = get_blackbody(temperature * u.K, result["magband"], amplitude,
+                         result["magsys"])
+
+    centre, fwhm, _ = FILTERS[magband]
+    wave = np.linspace(centre - fwhm / 2, centre + fwhm / 2, 50) * u.AA
+    ratio = spec(wave).to_value(units.PHOTLAM) \
+        / expected(wave).to_value(units.PHOTLAM)
+    assert abs(2.5 * np.log10(ratio.mean())) < SPEXTRA_MAG_TOLERANCE
+    np.testing.assert_allclose(ratio, ratio.mean(), rtol=0.01)
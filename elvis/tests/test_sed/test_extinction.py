@@ -0,0 +1,65 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from astropy import units as u
+
+from elvis.source import sed_utils
+from elvis.source.sed_utils import (
+    get_eso_attenuation_batch,
+    get_eso_extinction_element,
+    get_unit_extinction_curve,
+)
+
+WAVESET = np.linspace(0.4, 4.0, 500) * u.micron
+
+
+@pytest.fixture(autouse=True)
+def empty_curve_cache():
+    sed_utils._EXTINCTION_CURVES.clear()
+    yield
+    sed_utils._EXTINCTION_CURVES.clear()
+
+
+def test_curve_is_evaluated_once_per_waveset_and_rv():
+    with patch.object(sed_utils, "F99", wraps=sed_utils.F99) as f99:
+        get_eso_extinction_element(WAVESET, a_v=1.0)
+        get_eso_extinction_element(WAVESET, a_v=2.5)
+        get_eso_extinction_element(WAVESET.to(u.AA), a_v=0.5)
+        assert f99.call_count == 1
+
+        get_eso_extinction_element(WAVESET, a_v=1.0, r_v=5.0)
+        assert f99.call_count == 2
+
+
+def test_attenuation_scales_with_av():
+    single = get_eso_extinction_element(WAVESET, a_v=1.0)(WAVESET).value
+    double = get_eso_extinction_element(WAVESET, a_v=2.0)(WAVESET).value
+    np.testing.assert_allclose(double, single ** 2)
+
+
+def test_v_band_extinction_is_av():
+    v_band = np.array([0.55]) * u.micron
+    assert get_unit_extinction_curve(v_band)[0] == pytest.approx(1.0, abs=0.05)
+
+
+def test_cached_curve_is_read_only():
+    curve = get_unit_extinction_curve(WAVESET)
+    with pytest.raises(ValueError):
+        curve[0] = 0.0
+
+
+def test_batch_matches_single_evaluations():
+    a_v_values = [0.0, 0.5, 3.0]
+    batch = get_eso_attenuation_batch(WAVESET, a_v_values)
+    assert batch.shape == (3, len(WAVESET))
+    for row, a_v in zip(batch, a_v_values):
+        single = get_eso_extinction_element(WAVESET, a_v=a_v)(WAVESET).value
+        np.testing.assert_allclose(row, single)
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(sed_utils, "EXTINCTION_CACHE_SIZE", 2)
+    for r_v in (2.5, 3.1, 4.0):
+        get_unit_extinction_curve(WAVESET, r_v=r_v)
+    assert len(sed_utils._EXTINCTION_CURVES) == 2
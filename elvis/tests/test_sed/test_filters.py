@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from elvis.eris_etc_form.config import MAGBAND_GROUPS as ERIS_MAGBANDS
+from elvis.hawki_etc_form.config import MAGBAND_GROUPS as HAWKI_MAGBANDS
+from elvis.source.filters import (
+    FILTER_WAVESET,
+    FILTERS,
+    band_photon_flux,
+    get_filter_curve,
+    normalisation_scale,
+    zero_point,
+)
+
+WAVE = FILTER_WAVESET.to_value(u.AA)
+
+
+@pytest.mark.parametrize("groups", [ERIS_MAGBANDS, HAWKI_MAGBANDS])
+def test_every_form_band_has_a_filter(groups):
+    for group in groups:
+        for option in group["options"]:
+            assert option["value"] in FILTERS
+
+
+def test_flat_spectrum_band_flux_is_its_level():
+    flux = np.full(len(WAVE), 3.0)
+    for band in FILTERS:
+        assert band_photon_flux(flux, band) == pytest.approx(3.0)
+
+
+def test_band_flux_matches_photon_weighted_integral():
+    flux = 1e3 * (WAVE / 1e4) ** -2
+    for band in ("V", "sdss_g", "VISTA_Ks"):
+        curve = get_filter_curve(band)
+        wave = curve.waveset.to_value(u.AA)
+        weight = curve(curve.waveset).value * wave
+        expected = (np.trapezoid(np.interp(wave, WAVE, flux) * weight, wave)
+                    / np.trapezoid(weight, wave))
+        assert band_photon_flux(flux, band) == pytest.approx(expected)
+
+
+def test_band_flux_of_many_spectra_at_once():
+    flux = np.outer([1.0, 2.0, 5.0], np.ones(len(WAVE)))
+    np.testing.assert_allclose(band_photon_flux(flux, "J"), [1.0, 2.0, 5.0])
+
+
+def test_vega_v_zero_point():
+    # ~1000 photons / s / cm2 / AA for Vega at 5500 AA
+    assert zero_point("V") == pytest.approx(1000, rel=0.05)
+
+
+def test_ab_minus_vega_offset():
+    ratio = zero_point("K", "AB") / zero_point("K", "vega")
+    assert -2.5 * np.log10(ratio) == pytest.approx(-FILTERS["K"][2])
+
+
+def test_normalisation_scale():
+    flux = np.full(len(WAVE), 10.0)
+    scale = normalisation_scale(flux, "H", 5.0, "vega")
+    assert band_photon_flux(flux * scale, "H") == pytest.approx(
+        zero_point("H") * 10 ** -2)
+
+
+@pytest.mark.parametrize("band, magsys", [("Q", "vega"), ("V", "ST")])
+def test_unknown_band_or_system_raises(band, magsys):
+    with pytest.raises(ValueError):
+        zero_point(band, magsys)
+
+
+def test_table_is_read_only():
+    from elvis.source.filters import _FILTER_TABLE
+    _, weights = _FILTER_TABLE["V"]
+    with pytest.raises(ValueError):
+        weights[0] = 1.0
@@ -0,0 +1,209 @@
+import numpy as np
+import pytest
+from astropy import units as u
+from synphot import Empirical1D, SourceSpectrum, units
+
+from elvis.cache import TemplateCache
+from elvis.source import converter, filters, resolution, sed, sed_utils
+from elvis.source.resolution import (
+    IMAGING_RESOLVING_POWER,
+    degrade_spectrum,
+    instrument_mode,
+)
+
+PICKLES_SED = {
+    "sedtype": "spectrum",
+    "spectrum": {"spectrumtype": "template",
+                 "params": {"catalog": "Pickles", "id": "G:2:V"}},
+    "extinctionav": 0,
+}
+
+
+def _line_spectrum(centre=12000.0, sigma=0.05):
+    """High-resolution flat continuum with one very narrow emission line."""
+    wave = np.arange(10000.0, 15000.0, 0.02)
+    flux = 1.0 + 100.0 * np.exp(-0.5 * ((wave - centre) / sigma) ** 2)
+    return SourceSpectrum(Empirical1D, points=wave * u.AA,
+                          lookup_table=flux * units.PHOTLAM)
+
+
+@pytest.fixture
+def templates_path(tmp_path, monkeypatch):
+    (tmp_path / "Pickles").mkdir()
+    _line_spectrum().to_fits(str(tmp_path / "Pickles" / "G2V.fits"))
+    monkeypatch.setattr(sed_utils, "TEMPLATES_PATH", tmp_path)
+    monkeypatch.setattr(sed_utils, "TEMPLATE_CACHE", TemplateCache())
+    monkeypatch.setattr(resolution, "DEGRADED_TEMPLATE_CACHE", TemplateCache())
+    return tmp_path
+
+
+# =========================================================================
+# Instrument modes
+# =========================================================================
+
+class TestInstrumentMode:
+
+    def test_ifs_grating_from_config(self):
+        mode = instrument_mode({"ins_configuration": "IFS",
+                                "INS.BAND.NAME": "K_short"})
+        assert mode == {"resolving_power": 11200.0,
+                        "wave_min": 1.93, "wave_max": 2.20}
+
+    @pytest.mark.parametrize("instrument", [
+        {"ins_configuration": "nixIMG", "INS.NXFW.NAME": "J"},
+        {"ins_configuration": "img_noao", "INS.FILT.NAME": "J"},
+    ])
+    def test_imaging_filter_from_config(self, instrument):
+        mode = instrument_mode(instrument)
+        assert mode["resolving_power"] == IMAGING_RESOLVING_POWER
+        assert mode["wave_min"] < 1.25 < mode["wave_max"]
+
+    def test_unknown_mode_is_none(self):
+        assert instrument_mode({"ins_configuration": "unknown"}) is None
+        assert instrument_mode(None) is None
+
+
+# =========================================================================
+# degrade_spectrum
+# =========================================================================
+
+class TestDegradeSpectrum:
+
+    def test_output_is_much_smaller(self):
+        spec = _line_spectrum()
+        degraded = degrade_spectrum(spec, 5000, 1.1, 1.4)
+        assert len(degraded.waveset) < len(spec.waveset) / 50
+
+    def test_line_is_broadened_to_resolving_power(self):
+        degraded = degrade_spectrum(_line_spectrum(), 5000, 1.1, 1.4)
+        wave = degraded.waveset.to_value(u.AA)
+        excess = degraded(degraded.waveset).value - 1.0
+        centre = np.sum(excess * wave) / np.sum(excess)
+        sigma = np.sqrt(np.sum(excess * (wave - centre) ** 2) / np.sum(excess))
+        assert 2.355 * sigma == pytest.approx(12000.0 / 5000, rel=0.2)
+
+    def test_line_flux_is_conserved(self):
+        spec = _line_spectrum()
+        degraded = degrade_spectrum(spec, 5000, 1.1, 1.4)
+        wave = degraded.waveset.to_value(u.AA)
+        excess = degraded(degraded.waveset).value - 1.0
+        expected = 100.0 * 0.05 * np.sqrt(2 * np.pi)
+        assert np.trapezoid(excess, wave) == pytest.approx(expected, rel=0.02)
+
+    def test_wavelength_range_is_cropped(self):
+        degraded = degrade_spectrum(_line_spectrum(), 1000, 1.2, 1.3)
+        wave = degraded.waveset.to_value(u.micron)
+        assert wave.min() >= 1.2 and wave.max() <= 1.3 * (1 + 1 / 2000)
+
+
+# =========================================================================
+# get_spectrum with an instrument section
+# =========================================================================
+
+class TestGetSpectrumForInstrument:
+
+    def test_template_is_degraded_for_known_mode(self, templates_path):
+        spec = sed.get_spectrum(PICKLES_SED, instrument={"INS.BAND.NAME": "J_low"})
+        assert spec.meta["resolving_power"] == 5000.0
+        assert len(spec.waveset) < 3000
+
+    def test_template_is_not_degraded_without_instrument(self, templates_path):
+        spec = sed.get_spectrum(PICKLES_SED)
+        assert "resolving_power" not in spec.meta
+
+    def test_degraded_template_is_cached(self, templates_path):
+        instrument = {"INS.NXFW.NAME": "J"}
+        sed.get_spectrum(PICKLES_SED, instrument=instrument)
+        sed.get_spectrum(PICKLES_SED, instrument=instrument)
+        assert resolution.DEGRADED_TEMPLATE_CACHE.stats["hits"] == 1
+
+    def test_redshifted_template_covers_mode_range(self, templates_path):
+        redshifted = dict(PICKLES_SED, redshift={"redshift": 0.1})
+        spec = sed.get_spectrum(redshifted, instrument={"INS.NXFW.NAME": "J"})
+        mode = instrument_mode({"INS.NXFW.NAME": "J"})
+        wave = spec.waveset.to_value(u.micron)
+        assert wave.min() == pytest.approx(mode["wave_min"], rel=1e-3)
+        assert wave.max() == pytest.approx(mode["wave_max"], rel=1e-3)
+
+    def test_degraded_template_is_normalised_like_the_full_one(
+            self, templates_path):
+        # The Pa-b filter only covers part of the J band
+        brightness = {"magband": "J", "mag": 12, "magsys": "AB"}
+        full = sed.get_spectrum(PICKLES_SED, brightness=brightness)
+        degraded = sed.get_spectrum(PICKLES_SED,
+                                    instrument={"INS.NXFW.NAME": "Pa-b"},
+                                    brightness=brightness)
+        wave = [12300, 12600] * u.AA
+        np.testing.assert_allclose(degraded(wave).value, full(wave).value,
+                                   rtol=1e-3)
+
+    def test_band_outside_mode_range(self, templates_path):
+        brightness = {"magband": "K", "mag": 12, "magsys": "vega"}
+        full = sed.get_spectrum(PICKLES_SED, brightness=brightness)
+        degraded = sed.get_spectrum(PICKLES_SED,
+                                    instrument={"INS.BAND.NAME": "J_low"},
+                                    brightness=brightness)
+        wave = 12600 * u.AA
+        assert degraded(wave).value > 0
+        assert degraded(wave).value == pytest.approx(full(wave).value,
+                                                     rel=1e-3)
+
+    def test_batch_degrades_templates(self, templates_path):
+        instrument = {"INS.NXFW.NAME": "J"}
+        wave = [11500, 12600, 13500] * u.AA
+        flux = sed.get_spectra([PICKLES_SED], waveset=wave,
+                               instrument=instrument)
+        expected = sed.get_spectrum(PICKLES_SED, instrument=instrument)(wave)
+        np.testing.assert_allclose(flux[0], expected.value, rtol=1e-6)
+
+
+# =========================================================================
+# Converter: templates resolved for the ETC instrument
+# =========================================================================
+
+class TestResolveTemplate:
+
+    @staticmethod
+    def _yaml_dict(instrument):
+        etc_json = {
+            "target": {"morphology": {"morphologytype": "point"},
+                       "sed": PICKLES_SED,
+                       "brightness": {"magband": "J", "mag": 12,
+                                      "magsys": "vega"}},
+            "instrument": instrument,
+        }
+        return converter.etc_target_to_scopesim_yaml(etc_json)
+
+    def test_template_is_degraded_to_the_instrument_mode(self, templates_path):
+        spec = converter.resolve_spectrum(
+            self._yaml_dict({"INS.BAND.NAME": "J_low"}))
+        expected = sed.get_spectrum(
+            PICKLES_SED, instrument={"INS.BAND.NAME": "J_low"},
+            brightness={"magband": "J", "mag": 12, "magsys": "vega"})
+        wave = [11500, 12600] * u.AA
+        np.testing.assert_allclose(spec(wave).value, expected(wave).value)
+        assert len(spec.waveset) < 3000
+
+    def test_template_is_normalised_in_the_survey_band(self, templates_path):
+        yaml_dict = self._yaml_dict({"INS.BAND.NAME": "J_low"})
+        yaml_dict["magband"], yaml_dict["magsys"] = "VISTA_J", "AB"
+        spec = converter.resolve_spectrum(yaml_dict)
+        expected = sed.get_spectrum(
+            PICKLES_SED, instrument={"INS.BAND.NAME": "J_low"},
+            brightness={"magband": "VISTA_J", "mag": 12, "magsys": "AB"})
+        wave = [11500, 12600] * u.AA
+        np.testing.assert_allclose(spec(wave).value, expected(wave).value)
+        full = sed_utils.get_template_spectrum(
+            PICKLES_SED["spectrum"]["params"])
+        flux = full(filters.FILTER_WAVESET).to_value(units.PHOTLAM)
+        scale = filters.normalisation_scale(flux, "VISTA_J", 12, "AB")
+        assert spec(wave[1]).value == pytest.approx(
+            scale * full(wave[1]).value, rel=1e-2)
+
+    def test_missing_template_falls_back_to_blackbody(self, tmp_path,
+                                                      monkeypatch):
+        monkeypatch.setattr(sed_utils, "TEMPLATES_PATH", tmp_path)
+        yaml_dict = self._yaml_dict({"INS.BAND.NAME": "J_low"})
+        yaml_dict["spectrum"] = "blackbody:5800 K"
+        spec = converter.resolve_spectrum(yaml_dict)
+        assert spec.meta["temperature"] == 5800.0
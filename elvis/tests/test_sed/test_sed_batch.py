@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from astropy import units as u
+from synphot import Empirical1D, SourceSpectrum, units
+
+from elvis.source import blackbody, sed_utils
+from elvis.source.sed import BATCH_WAVESET, get_spectra, get_spectrum
+from elvis.cache import TemplateCache
+from elvis.source.sed_utils import get_eso_extinction_element
+
+WAVESET = np.geomspace(5000, 40000, 300) * u.AA
+
+# get_spectrum interpolates tabulated blackbodies, get_spectra evaluates
+# Planck's law exactly
+BLACKBODY_RTOL = 1e-4
+
+
+def _rtol(sed_dict):
+    spectrumtype = sed_dict["spectrum"]["spectrumtype"]
+    return BLACKBODY_RTOL if spectrumtype == "blackbody" else 1e-10
+
+
+def _blackbody(temperature, redshift=0.0, extinctionav=0):
+    return {"sedtype": "spectrum",
+            "spectrum": {"spectrumtype": "blackbody",
+                         "params": {"temperature": temperature}},
+            "extinctionav": extinctionav,
+            "redshift": {"redshift": redshift}}
+
+
+def _powerlaw(exponent, redshift=0.0, extinctionav=0):
+    return {"sedtype": "spectrum",
+            "spectrum": {"spectrumtype": "powerlaw",
+                         "params": {"exponent": exponent}},
+            "extinctionav": extinctionav,
+            "redshift": {"redshift": redshift}}
+
+
+@pytest.fixture
+def templates_path(tmp_path, monkeypatch):
+    (tmp_path / "Pickles").mkdir()
+    wave = np.linspace(3000, 50000, 2000) * u.AA
+    flux = np.linspace(1, 3, 2000) * units.PHOTLAM
+    SourceSpectrum(Empirical1D, points=wave, lookup_table=flux).to_fits(
+        str(tmp_path / "Pickles" / "G2V.fits"))
+    monkeypatch.setattr(sed_utils, "TEMPLATES_PATH", tmp_path)
+    monkeypatch.setattr(sed_utils, "TEMPLATE_CACHE", TemplateCache())
+    return tmp_path
+
+
+@pytest.mark.parametrize("sed_dict", [
+    _blackbody(3000),
+    _blackbody(10000, redshift=0.5),
+    _powerlaw(-1.5),
+    _powerlaw(2.0, redshift=1.0),
+])
+def test_rows_match_get_spectrum(sed_dict):
+    flux = get_spectra([sed_dict], waveset=WAVESET)
+    expected = get_spectrum(sed_dict)(WAVESET).to_value(units.PHOTLAM)
+    np.testing.assert_allclose(flux[0], expected, rtol=_rtol(sed_dict))
+
+
+def test_mixed_batch_keeps_input_order():
+    seds = [_powerlaw(0), _blackbody(5000), _powerlaw(1), _blackbody(8000)]
+    flux = get_spectra(seds, waveset=WAVESET)
+    assert flux.shape == (4, len(WAVESET))
+    for row, sed_dict in zip(flux, seds):
+        expected = get_spectrum(sed_dict)(WAVESET).to_value(units.PHOTLAM)
+        np.testing.assert_allclose(row, expected, rtol=_rtol(sed_dict))
+
+
+def test_blackbodies_are_not_tabulated(monkeypatch):
+    cache = TemplateCache()
+    monkeypatch.setattr(blackbody, "BLACKBODY_CACHE", cache)
+    get_spectra([_blackbody(t) for t in range(3000, 3100)], waveset=WAVESET)
+    assert len(cache) == 0
+
+
+def test_template_rows(templates_path):
+    template = {"sedtype": "spectrum",
+                "spectrum": {"spectrumtype": "template",
+                             "params": {"catalog": "Pickles", "id": "G:2:V"}},
+                "redshift": {"redshift": 0.2}}
+    flux = get_spectra([template], waveset=WAVESET)
+    expected = get_spectrum(template)(WAVESET).to_value(units.PHOTLAM)
+    np.testing.assert_allclose(flux[0], expected, rtol=1e-10)
+
+
+def test_extinction_is_applied_in_rest_frame():
+    plain, extincted = get_spectra([_powerlaw(0, redshift=0.5),
+                                    _powerlaw(0, redshift=0.5, extinctionav=2)],
+                                   waveset=WAVESET)
+    rest_wave = WAVESET / 1.5
+    expected = get_eso_extinction_element(rest_wave, a_v=2)(rest_wave).value
+    np.testing.assert_allclose(extincted / plain, expected, rtol=1e-10)
+
+
+def test_default_waveset():
+    assert get_spectra([_powerlaw(0)]).shape == (1, len(BATCH_WAVESET))
+
+
+@pytest.mark.parametrize("sed_dict, error", [
+    ({"sedtype": "spectrum", "spectrum": {"spectrumtype": "upload"}},
+     NotImplementedError),
+    ({"sedtype": "emissionline"}, ValueError),
+    (_blackbody(-10), ValueError),
+])
+def test_invalid_seds_raise(sed_dict, error):
+    with pytest.raises(error):
+        get_spectra([sed_dict])
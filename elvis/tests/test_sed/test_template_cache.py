@@ -0,0 +1,87 @@
+import threading
+
+import numpy as np
+import pytest
+from astropy import units as u
+from synphot import Empirical1D, SourceSpectrum, units
+
+from elvis.cache import TemplateCache
+from elvis.source import sed_utils
+from elvis.source.sed_utils import read_marcs_spectrum
+
+MARCS_FILENAME = ("p5750_g+4.5_m0.0_t02_st_z+0.00_a+0.00_c+0.00_n+0.00"
+                  "_o+0.00.fits")
+
+
+def _spectrum(n=100):
+    return SourceSpectrum(Empirical1D,
+                          points=np.linspace(1000, 20000, n) * u.AA,
+                          lookup_table=np.ones(n) * units.FLAM)
+
+
+@pytest.fixture
+def templates_path(tmp_path, monkeypatch):
+    (tmp_path / "MARCS").mkdir()
+    _spectrum().to_fits(str(tmp_path / "MARCS" / MARCS_FILENAME))
+    monkeypatch.setattr(sed_utils, "TEMPLATES_PATH", tmp_path)
+    monkeypatch.setattr(sed_utils, "TEMPLATE_CACHE", TemplateCache())
+    return tmp_path
+
+
+def test_cache_hit_and_miss_statistics():
+    cache = TemplateCache()
+    assert cache.get("a") is None
+    cache.put("a", _spectrum())
+    assert cache.get("a") is not None
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_lru_eviction_by_bytes():
+    spec = _spectrum(100)                 # 2 x 100 float64 = 1600 bytes
+    cache = TemplateCache(max_bytes=3500)
+    cache.put("a", spec)
+    cache.put("b", spec)
+    cache.get("a")
+    cache.put("c", spec)
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.nbytes <= 3500
+    assert cache.stats["evictions"] == 1
+
+
+def test_oversized_spectrum_is_not_cached():
+    cache = TemplateCache(max_bytes=10)
+    cache.put("a", _spectrum())
+    assert len(cache) == 0
+
+
+def test_reader_goes_through_cache(templates_path):
+    read_marcs_spectrum("5750:4.5")
+    read_marcs_spectrum("5750:4.5")
+    assert sed_utils.TEMPLATE_CACHE.stats["misses"] == 1
+    assert sed_utils.TEMPLATE_CACHE.stats["hits"] == 1
+
+
+def test_redshifting_result_leaves_cached_template_unchanged(templates_path):
+    first = read_marcs_spectrum("5750:4.5")
+    first.z = 1.0
+    first.meta["changed"] = True
+    second = read_marcs_spectrum("5750:4.5")
+    assert second.z == 0
+    assert "changed" not in second.meta
+    assert second(5000 * u.AA) != first(5000 * u.AA)
+
+
+def test_concurrent_reads(templates_path):
+    results = []
+
+    def _read():
+        results.append(read_marcs_spectrum("5750:4.5"))
+
+    threads = [threading.Thread(target=_read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8
+    assert len(sed_utils.TEMPLATE_CACHE) == 1
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from astropy import units as u
+from synphot import Empirical1D, SourceSpectrum, units
+
+from elvis.cache import TemplateCache, is_memory_mapped
+from elvis.source import sed_utils
+from elvis.source.sed_utils import read_pickles_spectrum
+from elvis.source.template_library import TemplateLibrary, build_library, main
+
+
+def _write_template(path, scale=1.0):
+    wave = np.linspace(3000, 25000, 200) * u.AA
+    flux = scale * np.linspace(1, 2, 200) * units.FLAM
+    SourceSpectrum(Empirical1D, points=wave, lookup_table=flux).to_fits(str(path))
+
+
+@pytest.fixture
+def templates_path(tmp_path):
+    for catalog in ("Pickles", "Kurucz"):
+        (tmp_path / "fits" / catalog).mkdir(parents=True)
+    _write_template(tmp_path / "fits" / "Pickles" / "G2V.fits", 1.0)
+    _write_template(tmp_path / "fits" / "Pickles" / "K0III.fits", 3.0)
+    _write_template(tmp_path / "fits" / "Kurucz" / "G2V.fits", 5.0)
+    return tmp_path / "fits"
+
+
+@pytest.fixture
+def library(templates_path, tmp_path):
+    build_library(templates_path, tmp_path / "packed")
+    return TemplateLibrary(tmp_path / "packed")
+
+
+def test_build_counts_templates_per_catalog(templates_path, tmp_path):
+    counts = build_library(templates_path, tmp_path / "packed")
+    assert counts == {"Pickles": 2, "Kurucz": 1}
+    assert (tmp_path / "packed" / "Pickles.bin").exists()
+    assert (tmp_path / "packed" / "Pickles.json").exists()
+
+
+def test_packed_template_matches_fits(templates_path, library):
+    original = SourceSpectrum.from_file(str(templates_path / "Pickles" / "K0III.fits"))
+    packed = library.get("Pickles", "K0III.fits")
+    wave = original.waveset
+    np.testing.assert_allclose(packed(wave).value, original(wave).value)
+
+
+def test_packed_template_is_zero_copy(library):
+    spec = library.get("Pickles", "G2V.fits")
+    assert is_memory_mapped(spec.model.lookup_table)
+    assert is_memory_mapped(spec.model.points[0])
+
+
+def test_catalogs_are_kept_apart(library):
+    pickles = library.get("Pickles", "G2V.fits")
+    kurucz = library.get("Kurucz", "G2V.fits")
+    assert kurucz(10000 * u.AA).value == pytest.approx(
+        5 * pickles(10000 * u.AA).value)
+
+
+def test_unknown_template_or_catalog_is_none(library):
+    assert library.get("Pickles", "Z9X.fits") is None
+    assert library.get("MARCS", "anything.fits") is None
+    assert "MARCS" not in library
+    assert "Pickles" in library
+
+
+def test_reader_uses_library_without_fits_files(library, tmp_path, monkeypatch):
+    monkeypatch.setattr(sed_utils, "TEMPLATES_PATH", tmp_path / "missing")
+    monkeypatch.setattr(sed_utils, "TEMPLATE_LIBRARY", library)
+    monkeypatch.setattr(sed_utils, "TEMPLATE_CACHE", TemplateCache())
+    spec = read_pickles_spectrum("G:2:V")
+    assert isinstance(spec, SourceSpectrum)
+    assert sed_utils.TEMPLATE_CACHE.nbytes == 0     # mapped, not on the heap
+
+
+def test_reader_raises_if_neither_packed_nor_on_disk(library, tmp_path,
+                                                     monkeypatch):
+    monkeypatch.setattr(sed_utils, "TEMPLATES_PATH", tmp_path / "missing")
+    monkeypatch.setattr(sed_utils, "TEMPLATE_LIBRARY", library)
+    with pytest.raises(FileNotFoundError):
+        read_pickles_spectrum("M:5:V")
+
+
+def test_command_line_build(templates_path, tmp_path, capsys):
+    main([str(templates_path), str(tmp_path / "cli"), "--catalogs", "Kurucz"])
+    assert "Kurucz: 1 templates" in capsys.readouterr().out
+    assert not (tmp_path / "cli" / "Pickles.bin").exists()
@@ -36,3 +36,85 @@ def test_fits_header_has_keyword_from_input_json(client):
     hdul = fits.open(io.BytesIO(response.data))
 
     assert hdul[0].header["TARGET BRIGHTNESS MAG"] == 10
+
+
+def test_process_with_session_returns_fits(client):
+    with open(JSON_FILENAME, "r") as file:
+        json_data = json.load(file)
+
+    response = client.post("/process?session=test", json=json_data)
+
+    assert response.status_code == 200
+    hdul = fits.open(io.BytesIO(response.data))
+    assert hdul[0].header["TARGET BRIGHTNESS MAG"] == 10
+    assert "ELVIS TIME SERIALISE" in hdul[0].header
+    assert "incremental" not in response.headers["Server-Timing"]
+
+
+def test_process_batch_streams_tar_of_fits(client):
+    import tarfile
+
+    with open(JSON_FILENAME, "r") as file:
+        json_data = json.load(file)
+    payloads = [json_data, dict(json_data, instrumentName="hawki")]
+
+    response = client.post("/process/batch", json={"payloads": payloads})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-tar"
+    with tarfile.open(fileobj=io.BytesIO(response.data)) as tar:
+        names = sorted(tar.getnames())
+        assert names == ["result_0000.fits", "result_0001.fits"]
+        hdul = fits.open(io.BytesIO(tar.extractfile(names[1]).read()))
+        assert hdul[0].header["INSTRUMENTNAME"] == "hawki"
+
+
+def test_process_batch_rejects_non_list(client):
+    response = client.post("/process/batch", json={"payloads": "nope"})
+    assert response.status_code == 400
+
+
+def test_async_process_returns_job_and_result(client):
+    import time
+
+    with open(JSON_FILENAME, "r") as file:
+        json_data = json.load(file)
+
+    response = client.post("/process?async=true", json=json_data)
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    for _ in range(500):
+        status = client.get(f"/jobs/{job_id}").get_json()["status"]
+        if status in ("done", "failed"):
+            break
+        time.sleep(0.01)
+    assert status == "done"
+
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 200
+    hdul = fits.open(io.BytesIO(result.data))
+    assert hdul[0].header["TARGET BRIGHTNESS MAG"] == 10
+
+
+def test_async_process_returns_429_when_queue_is_full(client, monkeypatch):
+    from elvis import server
+
+    monkeypatch.setattr(server.JOB_QUEUE, "max_jobs", 0)
+    response = client.post("/process?async=true", json={})
+    assert response.status_code == 429
+    assert "full" in response.get_json()["error"]
+
+
+def test_unknown_job_returns_404(client):
+    assert client.get("/jobs/nonexistent").status_code == 404
+    assert client.get("/jobs/nonexistent/result").status_code == 404
+
+
+def test_process_reports_server_timing(client):
+    with open(JSON_FILENAME, "r") as file:
+        json_data = json.load(file)
+
+    response = client.post("/process", json=json_data)
+
+    assert "serialise;dur=" in response.headers["Server-Timing"]
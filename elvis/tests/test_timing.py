@@ -0,0 +1,79 @@
+"""Tests for per-stage timing instrumentation."""
+
+import json
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from elvis.pipeline import run_simulation
+from elvis.timing import StageTimer
+
+
+class _FakeOpticalTrain:
+    def observe(self, source):
+        time.sleep(0.01)
+
+    def readout(self):
+        return [[fits.PrimaryHDU(), fits.ImageHDU(data=np.zeros((2, 2)))]]
+
+
+class TestStageTimer:
+
+    def test_stage_records_duration(self):
+        timer = StageTimer()
+        with timer.stage("observe"):
+            time.sleep(0.01)
+        assert timer.timings["observe"] >= 0.01
+
+    def test_repeated_stages_accumulate(self):
+        timer = StageTimer()
+        for _ in range(2):
+            with timer.stage("readout"):
+                time.sleep(0.005)
+        assert timer.timings["readout"] >= 0.01
+
+    def test_stage_recorded_on_error(self):
+        timer = StageTimer()
+        with pytest.raises(RuntimeError):
+            with timer.stage("observe"):
+                raise RuntimeError
+        assert "observe" in timer.timings
+
+    def test_header_keywords(self):
+        timer = StageTimer()
+        with timer.stage("observe"):
+            pass
+        header = fits.Header()
+        timer.to_header(header)
+        assert "ELVIS TIME OBSERVE" in header
+
+    def test_server_timing_and_log_line(self):
+        timer = StageTimer()
+        timer.timings = {"source": 0.002, "observe": 0.5}
+        assert timer.server_timing() == "source;dur=2.000, observe;dur=500.000"
+        record = json.loads(timer.log_line(instrument="hawki"))
+        assert record["instrument"] == "hawki"
+        assert record["timings_ms"]["observe"] == 500.0
+
+
+class TestPipelineTimings:
+
+    @patch("elvis.pipeline.OPTICAL_TRAIN_POOL.acquire",
+           return_value=_FakeOpticalTrain())
+    @patch("elvis.pipeline.OPTICAL_TRAIN_POOL.release")
+    def test_all_stages_in_primary_header(self, _release, _acquire):
+        hdul = run_simulation({"instrumentName": "hawki"})
+        header = hdul[0].header
+        for stage in ("SOURCE", "OPTICAL_TRAIN", "CONFIGURE", "OBSERVE",
+                      "READOUT", "MERGE"):
+            assert f"ELVIS TIME {stage}" in header
+        assert header["ELVIS TIME OBSERVE"] >= 0.01
+
+    def test_fallback_header_has_timings(self):
+        timer = StageTimer()
+        hdul = run_simulation({"instrumentName": "nonexistent"}, timer=timer)
+        assert "ELVIS TIME SOURCE" in hdul[0].header
+        assert "optical_train" in timer.timings
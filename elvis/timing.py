@@ -0,0 +1,79 @@
+"""
+Per-stage timing of the ELVIS pipeline.
+
+A :class:`StageTimer` measures named stages with a monotonic clock
+(``time.perf_counter``).  The timings can be written into a FITS header
+as ``HIERARCH ELVIS TIME <STAGE>`` keywords, rendered as an HTTP
+``Server-Timing`` header, or emitted as one structured (JSON) log line.
+
+Example
+-------
+::
+
+    timer = StageTimer()
+    with timer.stage("observe"):
+        opt_train.observe(source)
+    timer.to_header(hdul[0].header)
+
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Accumulates wall-clock durations (in seconds) per named stage."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage ``name``.
+
+        Repeated stages accumulate.  The duration is recorded even if the
+        block raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def skip(self, name: str) -> None:
+        """Record stage ``name`` as skipped, i.e. with a duration of zero."""
+        self.timings.setdefault(name, 0.0)
+
+    @property
+    def total(self) -> float:
+        """Sum of all stage durations in seconds."""
+        return sum(self.timings.values())
+
+    def to_header(self, header) -> None:
+        """Write ``ELVIS TIME <STAGE>`` keywords into a FITS header."""
+        for name, seconds in self.timings.items():
+            header[f"HIERARCH ELVIS TIME {name.upper()}"] = (
+                round(seconds, 6), "[s] ELVIS stage duration")
+
+    @staticmethod
+    def remove_from_header(header) -> None:
+        """Remove any ``ELVIS TIME <STAGE>`` keywords from a FITS header."""
+        for key in [k for k in header.keys() if k.startswith("ELVIS TIME ")]:
+            del header[key]
+
+    def server_timing(self) -> str:
+        """Render as an HTTP ``Server-Timing`` header value (in ms)."""
+        return ", ".join(f"{name};dur={seconds * 1e3:.3f}"
+                         for name, seconds in self.timings.items())
+
+    def log_line(self, **context) -> str:
+        """One JSON log line with the timings (in ms) and extra context."""
+        record = {"event": "elvis.timing", **context,
+                  "timings_ms": {name: round(seconds * 1e3, 3)
+                                 for name, seconds in self.timings.items()},
+                  "total_ms": round(self.total * 1e3, 3)}
+        return json.dumps(record, default=str)